@@ -0,0 +1,218 @@
+"""Runs the helpers' main flows against the local stand-ins and reports throughput and latency.
+
+From the repository root:
+
+    python -m benchmarks.run_benchmarks --pages 5 --page-size 100 --latency 0.005 --rate-limit-every 50
+
+Every flow is run once to warm the connection pool, then `--iterations` times. For each flow the
+report gives the wall time per run (mean, p50, p95), the HTTP requests and items handled per run,
+and the resulting throughput. `--prometheus` also dumps the per-endpoint latency histograms.
+
+The helpers' rate limiters are replaced with unthrottled ones unless `--respect-rate-limits` is
+passed, so the numbers measure the client rather than the configured request budgets.
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+from serviceHelpers._common import RateLimiter
+from serviceHelpers.freshdesk import FreshDesk
+from serviceHelpers.hue import huehelper
+from serviceHelpers.instrumentation import LatencyAggregator
+from serviceHelpers.jira import Jira
+from serviceHelpers.models.JiraDetails import JiraDetails
+from serviceHelpers.slack import slack
+from serviceHelpers.trello import trello
+from serviceHelpers.zendesk import zendesk
+
+from benchmarks.standins import BOARD_ID, WORKLOG_FIELD_ID, StandInConfig, StandInServer
+
+
+class BenchContext:
+    """What the flows need: the transport pointing at the stand-ins, and whether to keep the real rate limits
+
+    Args:
+        `transport` (HttpTransport): the transport the helpers are built with
+        `respect_rate_limits` (bool): keep the shared per-credential limiters instead of unthrottled ones
+    """
+
+    def __init__(self, transport, respect_rate_limits: bool = False) -> None:
+        self.transport = transport
+        self.respect_rate_limits = respect_rate_limits
+
+    def prepare(self, helper):
+        "swaps the helper's limiter for an unthrottled one, unless the real limits are wanted"
+        if not self.respect_rate_limits:
+            helper._limiter = RateLimiter(1e9, 1e9, service=helper._limiter.service)
+        return helper
+
+
+def board_fetch(ctx: BenchContext) -> int:
+    "fetches every visible card on a board into a fresh helper's cache"
+    board = ctx.prepare(trello(BOARD_ID, "key", "token", transport=ctx.transport))
+    return len(board.fetch_trello_cards())
+
+
+def ticket_search(ctx: BenchContext) -> int:
+    "a paginated ticket search on both Zendesk and Freshdesk"
+    zend = ctx.prepare(zendesk("bench.zendesk.com", "key", transport=ctx.transport))
+    fresh = ctx.prepare(FreshDesk("bench.freshdesk.com", "key", transport=ctx.transport))
+    tickets = zend.search_for_tickets("status:open")
+    tickets_fd = fresh.search_fd_tickets("status:2")
+    return len(tickets) + len(tickets_fd)
+
+
+def worklog_extraction(ctx: BenchContext) -> int:
+    "pulls worklogs for one ticket from Zendesk audits, Jira and Freshdesk time entries"
+    zend = ctx.prepare(zendesk("bench.zendesk.com", "key", transport=ctx.transport))
+    fresh = ctx.prepare(FreshDesk("bench.freshdesk.com", "key", transport=ctx.transport))
+    details = JiraDetails()
+    details.host = "bench.atlassian.net"
+    details.key = "key"
+    jira = ctx.prepare(Jira(details, transport=ctx.transport))
+    worklogs = zend.get_worklogs(1, WORKLOG_FIELD_ID)
+    worklogs_jira = jira.fetch_worklogs_for_jira_ticket("BENCH-1")
+    worklogs_fd = fresh.get_worklogs(1)
+    return len(worklogs) + len(worklogs_jira) + len(worklogs_fd)
+
+
+def message_history(ctx: BenchContext) -> int:
+    "fetches a channel's history from Slack"
+    helper = ctx.prepare(slack(token="token", transport=ctx.transport))
+    return len(helper.fetch_messages("C0BENCH"))
+
+
+def bulb_pulses(ctx: BenchContext) -> int:
+    "discovers the bulbs on a bridge and pulses them all"
+    bridge = huehelper("bench.hue.local", "user", transport=ctx.transport)
+    ctx.prepare(bridge)
+    bridge.pulseLights(46920, 254, rate=0.01, duration=0.05)
+    return len(bridge.devices)
+
+
+FLOWS = {
+    "board_fetch": board_fetch,
+    "ticket_search": ticket_search,
+    "worklog_extraction": worklog_extraction,
+    "message_history": message_history,
+    "bulb_pulses": bulb_pulses,
+}
+
+
+class FlowResult:
+    "the timings of one flow, with the requests and items handled per run"
+
+    def __init__(self, name: str, durations: list, requests: int, items: int) -> None:
+        self.name = name
+        self.durations = durations
+        self.requests = requests
+        self.items = items
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self.durations)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def as_row(self) -> tuple:
+        runs = len(self.durations)
+        total = self.total or float("nan")
+        return (
+            self.name,
+            runs,
+            f"{statistics.mean(self.durations) * 1000:.1f}",
+            f"{self.percentile(0.5) * 1000:.1f}",
+            f"{self.percentile(0.95) * 1000:.1f}",
+            self.requests // runs,
+            self.items // runs,
+            f"{self.requests / total:.0f}",
+            f"{self.items / total:.0f}",
+        )
+
+
+def run_flow(name: str, flow, ctx: BenchContext, iterations: int, warmup: bool = True) -> FlowResult:
+    "runs a flow `iterations` times, after an optional warm-up run, counting the requests it makes"
+    calls = []
+    quiet = io.StringIO()  # some helpers print as they go
+    with contextlib.redirect_stdout(quiet):
+        if warmup:
+            flow(ctx)
+        ctx.transport.add_hook(calls.append)
+        try:
+            durations = []
+            items = 0
+            for _ in range(iterations):
+                start = time.perf_counter()
+                items += flow(ctx)
+                durations.append(time.perf_counter() - start)
+        finally:
+            ctx.transport.remove_hook(calls.append)
+    return FlowResult(name, durations, len(calls), items)
+
+
+_HEADINGS = ("flow", "runs", "mean ms", "p50 ms", "p95 ms", "req/run", "items/run", "req/s", "items/s")
+
+
+def format_report(results: list) -> str:
+    "lays the results out as a fixed width table"
+    rows = [_HEADINGS] + [result.as_row() for result in results]
+    widths = [max(len(str(row[column])) for row in rows) for column in range(len(_HEADINGS))]
+    lines = []
+    for row in rows:
+        cells = [str(cell).ljust(width) if index == 0 else str(cell).rjust(width) for index, (cell, width) in enumerate(zip(row, widths))]
+        lines.append("  ".join(cells))
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5, help="pages in every paginated listing")
+    parser.add_argument("--page-size", type=int, default=100, help="items per page")
+    parser.add_argument("--payload-bytes", type=int, default=256, help="filler text per item")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stand-ins wait before answering")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--retry-after", type=float, default=0, help="the Retry-After sent with injected 429s")
+    parser.add_argument("--bulbs", type=int, default=5, help="lights on the hue bridge")
+    parser.add_argument("--iterations", type=int, default=5, help="timed runs per flow")
+    parser.add_argument("--only", action="append", choices=sorted(FLOWS), help="run just this flow, can be repeated")
+    parser.add_argument("--respect-rate-limits", action="store_true", help="keep the helpers' real rate limiters")
+    parser.add_argument("--prometheus", action="store_true", help="also print the per-endpoint latency histograms")
+    args = parser.parse_args(argv)
+
+    config = StandInConfig(
+        pages=args.pages,
+        page_size=args.page_size,
+        payload_bytes=args.payload_bytes,
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        bulbs=args.bulbs,
+    )
+    aggregator = LatencyAggregator()
+    results = []
+    with StandInServer(config) as server:
+        transport = server.transport()
+        transport.add_hook(aggregator)
+        ctx = BenchContext(transport, args.respect_rate_limits)
+        for name in args.only or FLOWS:
+            results.append(run_flow(name, FLOWS[name], ctx, args.iterations))
+        transport.close()
+        served, rate_limited = server.requests, server.rate_limited
+
+    print(format_report(results))
+    print(f"\nstand-ins served {served} requests, {rate_limited} of them injected 429s")
+    if args.prometheus:
+        print()
+        print(aggregator.to_prometheus(), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,962 @@
+"""Local HTTP stand-ins for the services the helpers talk to.
+
+A single `StandInServer` emulates the Trello, Zendesk, Freshdesk, Jira, Slack and Hue endpoints
+used by `serviceHelpers` on one local port. `StandInServer.transport()` returns an `HttpTransport`
+that redirects every request meant for the real hosts to the stand-ins, so the helpers run
+unmodified:
+
+    with StandInServer(StandInConfig(pages=3, latency=0.01)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        board.fetch_trello_cards()
+
+The service is picked from the host the request was meant for: anything containing `freshdesk`,
+`zendesk`, `atlassian`/`jira`, `slack`, `trello` or `hue` is answered by that stand-in.
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+from serviceHelpers._common import HttpTransport
+
+HOST_HEADER = "X-Stand-In-Host"
+WORKLOG_FIELD_ID = 360028226411
+BOARD_ID = "5f0dee6c5026590ce300472c"
+_EPOCH = datetime(2022, 4, 22, 9, 0, 0, tzinfo=timezone.utc)
+
+
+class StandInConfig:
+    """Shapes the data served by the stand-ins and how they behave
+
+    Args:
+        `pages` (int): how many pages every paginated listing has
+        `page_size` (int): items per page. Listings the helpers fetch in one go (board cards, jira worklogs) hold `pages * page_size` items
+        `payload_bytes` (int): length of the filler text put in each item's description or body
+        `latency` (float): seconds to wait before answering each request
+        `rate_limit_every` (int): answer every Nth request with a 429, 0 never does
+        `retry_after` (float): the `Retry-After` sent with injected 429s
+        `bulbs` (int): how many lights the hue bridge has
+    """
+
+    def __init__(
+        self,
+        pages: int = 5,
+        page_size: int = 100,
+        payload_bytes: int = 256,
+        latency: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after: float = 0,
+        bulbs: int = 5,
+    ) -> None:
+        self.pages = pages
+        self.page_size = page_size
+        self.payload_bytes = payload_bytes
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.bulbs = bulbs
+
+    @property
+    def total(self) -> int:
+        "how many items a full listing holds"
+        return self.pages * self.page_size
+
+
+def _timestamp(index: int, fmt: str = "%Y-%m-%dT%H:%M:%SZ") -> str:
+    return (_EPOCH + timedelta(minutes=index)).strftime(fmt)
+
+
+class _Response:
+    "what a route hands back to the request handler"
+
+    def __init__(self, payload=None, status: int = 200, headers: dict = None) -> None:
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+
+class _Request:
+    "the parts of an incoming request the routes care about"
+
+    def __init__(self, method: str, host: str, path: str, query: dict, body) -> None:
+        self.method = method
+        self.host = host
+        self.path = path
+        self.query = query
+        self.body = body
+
+    def url(self, **query) -> str:
+        "rebuilds the URL as it would look on the real host, with some query parameters replaced"
+        merged = {**self.query, **query}
+        return urlunsplit(("https", self.host, self.path, urlencode(merged), ""))
+
+
+class StandIns:
+    """The emulated services and the data behind them. Routes are matched on the method and a path regex.
+
+    Trello keeps real state: cards can be created, updated and deleted, and every change is
+    recorded as a board action. Everything else is generated on demand from its index.
+    """
+
+    def __init__(self, config: StandInConfig) -> None:
+        self.config = config
+        self.filler = "x" * config.payload_bytes
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.trello_lists = [self._trello_id() for _ in range(4)]
+        self.trello_closed_lists = set()
+        self.trello_cards = {}
+        self.trello_actions = []
+        self.trello_checklists = {}
+        self.zendesk_user_changes = {}  # user id -> fields edited since the users were generated
+        self.bulbs = {
+            str(index): {"on": False, "bri": 254, "hue": 8402, "sat": 140}
+            for index in range(1, config.bulbs + 1)
+        }
+        for index in range(config.total):
+            self._create_card(
+                {
+                    "name": f"Card {index}",
+                    "idList": self.trello_lists[index % len(self.trello_lists)],
+                    "pos": str(float(index + 1) * 16384),
+                }
+            )
+
+        self.routes = {
+            "trello": [
+                ("GET", r"/1/boards/(\w+)/cards/?", self.trello_board_cards),
+                ("GET", r"/1/boards/(\w+)/actions/?", self.trello_board_actions),
+                ("GET", r"/1/cards?/(\w+)/?", self.trello_get_card),
+                ("POST", r"/1/cards/?", self.trello_create_card),
+                ("PUT", r"/1/cards?/(\w+)/?", self.trello_update_card),
+                ("DELETE", r"/1/cards?/(\w+)/?", self.trello_delete_card),
+                ("PUT", r"/1/lists/(\w+)/closed/?", self.trello_close_list),
+                ("GET", r"/1/search/?", self.trello_search),
+                ("GET", r"/1/batch/?", self.trello_batch),
+                ("POST", r"/1/checklists/?", self.trello_create_checklist),
+                ("GET", r"/1/checklists/(\w+)/?", self.trello_get_checklist),
+                ("POST", r"/1/checklists/(\w+)/checkItems/?", self.trello_add_check_item),
+                (
+                    "DELETE",
+                    r"/1/checklists/(\w+)/checkItems/(\w+)/?",
+                    self.trello_delete_check_item,
+                ),
+            ],
+            "zendesk": [
+                ("GET", r"/api/v2/search\.json", self.zendesk_search),
+                ("GET", r"/api/v2/search/export(?:\.json)?", self.zendesk_search_export),
+                (
+                    "GET",
+                    r"/api/v2/incremental/tickets/cursor(?:\.json)?",
+                    self.zendesk_incremental_tickets,
+                ),
+                ("GET", r"/api/v2/tickets/(\d+)/audits(?:\.json)?", self.zendesk_audits),
+                ("GET", r"/api/v2/tickets/(\d+)/comments(?:\.json)?", self.zendesk_comments),
+                ("GET", r"/api/v2/users/(\d+)(?:\.json)?", self.zendesk_user),
+                ("GET", r"/api/v2/users/show_many(?:\.json)?", self.zendesk_users_show_many),
+                ("GET", r"/api/v2/tickets/(\d+)(?:\.json)?", self.zendesk_ticket),
+                ("GET", r"/api/v2/ticket_forms/(\d+)(?:\.json)?", self.zendesk_form),
+            ],
+            "freshdesk": [
+                ("GET", r"/api/v2/search/tickets", self.freshdesk_search),
+                ("GET", r"/api/v2/tickets/(\d+)/time_entries", self.freshdesk_time_entries),
+                ("GET", r"/api/v2/tickets/(\d+)/conversations", self.freshdesk_conversations),
+                ("GET", r"/api/v2/agents/(\d+)", self.freshdesk_agent),
+            ],
+            "jira": [
+                ("GET", r"/rest/api/\d/issue/([\w-]+)/worklog", self.jira_worklogs),
+                ("GET", r"/rest/api/\d/issue/([\w-]+)", self.jira_issue),
+                ("GET", r"/rest/api/\d/search.*", self.jira_search),
+            ],
+            "slack": [
+                ("*", r"/api/conversations\.history", self.slack_history),
+                ("GET", r"/api/users\.profile\.get", self.slack_profile),
+                ("POST", r"/api/chat\.(?:postMessage|update)", self.slack_post),
+            ],
+            "hue": [
+                ("GET", r"/api/\w+/lights", self.hue_lights),
+                ("GET", r"/api/\w+/lights/(\d+)", self.hue_light),
+                ("PUT", r"/api/\w+/lights/(\d+)/state", self.hue_set_state),
+            ],
+        }
+
+    @staticmethod
+    def service_for(host: str) -> str:
+        "picks the stand-in that answers for a host"
+        host = host.lower()
+        for keyword, service in (
+            ("freshdesk", "freshdesk"),
+            ("zendesk", "zendesk"),
+            ("atlassian", "jira"),
+            ("jira", "jira"),
+            ("slack", "slack"),
+            ("trello", "trello"),
+            ("hue", "hue"),
+        ):
+            if keyword in host:
+                return service
+        return None
+
+    def dispatch(self, request: _Request) -> _Response:
+        "finds the route for a request and calls it"
+        service = self.service_for(request.host)
+        for method, pattern, route in self.routes.get(service, []):
+            if method not in ("*", request.method):
+                continue
+            match = re.fullmatch(pattern, request.path)
+            if match is not None:
+                return route(request, *match.groups())
+        return _Response({"error": f"no stand-in for {request.method} {request.path}"}, 404)
+
+    def _page_bounds(self, request: _Request) -> tuple:
+        "the start and stop indexes of the requested offset page, and the page number"
+        try:
+            page = max(int(request.query.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        start = (page - 1) * self.config.page_size
+        return start, min(start + self.config.page_size, self.config.total), page
+
+    def _zendesk_listing(self, request: _Request, key: str, build) -> _Response:
+        "a zendesk listing, supporting both cursor (`page[size]`) and offset (`page`) pagination"
+        total = self.config.total
+        if "page[size]" in request.query:
+            size = min(int(request.query["page[size]"]), 100)
+            start = int(request.query.get("page[after]", 0) or 0)
+            stop = min(start + size, total)
+            has_more = stop < total
+            return _Response(
+                {
+                    key: [build(index) for index in range(start, stop)],
+                    "meta": {
+                        "has_more": has_more,
+                        "after_cursor": str(stop) if has_more else None,
+                        "before_cursor": str(start),
+                    },
+                    "links": {
+                        "next": request.url(**{"page[after]": stop}) if has_more else None,
+                        "prev": None,
+                    },
+                }
+            )
+        start, stop, page = self._page_bounds(request)
+        return _Response(
+            {
+                key: [build(index) for index in range(start, stop)],
+                "next_page": request.url(page=page + 1) if stop < total else None,
+                "previous_page": request.url(page=page - 1) if page > 1 else None,
+                "count": total,
+            }
+        )
+
+    # trello
+
+    def _trello_id(self) -> str:
+        "trello ids are 24 hex characters, and sort in the order they were created"
+        with self._lock:
+            self._next_id += 1
+            return f"{self._next_id:024x}"
+
+    def _record_action(self, action_type: str, card: dict, old: dict = None) -> None:
+        action_id = self._trello_id()
+        # like trello, the card in the action carries its identifiers plus whichever fields changed
+        fields = ("id", "name") + tuple(old or ("idList", "pos", "closed"))
+        data = {
+            "card": {key: card.get(key) for key in fields},
+            "list": {"id": card.get("idList")},
+            "board": {"id": BOARD_ID},
+        }
+        if old:
+            data["old"] = old
+        with self._lock:
+            self.trello_actions.append(
+                {
+                    "id": action_id,
+                    "type": action_type,
+                    "date": _timestamp(len(self.trello_actions), "%Y-%m-%dT%H:%M:%S.000Z"),
+                    "idMemberCreator": "0" * 24,
+                    "data": data,
+                }
+            )
+
+    def _create_card(self, fields: dict) -> dict:
+        card_id = self._trello_id()
+        card = {
+            "id": card_id,
+            "name": fields.get("name", ""),
+            "desc": fields.get("desc", self.filler),
+            "idList": fields.get("idList", self.trello_lists[0]),
+            "idBoard": BOARD_ID,
+            "pos": float(fields.get("pos", 16384) or 16384),
+            "closed": False,
+            "labels": [],
+            "idLabels": [],
+            "idChecklists": [],
+            "dateLastActivity": _timestamp(len(self.trello_cards), "%Y-%m-%dT%H:%M:%S.000Z"),
+        }
+        with self._lock:
+            self.trello_cards[card_id] = card
+        self._record_action("createCard", card)
+        return card
+
+    def _trello_projection(self, card: dict, request: _Request) -> dict:
+        "the card as trello would send it for the request's `fields`, `customFieldItems` and `checklists`"
+        fields = request.query.get("fields", "all")
+        if fields == "all":
+            projected = dict(card)
+        else:
+            projected = {key: card[key] for key in ["id", *fields.split(",")] if key in card}
+        projected.pop("customFieldItems", None)
+        if request.query.get("customFieldItems") == "true":
+            projected["customFieldItems"] = card.get("customFieldItems", [])
+        if request.query.get("checklists", "none") != "none":
+            projected["checklists"] = [
+                self._trello_checklist(checklist_id) for checklist_id in card["idChecklists"]
+            ]
+        return projected
+
+    def trello_board_cards(self, request: _Request, board_id: str) -> _Response:
+        cards = [
+            self._trello_projection(card, request)
+            for card in self.trello_cards.values()
+            if not card["closed"] and card["idList"] not in self.trello_closed_lists
+        ]
+        return _Response(cards)
+
+    def trello_board_actions(self, request: _Request, board_id: str) -> _Response:
+        "newest first, bounded by the `since` and `before` action ids, at most `limit` (default 50, max 1000)"
+        limit = min(int(request.query.get("limit") or 50), 1000)
+        since = request.query.get("since")
+        before = request.query.get("before")
+        types = request.query.get("filter")
+        types = None if types in (None, "", "all") else set(types.split(","))
+        actions = []
+        for action in reversed(self.trello_actions):
+            if before is not None and action["id"] >= before:
+                continue
+            if since is not None and action["id"] <= since:
+                break
+            if types is not None and action["type"] not in types:
+                continue
+            actions.append(action)
+            if len(actions) >= limit:
+                break
+        return _Response(actions)
+
+    def trello_get_card(self, request: _Request, card_id: str) -> _Response:
+        card = self.trello_cards.get(card_id)
+        if card is None:
+            return _Response("The requested resource was not found.", 404)
+        return _Response(self._trello_projection(card, request))
+
+    def trello_create_card(self, request: _Request) -> _Response:
+        fields = {**request.query, **(request.body if isinstance(request.body, dict) else {})}
+        return _Response(self._create_card(fields))
+
+    def trello_update_card(self, request: _Request, card_id: str) -> _Response:
+        card = self.trello_cards.get(card_id)
+        if card is None:
+            return _Response("The requested resource was not found.", 404)
+        fields = {**request.query, **(request.body if isinstance(request.body, dict) else {})}
+        old = {}
+        for key in ("name", "desc", "idList", "pos", "closed"):
+            if key in fields:
+                value = fields[key]
+                if key == "pos":
+                    value = float(value)
+                elif key == "closed":
+                    value = str(value).lower() == "true"
+                old[key] = card[key]
+                card[key] = value
+        self._record_action("updateCard", card, old)
+        # like trello, the response has every field but the custom fields
+        return _Response({key: value for key, value in card.items() if key != "customFieldItems"})
+
+    def trello_delete_card(self, request: _Request, card_id: str) -> _Response:
+        card = self.trello_cards.pop(card_id, None)
+        if card is None:
+            return _Response("The requested resource was not found.", 404)
+        self._record_action("deleteCard", card)
+        return _Response({"limits": {}})
+
+    def trello_close_list(self, request: _Request, list_id: str) -> _Response:
+        "archives or restores a list. Its cards keep their own `closed`, but drop out of the board's visible cards"
+        if list_id not in self.trello_lists:
+            return _Response("The requested resource was not found.", 404)
+        closed = str(request.query.get("value", "true")).lower() == "true"
+        was_closed = list_id in self.trello_closed_lists
+        if closed:
+            self.trello_closed_lists.add(list_id)
+        else:
+            self.trello_closed_lists.discard(list_id)
+        # list actions carry the list rather than a card
+        action_id = self._trello_id()
+        with self._lock:
+            self.trello_actions.append(
+                {
+                    "id": action_id,
+                    "type": "updateList",
+                    "date": _timestamp(len(self.trello_actions), "%Y-%m-%dT%H:%M:%S.000Z"),
+                    "idMemberCreator": "0" * 24,
+                    "data": {
+                        "list": {"id": list_id, "closed": closed},
+                        "old": {"closed": was_closed},
+                        "board": {"id": BOARD_ID},
+                    },
+                }
+            )
+        return _Response({"id": list_id, "closed": closed})
+
+    def _trello_checklist(self, checklist_id: str) -> dict:
+        "a copy of the checklist, with its items sorted by position as trello sends them"
+        checklist = self.trello_checklists[checklist_id]
+        with self._lock:
+            items = sorted(checklist["checkItems"], key=lambda item: item["pos"])
+        return {**checklist, "checkItems": items}
+
+    def trello_create_checklist(self, request: _Request) -> _Response:
+        fields = {**request.query, **(request.body if isinstance(request.body, dict) else {})}
+        card = self.trello_cards.get(fields.get("idCard"))
+        if card is None:
+            return _Response("invalid value for idCard", 400)
+        checklist_id = self._trello_id()
+        with self._lock:
+            self.trello_checklists[checklist_id] = {
+                "id": checklist_id,
+                "name": fields.get("name", ""),
+                "idCard": card["id"],
+                "idBoard": BOARD_ID,
+                "pos": float(len(card["idChecklists"]) + 1) * 16384,
+                "checkItems": [],
+            }
+            card["idChecklists"] = card["idChecklists"] + [checklist_id]
+        self._record_action("addChecklistToCard", card)
+        return _Response(self._trello_checklist(checklist_id))
+
+    def trello_get_checklist(self, request: _Request, checklist_id: str) -> _Response:
+        if checklist_id not in self.trello_checklists:
+            return _Response("The requested resource was not found.", 404)
+        return _Response(self._trello_checklist(checklist_id))
+
+    def trello_add_check_item(self, request: _Request, checklist_id: str) -> _Response:
+        checklist = self.trello_checklists.get(checklist_id)
+        if checklist is None:
+            return _Response("The requested resource was not found.", 404)
+        fields = {**request.query, **(request.body if isinstance(request.body, dict) else {})}
+        item_id = self._trello_id()
+        with self._lock:
+            bottom = max((item["pos"] for item in checklist["checkItems"]), default=0) + 16384
+            pos = fields.get("pos", "bottom")
+            item = {
+                "id": item_id,
+                "name": fields.get("name", ""),
+                "idChecklist": checklist_id,
+                "pos": bottom if pos == "bottom" else float(pos),
+                "state": "complete" if fields.get("checked") == "true" else "incomplete",
+            }
+            checklist["checkItems"].append(item)
+        self._record_action("createCheckItem", self.trello_cards[checklist["idCard"]])
+        return _Response(item)
+
+    def trello_delete_check_item(
+        self, request: _Request, checklist_id: str, item_id: str
+    ) -> _Response:
+        checklist = self.trello_checklists.get(checklist_id)
+        if checklist is None:
+            return _Response("The requested resource was not found.", 404)
+        with self._lock:
+            items = checklist["checkItems"]
+            remaining = [item for item in items if item["id"] != item_id]
+            checklist["checkItems"] = remaining
+        if len(remaining) == len(items):
+            return _Response("The requested resource was not found.", 404)
+        self._record_action("deleteCheckItem", self.trello_cards[checklist["idCard"]])
+        return _Response({"limits": {}})
+
+    def trello_batch(self, request: _Request) -> _Response:
+        "runs up to 10 GETs, answering each with `{status: payload}`"
+        urls = [url for url in request.query.get("urls", "").split(",") if url]
+        if not urls or len(urls) > 10:
+            return _Response({"message": "Invalid value for urls"}, 400)
+        responses = []
+        for url in urls:
+            parts = urlsplit(url)
+            inner = _Request(
+                "GET",
+                request.host,
+                "/1" + parts.path,
+                dict(parse_qsl(parts.query, keep_blank_values=True)),
+                None,
+            )
+            response = self.dispatch(inner)
+            responses.append({str(response.status): response.payload})
+        return _Response(responses)
+
+    def trello_search(self, request: _Request) -> _Response:
+        query = request.query.get("query", "").lower()
+        limit = int(request.query.get("cards_limit") or 10)
+        cards = [card for card in self.trello_cards.values() if query in card["name"].lower()]
+        return _Response({"cards": cards[:limit]})
+
+    # zendesk
+
+    def _zendesk_ticket(self, index: int) -> dict:
+        return {
+            "id": index + 1,
+            "subject": f"Ticket {index + 1}",
+            "description": self.filler,
+            "status": "open",
+            "priority": "normal",
+            "tags": ["benchmark"],
+            "assignee_id": 1000 + index % 10,
+            "requester_id": 2000 + index,
+            "group_id": 1,
+            "organization_id": 1,
+            "ticket_form_id": 360001936712,
+            "created_at": _timestamp(index),
+            "updated_at": _timestamp(index + 1),
+            "custom_fields": [{"id": WORKLOG_FIELD_ID, "value": None}],
+        }
+
+    def _zendesk_user(self, index: int) -> dict:
+        return {
+            "id": index + 1,
+            "name": f"User {index + 1}",
+            "email": f"user{index + 1}@example.com",
+            "organization_id": 1,
+            "notes": self.filler,
+            **self.zendesk_user_changes.get(index + 1, {}),
+        }
+
+    def zendesk_search(self, request: _Request) -> _Response:
+        build = self._zendesk_ticket
+        if "type:user" in request.query.get("query", ""):
+            build = self._zendesk_user
+        response = self._zendesk_listing(request, "results", build)
+        if build == self._zendesk_ticket:
+            response.payload.update(self._zendesk_sideloads(request, response.payload["results"]))
+        return response
+
+    def _zendesk_sideloads(self, request: _Request, tickets: list) -> dict:
+        "the users, organizations and groups asked for with `include`, as `include=users` or, for searches, `include=tickets(users)`"
+        include = request.query.get("include", "")
+        nested = re.fullmatch(r"tickets\((.*)\)", include)
+        names = (nested.group(1) if nested else include).split(",")
+        sideloads = {}
+        if "users" in names:
+            user_ids = sorted(
+                {ticket["requester_id"] for ticket in tickets}
+                | {ticket["assignee_id"] for ticket in tickets}
+            )
+            sideloads["users"] = [self._zendesk_user(user_id - 1) for user_id in user_ids]
+        if "organizations" in names:
+            sideloads["organizations"] = [{"id": 1, "name": "Benchmark organisation"}]
+        if "groups" in names:
+            sideloads["groups"] = [{"id": 1, "name": "Support"}]
+        return sideloads
+
+    def zendesk_ticket(self, request: _Request, ticket_id: str) -> _Response:
+        ticket = self._zendesk_ticket(int(ticket_id) - 1)
+        return _Response({"ticket": ticket, **self._zendesk_sideloads(request, [ticket])})
+
+    def zendesk_users_show_many(self, request: _Request) -> _Response:
+        user_ids = [int(user_id) for user_id in request.query.get("ids", "").split(",") if user_id]
+        if len(user_ids) > 100:
+            return _Response({"error": "TooManyValues"}, 400)
+        return _Response({"users": [self._zendesk_user(user_id - 1) for user_id in user_ids]})
+
+    def zendesk_search_export(self, request: _Request) -> _Response:
+        "like search, but only cursor paginated, with the result type given by `filter[type]`"
+        if "page[size]" not in request.query or "filter[type]" not in request.query:
+            return _Response({"error": "InvalidPaginationParameter"}, 400)
+        build = self._zendesk_ticket
+        if request.query["filter[type]"] == "user":
+            build = self._zendesk_user
+        response = self._zendesk_listing(request, "results", build)
+        if build == self._zendesk_ticket:
+            response.payload.update(self._zendesk_sideloads(request, response.payload["results"]))
+        return response
+
+    def zendesk_incremental_tickets(self, request: _Request) -> _Response:
+        "the incremental ticket export, started with `start_time` and resumed with `cursor`"
+        if "cursor" in request.query:
+            start = int(request.query["cursor"])
+        elif "start_time" in request.query:
+            start = 0
+        else:
+            return _Response({"error": "InvalidValue", "description": "start_time or cursor is required"}, 400)
+        total = self.config.total
+        stop = min(start + self.config.page_size, total)
+        after_url = urlunsplit(("https", request.host, request.path, urlencode({"cursor": stop}), ""))
+        tickets = [self._zendesk_ticket(index) for index in range(start, stop)]
+        return _Response(
+            {
+                "tickets": tickets,
+                "after_cursor": str(stop),
+                "after_url": after_url,
+                "before_cursor": str(start),
+                "end_of_stream": stop >= total,
+                **self._zendesk_sideloads(request, tickets),
+            }
+        )
+
+    def zendesk_audits(self, request: _Request, ticket_id: str) -> _Response:
+        def build(index):
+            return {
+                "id": index + 1,
+                "ticket_id": int(ticket_id),
+                "author_id": 1000 + index % 10,
+                "created_at": _timestamp(index),
+                "events": [
+                    {"id": index * 2, "type": "Comment", "body": self.filler},
+                    {"id": index * 2 + 1, "type": "Change", "field_name": str(WORKLOG_FIELD_ID), "value": "300"},
+                ],
+            }
+
+        return self._zendesk_listing(request, "audits", build)
+
+    def zendesk_comments(self, request: _Request, ticket_id: str) -> _Response:
+        def build(index):
+            return {
+                "id": index + 1,
+                "author_id": 1000 + index % 10,
+                "body": self.filler,
+                "public": True,
+                "created_at": _timestamp(index),
+            }
+
+        return self._zendesk_listing(request, "comments", build)
+
+    def zendesk_user(self, request: _Request, user_id: str) -> _Response:
+        return _Response({"user": self._zendesk_user(int(user_id) - 1)})
+
+    def zendesk_form(self, request: _Request, form_id: str) -> _Response:
+        return _Response({"ticket_form": {"id": int(form_id), "name": "Benchmark form"}})
+
+    # freshdesk
+
+    def _freshdesk_page(self, request: _Request, build) -> list:
+        "freshdesk answers pages past the end with an empty list"
+        start, stop, _ = self._page_bounds(request)
+        return [build(index) for index in range(start, stop)]
+
+    def freshdesk_search(self, request: _Request) -> _Response:
+        def build(index):
+            return {
+                "id": index + 1,
+                "subject": f"Ticket {index + 1}",
+                "description_text": self.filler,
+                "status": 2,
+                "priority": 1,
+                "type": "Question",
+                "responder_id": 1000 + index % 10,
+                "group_id": 1,
+                "custom_fields": {},
+                "created_at": _timestamp(index),
+                "updated_at": _timestamp(index + 1),
+            }
+
+        return _Response({"results": self._freshdesk_page(request, build), "total": self.config.total})
+
+    def freshdesk_time_entries(self, request: _Request, ticket_id: str) -> _Response:
+        def build(index):
+            return {
+                "id": index + 1,
+                "ticket_id": int(ticket_id),
+                "agent_id": 1000 + index % 10,
+                "time_spent": "00:05",
+                "billable": True,
+                "note": self.filler,
+                "created_at": _timestamp(index),
+            }
+
+        return _Response(self._freshdesk_page(request, build))
+
+    def freshdesk_conversations(self, request: _Request, ticket_id: str) -> _Response:
+        def build(index):
+            return {"id": index + 1, "ticket_id": int(ticket_id), "body_text": self.filler}
+
+        return _Response(self._freshdesk_page(request, build))
+
+    def freshdesk_agent(self, request: _Request, agent_id: str) -> _Response:
+        return _Response(
+            {"id": int(agent_id), "contact": {"name": f"Agent {agent_id}", "email": f"agent{agent_id}@example.com"}}
+        )
+
+    # jira
+
+    def jira_worklogs(self, request: _Request, key: str) -> _Response:
+        worklogs = [
+            {
+                "id": str(index + 1),
+                "author": {
+                    "key": f"user{index % 10}",
+                    "emailAddress": f"user{index % 10}@example.com",
+                    "displayName": f"User {index % 10}",
+                },
+                "comment": self.filler,
+                "created": _timestamp(index, "%Y-%m-%dT%H:%M:%S.000+0000"),
+                "timeSpentSeconds": 300,
+            }
+            for index in range(self.config.total)
+        ]
+        return _Response(
+            {"startAt": 0, "maxResults": len(worklogs), "total": len(worklogs), "worklogs": worklogs}
+        )
+
+    def _jira_issue(self, index: int, key: str = None) -> dict:
+        return {
+            "id": str(10000 + index),
+            "key": key or f"BENCH-{index + 1}",
+            "fields": {
+                "summary": f"Issue {index + 1}",
+                "description": self.filler,
+                "status": {"name": "Open"},
+                "priority": {"name": "Medium"},
+                "assignee": None,
+                "created": _timestamp(index, "%Y-%m-%dT%H:%M:%S.000+0000"),
+                "updated": _timestamp(index + 1, "%Y-%m-%dT%H:%M:%S.000+0000"),
+            },
+        }
+
+    def jira_issue(self, request: _Request, key: str) -> _Response:
+        return _Response(self._jira_issue(0, key))
+
+    def jira_search(self, request: _Request) -> _Response:
+        start, stop, _ = self._page_bounds(request)
+        issues = [self._jira_issue(index) for index in range(start, stop)]
+        return _Response({"startAt": start, "maxResults": len(issues), "total": self.config.total, "issues": issues})
+
+    # slack
+
+    def slack_history(self, request: _Request) -> _Response:
+        "newest first, between `oldest` and `latest`, continued with `cursor`"
+        params = {**request.query, **(request.body if isinstance(request.body, dict) else {})}
+        first_ts = _EPOCH.timestamp()
+        try:
+            oldest = float(params.get("oldest") or 0)
+        except ValueError:
+            oldest = 0
+        try:
+            latest = float(params.get("latest") or "inf")
+        except ValueError:
+            latest = float("inf")
+        limit = min(int(params.get("limit") or 100), 1000)
+        offset = int(params.get("cursor") or 0)
+
+        # message `index` was sent at first_ts + index
+        indexes = [
+            index
+            for index in range(self.config.total - 1, -1, -1)
+            if oldest < first_ts + index < latest
+        ][offset:]
+        page, remainder = indexes[:limit], indexes[limit:]
+        messages = [
+            {
+                "type": "message",
+                "user": f"U{index % 10:08d}",
+                "text": self.filler,
+                "ts": f"{first_ts + index:.6f}",
+            }
+            for index in page
+        ]
+        return _Response(
+            {
+                "ok": True,
+                "messages": messages,
+                "has_more": bool(remainder),
+                "response_metadata": {"next_cursor": str(offset + limit) if remainder else ""},
+            }
+        )
+
+    def slack_profile(self, request: _Request) -> _Response:
+        user = request.query.get("user", "U0")
+        return _Response(
+            {"ok": True, "profile": {"real_name": f"User {user}", "display_name": user, "title": self.filler}}
+        )
+
+    def slack_post(self, request: _Request) -> _Response:
+        body = request.body if isinstance(request.body, dict) else {}
+        return _Response({"ok": True, "channel": body.get("channel"), "ts": f"{time.time():.6f}"})
+
+    # hue
+
+    def _hue_light(self, light_id: str) -> dict:
+        return {
+            "name": f"Bulb {light_id}",
+            "type": "Extended color light",
+            "state": dict(self.bulbs[light_id]),
+        }
+
+    def hue_lights(self, request: _Request) -> _Response:
+        return _Response({light_id: self._hue_light(light_id) for light_id in self.bulbs})
+
+    def hue_light(self, request: _Request, light_id: str) -> _Response:
+        if light_id not in self.bulbs:
+            return _Response([{"error": {"type": 3, "description": "resource not available"}}])
+        return _Response(self._hue_light(light_id))
+
+    def hue_set_state(self, request: _Request, light_id: str) -> _Response:
+        if light_id not in self.bulbs or not isinstance(request.body, dict):
+            return _Response([{"error": {"type": 3, "description": "resource not available"}}])
+        with self._lock:
+            self.bulbs[light_id].update(request.body)
+        return _Response(
+            [{"success": {f"/lights/{light_id}/state/{key}": value}} for key, value in request.body.items()]
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    "hands every request to the `StandIns` owned by the server, injecting latency and 429s on the way"
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, which Nagle + delayed ACKs would stall on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def _handle(self) -> None:
+        server: _Server = self.server
+        config = server.stand_ins.config
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        count = server.count_request()
+
+        if config.latency:
+            time.sleep(config.latency)
+        if config.rate_limit_every and count % config.rate_limit_every == 0:
+            server.count_rate_limited()
+            self._send(_Response({"error": "rate limited"}, 429, {"Retry-After": str(config.retry_after)}))
+            return
+
+        parts = urlsplit(self.path)
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            body = raw_body.decode(errors="replace")
+        request = _Request(
+            self.command,
+            self.headers.get(HOST_HEADER) or self.headers.get("Host", ""),
+            parts.path,
+            dict(parse_qsl(parts.query, keep_blank_values=True)),
+            body,
+        )
+        try:
+            response = server.stand_ins.dispatch(request)
+        except Exception as err:  # a broken route should show up as a 500, not a hung client
+            response = _Response({"error": repr(err)}, 500)
+        self._send(response)
+
+    def _send(self, response: _Response) -> None:
+        body = json.dumps(response.payload).encode()
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, stand_ins: StandIns) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.stand_ins = stand_ins
+        self.requests = 0
+        self.rate_limited = 0
+        self._counter_lock = threading.Lock()
+
+    def count_request(self) -> int:
+        with self._counter_lock:
+            self.requests += 1
+            return self.requests
+
+    def count_rate_limited(self) -> None:
+        with self._counter_lock:
+            self.rate_limited += 1
+
+
+class _RedirectAdapter(HTTPAdapter):
+    "sends every request to the stand-in server, recording the host it was meant for in a header"
+
+    def __init__(self, address: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.address = address
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.headers[HOST_HEADER] = parts.netloc
+        request.url = urlunsplit(("http", self.address, parts.path, parts.query, ""))
+        return super().send(request, **kwargs)
+
+
+class StandInServer:
+    """Runs the stand-ins on a local port in a background thread. Use as a context manager.
+
+    Args:
+        `config` (StandInConfig): the data and behaviour of the stand-ins, defaults to `StandInConfig()`
+    """
+
+    def __init__(self, config: StandInConfig = None) -> None:
+        self.config = config or StandInConfig()
+        self.stand_ins = StandIns(self.config)
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        "`host:port` the stand-ins are listening on"
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        "how many requests have been received, including ones answered with an injected 429"
+        return self._server.requests if self._server else 0
+
+    @property
+    def rate_limited(self) -> int:
+        "how many requests were answered with an injected 429"
+        return self._server.rate_limited if self._server else 0
+
+    def start(self) -> "StandInServer":
+        if self._server is None:
+            self._server = _Server(self.stand_ins)
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def transport(self, **kwargs) -> HttpTransport:
+        "an `HttpTransport` that sends everything to these stand-ins. Takes the same arguments as `HttpTransport`"
+        transport = HttpTransport(**kwargs)
+        adapter = _RedirectAdapter(
+            self.address,
+            pool_connections=kwargs.get("pool_connections", 10),
+            pool_maxsize=transport.pool_maxsize,
+        )
+        transport.session.mount("https://", adapter)
+        transport.session.mount("http://", adapter)
+        return transport
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
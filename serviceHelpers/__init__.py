@@ -1,10 +1,62 @@
-from serviceHelpers.models import ZendeskOrg, ZendeskTicket, ZendeskUser, ZendeskWorklog
-from serviceHelpers.models import hueBulb
-from serviceHelpers.models import JiraTicket, JiraDetails
+"""Light helpers for Slack, Trello, Zendesk, Freshdesk, Jira, Gmail, Habitica and Hue.
+
+Importing the package is cheap: each helper module is only imported the first time it's used,
+e.g. `serviceHelpers.slack` doesn't pull in the google client libraries that `serviceHelpers.gmail` needs.
+Nothing is read from `.env` on import any more - call `load_env()` to opt in.
+"""
+
+import importlib
 
 __version__ = "3.3.0"
 
-from dotenv import load_dotenv
-load_dotenv()
+_SUBMODULES = frozenset(
+    {
+        "async_helpers",
+        "freshdesk",
+        "gmail",
+        "habitica",
+        "hue",
+        "instrumentation",
+        "jira",
+        "models",
+        "response_cache",
+        "slack",
+        "trello",
+        "trello_webhook",
+        "trello_workspace",
+        "zendesk",
+    }
+)
+# model modules the package used to import eagerly, still importable from the top level
+_MODEL_MODULES = frozenset(
+    {
+        "JiraDetails",
+        "JiraTicket",
+        "ZendeskOrg",
+        "ZendeskTicket",
+        "ZendeskUser",
+        "ZendeskWorklog",
+        "hueBulb",
+    }
+)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _MODEL_MODULES:
+        return importlib.import_module(f"{__name__}.models.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | _MODEL_MODULES)
+
+
+def load_env(dotenv_path: str = None, override: bool = False) -> bool:
+    """loads environment variables from a `.env` file, which is searched for from the working directory if no path is given.
+
+    Requires `python-dotenv`. Returns True if any variables were set."""
+    from dotenv import load_dotenv
 
-print("Init successful!")
+    return load_dotenv(dotenv_path, override=override)
@@ -0,0 +1,413 @@
+"""Shared plumbing used by every helper.
+
+Holds the pooled HTTP transport that each helper's `_request_and_validate` goes through,
+so repeated calls against the same host reuse a kept-alive connection instead of paying
+for a fresh TCP+TLS handshake every time, and the per-credential rate limiters that
+throttle those calls before the service starts answering with 429s.
+Also holds the opt-in conditional GET cache helpers can be given, which turns repeat
+polls of unchanged resources into a header round trip."""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from serviceHelpers.instrumentation import RequestEvent, endpoint_template
+
+_LO = logging.getLogger("serviceHelpers.common")
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_RATE_LIMIT_RETRIES = 5
+# how many requests bulk operations keep in flight at once
+DEFAULT_CONCURRENCY = 4
+
+# (requests per second, burst size) used when a service's limiter is first created.
+# These are deliberately at the conservative end of each service's published limits -
+# the `X-RateLimit-Remaining` style headers tighten them further at runtime.
+SERVICE_RATE_LIMITS = {
+    "trello": (10, 50),  # 100 requests per 10 seconds per token
+    "zendesk": (200 / 60, 20),  # 200 requests per minute on the smallest plans
+    "freshdesk": (100 / 60, 10),
+    "jira": (10, 20),
+    "slack": (50 / 60, 5),  # tier 3 methods
+    "habitica": (30 / 60, 5),  # 30 requests per minute
+    "hue": (10, 10),  # the bridge handles about 10 light commands a second
+}
+DEFAULT_RATE_LIMIT = (5, 10)
+
+# header names services use to say how many calls are left in the current window
+_REMAINING_HEADERS = (
+    "X-RateLimit-Remaining",
+    "X-Rate-Limit-Remaining",
+    "x-rate-limit-api-token-remaining",
+    "x-rate-limit-api-key-remaining",
+)
+
+
+class RateLimiter:
+    """A thread-safe token bucket, shared by every call made with one service credential.
+
+    Callers `acquire()` a token before sending a request, and hand the response to `update()`
+    so that `Retry-After` and `X-RateLimit-Remaining` style headers throttle the calls that follow.
+
+    Args:
+        `rate` (float): how many tokens are added to the bucket per second
+        `capacity` (int): the most tokens the bucket holds, i.e. the largest burst allowed
+        `service` (str): the name of the service the bucket is for, used to label instrumentation events
+    """
+
+    def __init__(self, rate: float, capacity: int, service: str = None) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.service = service
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self) -> float:
+        "blocks until a request may be sent. Returns the number of seconds spent waiting"
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds: float) -> None:
+        "stops any request being sent for the given number of seconds, e.g. after a 429"
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def update(self, response) -> None:
+        "reads the rate limit headers from a response and throttles accordingly"
+        headers = getattr(response, "headers", None) or {}
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None and response.status_code in (429, 503):
+            self.block_for(retry_after)
+            return
+        for header in _REMAINING_HEADERS:
+            remaining = headers.get(header)
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            with self._lock:
+                self._tokens = min(self._tokens, remaining)
+            return
+
+
+def parse_retry_after(value) -> float:
+    "turns a `Retry-After` header (either seconds or an HTTP date) into seconds, or None if absent/unparsable"
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(service: str, credential) -> RateLimiter:
+    """returns the limiter for a service and credential, creating it on first use.
+
+    Every helper built with the same credential shares the one bucket, as the service counts their calls together.
+    """
+    fingerprint = hashlib.sha256(str(credential).encode("utf-8")).hexdigest()
+    key = (service, fingerprint)
+    with _RATE_LIMITERS_LOCK:
+        if key not in _RATE_LIMITERS:
+            rate, capacity = SERVICE_RATE_LIMITS.get(service, DEFAULT_RATE_LIMIT)
+            _RATE_LIMITERS[key] = RateLimiter(rate, capacity, service=service)
+        return _RATE_LIMITERS[key]
+
+
+def _fingerprint(*parts) -> str:
+    "hashes the parts into a fixed length key, so credentials in params/headers aren't held in cache keys"
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class ConditionalCache:
+    """An opt-in, in-memory cache of GET responses keyed by URL, params and credentials.
+
+    Stores the `ETag` / `Last-Modified` validators alongside the parsed body. Repeat GETs are sent
+    as conditional requests, and a `304 Not Modified` answer hands back the previously parsed
+    object without downloading or parsing the payload again.
+    The object returned on a 304 is the same one returned before, so callers shouldn't mutate it.
+
+    Args:
+        `max_entries` (int): how many responses to keep, the least recently used are dropped first
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, params: dict = None, headers: dict = None) -> str:
+        "builds the cache key for a request, taking credentials into account"
+        params = sorted((params or {}).items())
+        auth = (headers or {}).get("Authorization")
+        return _fingerprint(url, params, auth)
+
+    def send(self, transport, url: str, params: dict = None, headers: dict = None, **kwargs):
+        """sends a GET through `transport`, made conditional if a previous response is cached
+
+        returns:
+            a tuple of (`response`, `cached`) - `cached` is the previously parsed object when the response is a 304, otherwise None
+        """
+        key = self.make_key(url, params, headers)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            etag, last_modified, _ = entry
+            if etag is not None:
+                request_headers["If-None-Match"] = etag
+            if last_modified is not None:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = transport.get(url, params=params, headers=request_headers, **kwargs)
+        if response.status_code != 304:
+            return response, None
+        if entry is None:
+            # we never asked for a conditional response, so this isn't ours to answer - try again plainly
+            _LO.warning("Unexpected 304 from %s, retrying without validators", url)
+            return transport.get(url, params=params, headers=headers, **kwargs), None
+        return response, entry[2]
+
+    def store(self, response, parsed, url: str, params: dict = None, headers: dict = None) -> None:
+        "keeps the parsed body of a successful response, if the response carried any validators"
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return
+        key = self.make_key(url, params, headers)
+        with self._lock:
+            self._entries[key] = (etag, last_modified, parsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        "forgets every cached response"
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class HttpTransport:
+    """A pooled, keep-alive HTTP transport that helpers share.
+
+    Args:
+        `pool_connections` (int): how many distinct hosts to keep a connection pool for
+        `pool_maxsize` (int): the most connections kept open to any single host
+        `timeout` (float|tuple): timeout applied to any call that doesn't supply its own
+        `max_retries` (int): connection-level retries (DNS, refused connections) performed by urllib3
+        `rate_limit_retries` (int): how many times a 429 response is retried before it is handed back to the caller
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries: int = 0,
+        rate_limit_retries: int = DEFAULT_RATE_LIMIT_RETRIES,
+    ) -> None:
+        self.timeout = timeout
+        self.rate_limit_retries = rate_limit_retries
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        # helpers authenticate per call, so nothing should be carried between them via cookies
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.hooks = []
+
+    def add_hook(self, hook) -> None:
+        "registers a callable that is handed a `RequestEvent` after every call made through this transport"
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        "unregisters a hook added with `add_hook`"
+        self.hooks.remove(hook)
+
+    def _emit(self, event: RequestEvent) -> None:
+        for hook in list(self.hooks):
+            try:
+                hook(event)
+            except Exception as err:  # a broken hook mustn't break the request
+                _LO.warning("Instrumentation hook %s failed - %s", hook, err)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        limiter: RateLimiter = None,
+        service: str = None,
+        page: int = None,
+        **kwargs,
+    ) -> requests.Response:
+        """sends a request through the pooled session. Accepts the same keyword arguments as `requests.request`
+
+        If a `limiter` is given the call waits for it before sending, and feeds it the response headers.
+        429 responses are retried after the `Retry-After` period (or an exponential backoff when there isn't one)
+        up to `rate_limit_retries` times, after which the 429 is returned to the caller.
+
+        `service` and `page` only label the `RequestEvent` handed to any hooks. `service` defaults to the limiter's."""
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        if service is None:
+            service = limiter.service if limiter is not None else urlsplit(url).hostname
+        started = time.perf_counter()
+        response, retries = None, 0
+        try:
+            response, retries = self._send_with_retries(method, url, limiter, kwargs)
+        finally:
+            if self.hooks:
+                self._emit(
+                    RequestEvent(
+                        service=service,
+                        endpoint=endpoint_template(url),
+                        method=method.upper(),
+                        status=None if response is None else response.status_code,
+                        bytes=0 if response is None else len(response.content),
+                        latency=time.perf_counter() - started,
+                        retries=retries,
+                        page=page,
+                    )
+                )
+        return response
+
+    def _send_with_retries(self, method, url, limiter: RateLimiter, kwargs: dict):
+        "returns the final response, and how many times it was retried after a 429"
+        retries = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            response = self.session.request(method, url, **kwargs)
+            if limiter is not None:
+                limiter.update(response)
+            if response.status_code != 429 or retries >= self.rate_limit_retries:
+                return response, retries
+
+            retries += 1
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            delay = pow(2, retries) if delay is None else delay
+            _LO.warning(
+                "Rate limited by %s, retry %s of %s in %ss",
+                url,
+                retries,
+                self.rate_limit_retries,
+                delay,
+            )
+            if limiter is not None:
+                limiter.block_for(delay)
+            else:
+                time.sleep(delay)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        "sends a GET request"
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        "sends a POST request"
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs) -> requests.Response:
+        "sends a PUT request"
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> requests.Response:
+        "sends a DELETE request"
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        "closes every pooled connection"
+        self.session.close()
+
+
+_DEFAULT_TRANSPORT = None
+_DEFAULT_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    "returns the process-wide transport used by any helper that wasn't given one explicitly"
+    global _DEFAULT_TRANSPORT
+    with _DEFAULT_TRANSPORT_LOCK:
+        if _DEFAULT_TRANSPORT is None:
+            _DEFAULT_TRANSPORT = HttpTransport()
+        return _DEFAULT_TRANSPORT
+
+
+def set_default_transport(transport: HttpTransport) -> None:
+    "replaces the process-wide transport, e.g. to change pool sizes or timeouts for every helper at once"
+    global _DEFAULT_TRANSPORT
+    with _DEFAULT_TRANSPORT_LOCK:
+        _DEFAULT_TRANSPORT = transport
+
+
+def run_concurrently(func, items, max_workers: int = DEFAULT_CONCURRENCY) -> list:
+    """calls `func` on each item with up to `max_workers` threads, returning the results in the order of `items`
+
+    The calls still go through the helper's rate limiter, so this only fills whatever budget the limiter allows.
+    An exception raised by any call is re-raised here."""
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(func, items))
@@ -0,0 +1,368 @@
+"""The card cache behind `trello._cached_cards`.
+
+`CardCache` is a plain `card id -> card` dict as far as callers are concerned, but also keeps each
+list's cards sorted by `pos`, so the cards on a list - and the position a new card should take on
+it - can be looked up without scanning and re-sorting the whole board.
+
+It also answers `find_trello_card(s)` searches: a trigram index over card names and descriptions
+narrows a regex down to the cards that contain the literal text it requires, so only those are
+actually matched against it.
+
+Cards can be fetched with only some of their fields. The set of fields a fetch returns is its
+"view", and the cache notes the view each card was fetched with, so callers can tell whether a
+cached card has what they need or has to be fetched again.
+"""
+
+import re
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+from functools import lru_cache
+
+ALL_FIELDS = "all"
+# the fields that only come back when asked for, as their own query parameters
+_EXTRAS = ("customFieldItems", "checklists")
+# what trello sends for a card when no projection is asked for
+DEFAULT_VIEW = frozenset({ALL_FIELDS})
+
+_QUANTIFIERS = "*?{"
+_METACHARACTERS = ".^$+[]()|"
+_VERBOSE_FLAG = re.compile(r"\(\?[aiLmsux-]*x")
+# escapes followed by characters that belong to them, e.g. `\x41`. Digits (octal, backreferences) too
+_ESCAPES_WITH_ARGUMENTS = frozenset("xuUN")
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> re.Pattern:
+    "compiles a search pattern, remembering the most recently used ones"
+    return re.compile(pattern)
+
+
+def required_literals(pattern: str) -> list:
+    """the runs of literal text that any match of `pattern` must contain.
+
+    Errs on the side of returning less: anything it doesn't fully understand (alternation, groups,
+    classes, escapes like `\\d`, verbose mode) just ends the current run or, for top level
+    alternation, verbose mode and escapes that take an argument (`\\x41`, `\\101`), returns nothing at all."""
+    if _VERBOSE_FLAG.search(pattern):
+        return []
+    literals = []
+    run = []
+    depth = 0
+    index = 0
+
+    def end_run():
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    while index < len(pattern):
+        char = pattern[index]
+        index += 1
+        if char == "\\":
+            escaped = pattern[index : index + 1]
+            index += 1
+            if escaped in _ESCAPES_WITH_ARGUMENTS or escaped.isdigit():
+                # the characters that follow are part of the escape, not literal text
+                return []
+            if depth == 0 and escaped and not escaped.isalnum():
+                run.append(escaped)
+            else:
+                end_run()
+            continue
+        if char == "[":
+            end_run()
+            # skip the class at any depth, so brackets inside it aren't taken for groups,
+            # allowing for a leading `]` or `^]` and escaped characters
+            if pattern[index : index + 1] == "^":
+                index += 1
+            if pattern[index : index + 1] == "]":
+                index += 1
+            while index < len(pattern) and pattern[index] != "]":
+                index += 2 if pattern[index] == "\\" else 1
+            index += 1
+        elif char == "(":
+            depth += 1
+            end_run()
+        elif char == ")":
+            depth = max(depth - 1, 0)
+            end_run()
+        elif depth > 0:
+            continue
+        elif char == "|":
+            return []
+        elif char in _QUANTIFIERS:
+            # the previous character might not be there at all
+            if run:
+                run.pop()
+            end_run()
+            if char == "{":
+                closing = pattern.find("}", index)
+                index = len(pattern) if closing == -1 else closing + 1
+        elif char in _METACHARACTERS:
+            end_run()
+        else:
+            run.append(char)
+    end_run()
+    return literals
+
+
+def card_view(
+    fields=None, custom_field_items: bool = False, checklists: bool = False
+) -> frozenset:
+    """the view a fetch with these projections returns
+
+    Args:
+        `fields` (list|str): the card fields wanted, as a list or comma separated string. None or `"all"` for all of them
+        `custom_field_items` (bool): include the card's `customFieldItems`
+        `checklists` (bool): include the card's `checklists`
+    """
+    if fields is None or fields == ALL_FIELDS:
+        view = {ALL_FIELDS}
+    else:
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        view = {field.strip() for field in fields if field.strip()} | {"id"}
+    if custom_field_items:
+        view.add("customFieldItems")
+    if checklists:
+        view.add("checklists")
+    return frozenset(view)
+
+
+def view_covers(held: frozenset, wanted: frozenset) -> bool:
+    "whether a card fetched with the `held` view has every field in `wanted`"
+    missing = wanted - held
+    if ALL_FIELDS in held:
+        missing = {field for field in missing if field in _EXTRAS}
+    return not missing
+
+
+def view_params(view: frozenset) -> dict:
+    "the query parameters that fetch cards with `view`"
+    if ALL_FIELDS in view:
+        fields = ALL_FIELDS
+    else:
+        fields = ",".join(sorted(field for field in view if field not in _EXTRAS))
+    params = {"fields": fields}
+    if "customFieldItems" in view:
+        params["customFieldItems"] = "true"
+    if "checklists" in view:
+        params["checklists"] = "all"
+    return params
+
+
+def _trigrams(text: str) -> set:
+    # casefold is applied character by character, so a literal in the text is still in it afterwards.
+    # It doesn't fold the way re.IGNORECASE does (İ, ı), so case-insensitive patterns skip the index
+    text = text.casefold()
+    return {text[index : index + 3] for index in range(len(text) - 2)}
+
+
+def _text_of(card) -> list:
+    "the searchable fields of a card"
+    if not isinstance(card, Mapping):
+        return []
+    return [
+        value for value in (card.get("name"), card.get("desc")) if isinstance(value, str)
+    ]
+
+
+def _pos(card: dict) -> float:
+    "the card's position as a float, 0 if it has none"
+    try:
+        return float(card.get("pos") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CardCache(dict):
+    """A dict of card id -> card, indexed by list and sorted by position.
+
+    The index is updated as cards are set and removed, so cards should be replaced rather than
+    having their `idList` or `pos` edited in place.
+
+    Cards can be any mapping. With `card_type` set, plain dicts are converted to it as they're
+    added, e.g. to `TrelloCard`.
+
+    `view` is the view most cards were fetched with. Cards fetched with another are added with
+    `put`, and keep that view through later replacements until they're removed.
+    """
+
+    def __init__(self, cards: dict = None, card_type: type = None) -> None:
+        super().__init__()
+        self._card_type = card_type
+        self._lists = {}  # list id -> [(pos, card id), ...] kept sorted
+        self._entries = {}  # card id -> (list id, (pos, card id)) as indexed, for removal
+        self._sequence = {}  # card id -> insertion number, to give search results in dict order
+        self._next_sequence = 0
+        self._ids = {}  # the `id` inside each card -> the keys it's cached under
+        self._text_index = None  # trigram -> card ids, built by the first search
+        self.view = DEFAULT_VIEW
+        self._views = {}  # card id -> view, for the cards not fetched with `view`
+        if cards:
+            self.update(cards)
+
+    def __reduce__(self):
+        # dict's own reduce sets items before __init__ has run, so rebuild through it instead
+        state = {"view": self.view, "_views": dict(self._views)}
+        return (type(self), (dict(self), self._card_type), state)
+
+    def _index(self, card_id, card) -> None:
+        list_id = card.get("idList") if isinstance(card, Mapping) else None
+        entry = (_pos(card) if isinstance(card, Mapping) else 0.0, card_id)
+        insort(self._lists.setdefault(list_id, []), entry)
+        self._entries[card_id] = (list_id, entry)
+        inner_id = card.get("id") if isinstance(card, Mapping) else None
+        self._ids.setdefault(inner_id, set()).add(card_id)
+        if self._text_index is not None:
+            self._index_text(card_id, card)
+
+    def _unindex(self, card_id, card) -> None:
+        list_id, entry = self._entries.pop(card_id)
+        positions = self._lists[list_id]
+        del positions[bisect_left(positions, entry)]
+        if not positions:
+            del self._lists[list_id]
+        inner_id = card.get("id") if isinstance(card, Mapping) else None
+        keys = self._ids.get(inner_id, set())
+        keys.discard(card_id)
+        if not keys:
+            self._ids.pop(inner_id, None)
+        if self._text_index is not None:
+            for trigram in _trigrams("\n".join(_text_of(card))):
+                postings = self._text_index.get(trigram)
+                if postings is not None:
+                    postings.discard(card_id)
+                    if not postings:
+                        del self._text_index[trigram]
+
+    def _index_text(self, card_id, card) -> None:
+        for trigram in _trigrams("\n".join(_text_of(card))):
+            self._text_index.setdefault(trigram, set()).add(card_id)
+
+    def __setitem__(self, card_id, card) -> None:
+        if self._card_type is not None and type(card) is dict:
+            card = self._card_type(card)
+        if card_id in self._entries:
+            self._unindex(card_id, super().__getitem__(card_id))
+        else:
+            self._sequence[card_id] = self._next_sequence
+            self._next_sequence += 1
+        super().__setitem__(card_id, card)
+        self._index(card_id, card)
+
+    def __delitem__(self, card_id) -> None:
+        card = super().__getitem__(card_id)
+        super().__delitem__(card_id)
+        self._unindex(card_id, card)
+        del self._sequence[card_id]
+        self._views.pop(card_id, None)
+
+    def pop(self, card_id, *default):
+        if card_id not in self:
+            if default:
+                return default[0]
+            raise KeyError(card_id)
+        card = self[card_id]
+        del self[card_id]
+        return card
+
+    def popitem(self) -> tuple:
+        card_id, card = super().popitem()
+        self._unindex(card_id, card)
+        del self._sequence[card_id]
+        self._views.pop(card_id, None)
+        return card_id, card
+
+    def setdefault(self, card_id, card=None):
+        if card_id not in self:
+            self[card_id] = card
+        return self[card_id]
+
+    def update(self, *args, **kwargs) -> None:
+        for card_id, card in dict(*args, **kwargs).items():
+            self[card_id] = card
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        super().clear()
+        self._lists = {}
+        self._entries = {}
+        self._sequence = {}
+        self._ids = {}
+        self._views = {}
+        if self._text_index is not None:
+            self._text_index = {}
+
+    def put(self, card_id, card, view: frozenset) -> None:
+        "adds or replaces a card, noting the view it was fetched with"
+        self[card_id] = card
+        if view == self.view:
+            self._views.pop(card_id, None)
+        else:
+            self._views[card_id] = view
+
+    def view_of(self, card_id) -> frozenset:
+        "the view a cached card was fetched with"
+        return self._views.get(card_id, self.view)
+
+    def other_views(self) -> dict:
+        "`{card id: view}` for the cards fetched with a view other than `view`"
+        return dict(self._views)
+
+    def list_positions(self, list_id) -> list:
+        "the `(pos, card id)` pairs for a list, sorted by position. This is the index itself - don't modify it"
+        return self._lists.get(list_id, [])
+
+    def cards_on_list(self, list_id) -> dict:
+        "the cards on a list as `{card id: card}`, sorted by position"
+        return {card_id: self[card_id] for _, card_id in self.list_positions(list_id)}
+
+    def _candidates(self, pattern) -> list:
+        """the ids of the cards that could match `pattern`, in cache order.
+
+        That's any card whose `id` is the pattern, plus the cards containing every trigram of
+        the literal text the pattern requires (or every card, if it requires none, or ignores case)."""
+        source = pattern.pattern if isinstance(pattern, re.Pattern) else pattern
+        if not isinstance(source, str):
+            return list(self)
+        compiled = pattern if isinstance(pattern, re.Pattern) else compile_pattern(source)
+        if compiled.flags & (re.VERBOSE | re.IGNORECASE):
+            return list(self)
+        trigrams = set()
+        for literal in required_literals(source):
+            trigrams |= _trigrams(literal)
+        if not trigrams:
+            return list(self)
+
+        if self._text_index is None:
+            self._text_index = {}
+            for card_id, card in self.items():
+                self._index_text(card_id, card)
+        postings = sorted(
+            (self._text_index.get(trigram, set()) for trigram in trigrams), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+        candidates |= self._ids.get(source, set())
+        return sorted(candidates, key=self._sequence.__getitem__)
+
+    def search(self, pattern):
+        """yields the cards whose `id` equals `pattern`, or whose name or description it matches, in cache order
+
+        `pattern` can be a string or a compiled regex. Raises `re.error` for invalid patterns."""
+        compiled = pattern if isinstance(pattern, re.Pattern) else compile_pattern(pattern)
+        for card_id in self._candidates(pattern):
+            card = self[card_id]
+            if not isinstance(card, Mapping):
+                continue
+            if card.get("id", "") == pattern or any(
+                compiled.search(text) for text in _text_of(card)
+            ):
+                yield card
@@ -0,0 +1,189 @@
+"""Asyncio variants of the zendesk, FreshDesk, Jira and trello helpers.
+
+Each async class wraps its blocking counterpart and exposes the same public methods as coroutines,
+so the parsing and the returned model objects (`ZendeskTicket`, `FreshdeskTicket`, `JiraTicket`,
+`JiraWorklog`...) are exactly the ones the blocking helpers produce.
+The calls run on a thread pool owned by an `AsyncClient`, go through one pooled `HttpTransport`,
+and a semaphore per host bounds how many may be in flight at once - so fanning out hundreds of
+audit or worklog fetches with `asyncio.gather` doesn't flood the API.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from serviceHelpers._common import HttpTransport
+from serviceHelpers.freshdesk import FreshDesk
+from serviceHelpers.jira import Jira
+from serviceHelpers.models.JiraDetails import JiraDetails
+from serviceHelpers.trello import trello, HOST as TRELLO_HOST
+from serviceHelpers.zendesk import zendesk
+
+_LO = logging.getLogger("serviceHelpers.async")
+
+DEFAULT_MAX_PER_HOST = 8
+DEFAULT_MAX_WORKERS = 32
+
+_EXHAUSTED = object()
+
+
+class AsyncClient:
+    """The executor, transport and per-host concurrency limits shared by the async helpers.
+
+    Args:
+        `max_per_host` (int): the most calls allowed in flight against any single host
+        `max_workers` (int): the size of the thread pool the blocking calls run on
+        `transport` (HttpTransport): the pooled transport to send requests through. If omitted one is created with a pool big enough for `max_per_host`
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        transport: HttpTransport = None,
+    ) -> None:
+        self.max_per_host = max_per_host
+        self._owns_transport = transport is None
+        self.transport = (
+            transport
+            if transport is not None
+            else HttpTransport(pool_maxsize=max(max_per_host, 1))
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="serviceHelpers"
+        )
+        # asyncio primitives belong to a loop, so keep one set of semaphores per running loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        per_loop = self._semaphores.setdefault(loop, {})
+        if host not in per_loop:
+            per_loop[host] = asyncio.Semaphore(self.max_per_host)
+        return per_loop[host]
+
+    async def run(self, host: str, func, *args, **kwargs):
+        "runs a blocking callable on the thread pool, holding one of the slots for `host` while it runs"
+        async with self._get_semaphore(host):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(func, *args, **kwargs)
+            )
+
+    async def iterate(self, host: str, gen_func, *args, **kwargs):
+        "turns a blocking generator into an async generator, fetching each item on the thread pool"
+        generator = gen_func(*args, **kwargs)
+        while True:
+            item = await self.run(host, next, generator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    def close(self) -> None:
+        "stops the thread pool, and closes the transport if this client created it"
+        self._executor.shutdown(wait=False)
+        if self._owns_transport:
+            self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+_DEFAULT_CLIENT = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def get_default_async_client() -> AsyncClient:
+    "returns the process-wide client used by any async helper that wasn't given one explicitly"
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = AsyncClient()
+        return _DEFAULT_CLIENT
+
+
+class _AsyncHelper:
+    """Exposes the public methods of a blocking helper as coroutines.
+
+    Generator methods (`iter_*`) become async generators. Attributes that aren't callable are read straight from the wrapped helper."""
+
+    def __init__(self, helper, host: str, client: AsyncClient) -> None:
+        self.helper = helper
+        self.client = client
+        self._host = host
+
+    def __getattr__(self, name):
+        attr = getattr(self.helper, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(attr):
+
+            def iterator(*args, **kwargs):
+                return self.client.iterate(self._host, attr, *args, **kwargs)
+
+            return functools.wraps(attr)(iterator)
+
+        async def method(*args, **kwargs):
+            return await self.client.run(self._host, attr, *args, **kwargs)
+
+        return functools.wraps(attr)(method)
+
+
+class AsyncZendesk(_AsyncHelper):
+    """Coroutine version of `zendesk`, e.g. `await AsyncZendesk(host, key).get_worklogs(...)`
+
+    Args:
+        `host` (str): the zendesk host, e.g. `example.zendesk.com`
+        `api_key` (str): the base64 encoded credentials used for basic auth
+        `client` (AsyncClient): the shared client to run on, defaults to the process-wide one
+    """
+
+    def __init__(self, host: str, api_key, client: AsyncClient = None) -> None:
+        client = client if client is not None else get_default_async_client()
+        super().__init__(zendesk(host, api_key, transport=client.transport), host, client)
+
+
+class AsyncFreshDesk(_AsyncHelper):
+    """Coroutine version of `FreshDesk`. Note, api_key should not be base-64 encoded already.
+
+    `client` is the shared `AsyncClient` to run on, defaults to the process-wide one"""
+
+    def __init__(self, host, api_key: str, client: AsyncClient = None) -> None:
+        client = client if client is not None else get_default_async_client()
+        super().__init__(FreshDesk(host, api_key, transport=client.transport), host, client)
+
+
+class AsyncJira(_AsyncHelper):
+    """Coroutine version of `Jira`.
+
+    `client` is the shared `AsyncClient` to run on, defaults to the process-wide one"""
+
+    def __init__(self, config: JiraDetails, client: AsyncClient = None) -> None:
+        client = client if client is not None else get_default_async_client()
+        super().__init__(Jira(config, transport=client.transport), config.host, client)
+
+
+class AsyncTrello(_AsyncHelper):
+    """Coroutine version of `trello`. Calls made through the same instance share one card cache and overlap
+    like any other, the helper holds its `lock` around the cache work but not the requests.
+
+    Args:
+        `board_id` (str): the id of the board to interact with
+        `key` (str): the trello api key
+        `token` (str): the trello api token for the authenticated user
+        `client` (AsyncClient): the shared client to run on, defaults to the process-wide one
+    """
+
+    def __init__(self, board_id, key, token, client: AsyncClient = None) -> None:
+        client = client if client is not None else get_default_async_client()
+        super().__init__(
+            trello(board_id, key, token, transport=client.transport), TRELLO_HOST, client
+        )
@@ -4,7 +4,9 @@ import json
 import logging
 from datetime import datetime
 from urllib.parse import quote_plus
-import requests
+
+from serviceHelpers._common import HttpTransport, get_default_transport, get_rate_limiter
+from serviceHelpers.response_cache import SqliteResponseCache
 
 # get all open FD tickets
 # get all open trello cards
@@ -20,30 +22,42 @@ TIMESTAMP_FORMAT = r"%Y-%m-%dT%H:%M:%SZ"
 class FreshDesk:
     "Represents a single freshdesk tenancy"
 
-    def __init__(self, host, api_key: str) -> None:
-        "Note, api_key should not be base-64 encoded already"
+    def __init__(
+        self,
+        host,
+        api_key: str,
+        transport: HttpTransport = None,
+        response_cache: SqliteResponseCache = None,
+    ) -> None:
+        """Note, api_key should not be base-64 encoded already.
+
+        `transport` is the pooled transport to send requests through, defaults to the shared one
+        `response_cache` is an opt-in `SqliteResponseCache`, serving GETs it has a TTL for (e.g. agents) from disk"""
         self.host = host
+        self.transport = transport if transport is not None else get_default_transport()
         key_as_bytes = api_key.encode("utf-8")
         encoded_bytes = base64.b64encode(key_as_bytes)
         self.api_key = encoded_bytes.decode("utf-8")
+        self._limiter = get_rate_limiter("freshdesk", self.api_key)
+        self.response_cache = response_cache
 
     def search_fd_tickets(self, query_string) -> dict:
         """now paginated! See the search definition here:
 
         https://developers.freshdesk.com/api/#ticket_attributes"""
+        return {ticket.id: ticket for ticket in self.iter_tickets(query_string)}
 
-        url = f'https://{self.host}/api/v2/search/tickets?query="{query_string}"'
+    def iter_tickets(self, query_string):
+        """yields a `FreshdeskTicket` for each search result, fetching a page at a time as they're consumed
 
-        ticket_dict = {}
-        pages = self._request_and_validate_paginated(url)
-        for page in pages:
+        Takes the same query as `search_fd_tickets`."""
+        url = f'https://{self.host}/api/v2/search/tickets?query="{query_string}"'
+        for page in self._iter_pages(url):
+            page: dict
             for ticket_j in page.get("results", []):
-                page: dict
                 ticket_o = FreshdeskTicket()
                 ticket_o.from_dict(ticket_j)
-                ticket_dict[ticket_o.id] = ticket_o
-
-        return ticket_dict
+                yield ticket_o
 
     def _get_default_headers(self) -> dict:
         "headers with auth token for requests"
@@ -54,24 +68,12 @@ class FreshDesk:
         "Returns the worklogs for a given ticket"
 
         url = f"https://{self.host}/api/v2/tickets/{ticket_id}/time_entries"
-        pages = self._request_and_validate_paginated(url)
-
-        worklogs = []
-        for page in pages:
-            for worklog in page:
-                worklogs.append(worklog)
-        return worklogs
+        return [worklog for page in self._iter_pages(url) for worklog in page]
 
     def fetch_comments(self, ticket: str) -> list:
         "Returns the comments for a given ticket"
         url = f"https://{self.host}/api/v2/tickets/{ticket}/conversations?"
-        pages = self._request_and_validate_paginated(url)
-
-        comments = []
-        for page in pages:
-            for comment in page:
-                comments.append(comment)
-        return comments
+        return [comment for page in self._iter_pages(url) for comment in page]
 
     def get_fd_tickets_updated_on(self, targetdate: str):
         "expects a string in the format %Y-%m-%d"
@@ -81,24 +83,13 @@ class FreshDesk:
         "returns a list of dictionaries of parsed JSON representing worklogs representing a ticketID"
 
         url = f"https://{self.host}/api/v2/tickets/{ticketID}/time_entries"
-        pages = self._request_and_validate_paginated(url)
-        worklogs = []
-        for page in pages:
-            for worklog in page:
-                worklogs.append(worklog)
-        return worklogs
+        return [worklog for page in self._iter_pages(url) for worklog in page]
 
     def get_comments(self, ticket_id):
         "retrieve the comments on a ticket. Can be an int or a str"
         #'https://domain.freshdesk.com/api/v2/tickets/1/conversations?page=2'
         url = url = f"https://{self.host}/api/v2/tickets/{ticket_id}/conversations"
-        pages = self._request_and_validate_paginated(url)
-
-        comments = []
-        for page in pages:
-            for comment in page:
-                comments.append(comment)
-        return comments
+        return [comment for page in self._iter_pages(url) for comment in page]
 
     def search_agent(self, email: str = None, agent_id=None):
         "Returns the first agent found that matches either the email or the id"
@@ -167,19 +158,38 @@ class FreshDesk:
             agent_o.from_dict(agent_j[0])
         return agent_o
 
-    def _request_and_validate(self, url, headers=None, body=None, method="get") -> dict:
-        "internal method to request and return"
+    def _request_and_validate(
+        self, url, headers=None, body=None, method="get", page=None
+    ) -> dict:
+        "internal method to request and return. `page` labels the request for instrumentation when paginating"
         if isinstance(body, dict):
             body = json.dumps(body)
         if headers is None:
             headers = self._get_default_headers()
+        use_response_cache = (
+            self.response_cache is not None and method == "get" and body is None
+        )
+        if use_response_cache:
+            cached = self.response_cache.get(url, headers=headers)
+            if cached is not None:
+                return cached
         try:
             if method == "get":
-                result = requests.get(url=url, headers=headers, data=body)
+                result = self.transport.get(
+                    url=url,
+                    headers=headers,
+                    data=body,
+                    limiter=self._limiter,
+                    page=page,
+                )
             elif method == "post":
-                result = requests.post(url=url, headers=headers, data=body)
+                result = self.transport.post(
+                    url=url, headers=headers, data=body, limiter=self._limiter
+                )
             elif method == "put":
-                result = requests.put(url=url, headers=headers, data=body)
+                result = self.transport.put(
+                    url=url, headers=headers, data=body, limiter=self._limiter
+                )
         except (ConnectionError) as err:
             _LO.error("Couldn't connect to FD %s - %s", url, err)
             return {}
@@ -196,25 +206,28 @@ class FreshDesk:
         except json.JSONDecodeError as err:
             _LO.error("Couldn't parse JSON from FD - %s", err)
             return {}
+        if use_response_cache:
+            self.response_cache.set(url, parsed_content, headers=headers)
         return parsed_content
 
     def _request_and_validate_paginated(self, url, headers=None, body=None) -> list:
-        getNextPage = True
+        return list(self._iter_pages(url, headers, body))
+
+    def _iter_pages(self, url, headers=None, body=None):
+        """yields each parsed page in turn, only requesting the next once the previous has been consumed.
+
+        Stops at an empty page, a repeat of the previous page, or after 10 pages (the most freshdesk search returns)"""
         oldResponse = ""
         param_char = "&" if "?" in url else "?"
         current_page = 1
-        pages = []
-        while getNextPage and current_page <= 10:
+        while current_page <= 10:
             r_url = f"{url}{param_char}page={current_page}"
-            resp = self._request_and_validate(r_url, headers, body)
-            if resp == oldResponse:
-                getNextPage = False
+            resp = self._request_and_validate(r_url, headers, body, page=current_page)
+            if not resp or resp == oldResponse:
                 break
-            else:
-                oldResponse = resp
-                pages.append(resp)
-                current_page = current_page + 1
-        return pages
+            oldResponse = resp
+            yield resp
+            current_page = current_page + 1
 
 
 class FreshdeskTicket:
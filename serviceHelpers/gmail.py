@@ -1,14 +1,17 @@
+from __future__ import annotations
+
 import pickle
 import os.path
 import json
 import requests 
 import re 
 import html
-from googleapiclient.discovery import build 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials   
 import logging
+from typing import TYPE_CHECKING
+
+# the google client libraries are slow to import, so they're only loaded by the calls that need them
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 
 
@@ -88,6 +91,8 @@ class Gmail():
         
         Returns:
             `googleapiclient.discovery.Resource`: The gmail service object"""
+        from googleapiclient.discovery import build
+
         self.service = build('gmail', 'v1', credentials=self.credentials)
         return self.service
 
@@ -120,6 +125,8 @@ def make_new_credentials(client_secrets_str:str, redirect_uri = "https://127.0.0
     elif isinstance(client_secrets_str, dict):   
         client_secrets_json = client_secrets_str
 
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     flow = InstalledAppFlow.from_client_config(client_secrets_json, SCOPES, redirect_uri=redirect_uri)
     
     creds = flow.run_local_server( open_browser=True, host="localhost",port=8080)
@@ -143,6 +150,9 @@ def make_new_token_from_refresh_bits(refresh_token:str, client_id:str, client_se
     elif isinstance(client_secret, dict):   
         client_secrets_str = json.dumps(client_secret)
 
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
     creds = Credentials("token",refresh_token, token_uri=token_uri, client_id=client_id, client_secret=client_secrets_str)
     creds.refresh(Request())
     return creds
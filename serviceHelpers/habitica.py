@@ -1,20 +1,23 @@
 import logging
 import json
 from typing import List
-import requests 
+
+from serviceHelpers._common import HttpTransport, get_default_transport, get_rate_limiter
 
 lo = logging.getLogger("HabiticaMapper")
 
 class Habitica():
-    def __init__(self,user_id,api_key) -> None:
+    def __init__(self,user_id,api_key, transport: HttpTransport = None) -> None:
             self.user_id = user_id
             self.api_key = api_key
+            self.transport = transport if transport is not None else get_default_transport()
+            self._limiter = get_rate_limiter("habitica", user_id)
         
     def fetchHabiticaDailies(self,dateAsString) -> list:
         url =  "https://habitica.com/api/v3/tasks/user?type=dailys&dueDate=%s" % (dateAsString)
         headers = self._getHabiticaHeaders()
 
-        r = requests.get(url,headers=headers)
+        r = self.transport.get(url,headers=headers, limiter=self._limiter)
         dailies = json.loads(r.content)
         if "error" in dailies:
             lo.error("Couldn't get habitica dailies - %s",dailies["error"])
@@ -30,7 +33,7 @@ class Habitica():
     def completeDaily(self,dailyID):
         url = "https://habitica.com/api/v3/tasks/%s/score/up" % (dailyID)
         headers = self._getHabiticaHeaders()
-        r = requests.post(url,headers=headers)
+        r = self.transport.post(url,headers=headers, limiter=self._limiter)
         if r.status_code != 200:
             print ("Unexpected error whilst completing a habitica task! \n%s\t%s" % (r.status_code, r.content))
 
@@ -40,7 +43,7 @@ class Habitica():
         """Call's the endpoint that triggers the end of day process to executes"""
         url = "https://habitica.com/api/v3/cron"
         headers = self._getHabiticaHeaders()
-        r = requests.post(url,headers=headers)
+        r = self.transport.post(url,headers=headers, limiter=self._limiter)
         if r.status_code != 200:
             lo.warning("Failed to request Habitica reset!!")
 
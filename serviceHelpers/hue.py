@@ -1,20 +1,21 @@
 import logging
 import json
 
-import requests
 import time
 import threading
 
 from datetime import datetime, timedelta
 
-from models import hueBulb 
+from serviceHelpers.models import hueBulb
+from serviceHelpers._common import HttpTransport, get_default_transport, get_rate_limiter
 
 
 class huehelper():
     
-    def __init__(self,bridge_ip,bridge_user,deviceIdentifier = None) -> None:
-        
+    def __init__(self,bridge_ip,bridge_user,deviceIdentifier = None, transport: HttpTransport = None) -> None:
         
+        self.transport = transport if transport is not None else get_default_transport()
+        self._limiter = get_rate_limiter("hue", bridge_ip)
         self.bridge_ip = bridge_ip
         self.bridge_user = bridge_user
         self.authenticate()
@@ -39,7 +40,7 @@ class huehelper():
             return {}
         
         url = f"http://{self.bridge_ip}/api/{self.bridge_user}/lights"
-        lights = json.loads(requests.get(url=url).content)
+        lights = json.loads(self.transport.get(url=url, limiter=self._limiter).content)
         self.devices = {} 
         for lightKey in lights:
             lights[lightKey]["deviceIDonBridge"] = lightKey
@@ -49,15 +50,17 @@ class huehelper():
 
     def getDevice(self,bulbID) -> None:
         url = f"http://{self.bridge_ip}/api/{self.bridge_user}/lights/{bulbID}"
-        response = json.loads(requests.get(url=url).content)
+        response = json.loads(self.transport.get(url=url, limiter=self._limiter).content)
         response["deviceIDonBridge"] = bulbID
         newBulb = hueBulb.hueBulb(self,apiObj=response)
 
         self.devices[newBulb.name] = newBulb
         return newBulb
 
-    def pulseLights(self,hue,sat,bri = None, rate = 0.5, duration = 0.1 ):
-        #pulse only the config named lights a fixed colour at a fixed rate for a specific duration in seconds
+    def pulseLights(self,hue,sat,bri = None, rate = 0.5, duration = 0.1, device_names = None ):
+        #pulse the named lights (all of them by default) a fixed colour at a fixed rate for a specific duration in seconds
+        if device_names is None:
+            device_names = list(self.devices)
         cachedSettings = {}
         pulseStates = {}
         redstate = hueBulb.bulbState.generateONbulbstate()
@@ -67,7 +70,7 @@ class huehelper():
         if bri != None:
             redstate.brightness = bri 
     
-        for deviceName in self._config.HueDevicesToFlash:
+        for deviceName in device_names:
             device:hueBulb = self.devices.get(deviceName)
             if device is None:
                 pass 
@@ -76,14 +79,14 @@ class huehelper():
                 pulseStates[device.name]= []
                 pulseStates[device.name].append(redstate)
                 pulseStates[device.name].append(cachedSettings[device.name])
-                t = threading.Thread(target=huehelper._pulseLight,args=(device,endtime,rate,pulseStates[device.name],True))
+                t = threading.Thread(target=self._pulseLight,args=(device,endtime,rate,pulseStates[device.name],True))
                 t.start()
         
 
 
         time.sleep(duration+rate+rate)
         print("Resetting devices...")
-        for deviceName in self._config.HueDevicesToFlash:
+        for deviceName in device_names:
             device = self.devices.get(deviceName)
             cachedState = cachedSettings.get(deviceName)
             if device is None or cachedState is None:
@@ -108,7 +111,7 @@ class huehelper():
 
     def _getIP(self) -> None:
         if self._config.bridgeIP is None or self._config.bridgeIP == "":
-            result = json.loads(requests.get("https://discovery.meethue.com/").content)
+            result = json.loads(self.transport.get("https://discovery.meethue.com/").content)
             if len(result) == 0:
                 logging.warning("Couldn't discover Hue IP address")                
             if len(result) > 1:
@@ -127,7 +130,7 @@ class huehelper():
         isValid = False 
         status_code = 200 
         while not isValid or status_code != 200 :
-            responseObj = requests.post(url=url,data=body)
+            responseObj = self.transport.post(url=url,data=body, limiter=self._limiter)
             status_code = responseObj.status_code
             responses = json.loads(responseObj.content)
             for response in responses:
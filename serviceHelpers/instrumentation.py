@@ -0,0 +1,212 @@
+"""Instrumentation for the requests made by every helper.
+
+`HttpTransport` hands a `RequestEvent` to each of its hooks after every call. `LatencyAggregator`
+is a ready-made hook that keeps per-endpoint latency histograms in process and can dump them in
+the Prometheus text exposition format, e.g.
+
+    aggregator = LatencyAggregator()
+    get_default_transport().add_hook(aggregator)
+    ...
+    print(aggregator.to_prometheus())
+"""
+
+import re
+import threading
+from urllib.parse import urlsplit
+
+# trello ids are 24 hex characters, jira keys look like `PRJ-123`, everything else is numeric
+_ID_PATTERNS = (
+    re.compile(r"^[0-9a-f]{24}$"),
+    re.compile(r"^[A-Z][A-Z0-9_]+-\d+$"),
+    re.compile(r"^\d+$"),
+)
+_ID_SUFFIX = re.compile(r"^(\d+)(\.json)$")
+# numeric segments straight after these are API versions (`/1/`, `/rest/api/2/`), not ids
+_VERSION_PARENTS = ("", "api")
+_VERSION = re.compile(r"^v?\d+$")
+# credentials that travel in the path, which mustn't end up in events or metric labels:
+# long opaque strings such as API keys, and the hue bridge username after `/api/` (slack's web API has dots there)
+_TOKEN = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{16,}$")
+# every segment after `/services/` in a slack webhook URL is part of the webhook's secret
+_SLACK_WEBHOOK_HOST = "hooks.slack.com"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def endpoint_template(url: str) -> str:
+    """reduces a URL to its endpoint, replacing ids with `{id}` and dropping the query string
+
+    `https://x.zendesk.com/api/v2/tickets/123/audits?page=2` becomes `/api/v2/tickets/{id}/audits`.
+    Credentials in the path become `{token}`, or `{user}` for a hue bridge username"""
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split("/"):
+        suffix = _ID_SUFFIX.match(segment)
+        if segments and segments[-1] in _VERSION_PARENTS and segment.isdigit():
+            segments.append(segment)
+        elif parts.hostname == _SLACK_WEBHOOK_HOST and "services" in segments:
+            segments.append("{token}")
+        elif (
+            segments
+            and segments[-1] == "api"
+            and segment
+            and "." not in segment
+            and not _VERSION.match(segment)
+        ):
+            segments.append("{user}")
+        elif suffix is not None:
+            segments.append("{id}" + suffix.group(2))
+        elif any(pattern.match(segment) for pattern in _ID_PATTERNS):
+            segments.append("{id}")
+        elif _TOKEN.match(segment):
+            segments.append("{token}")
+        else:
+            segments.append(segment)
+    return "/".join(segments)
+
+
+class RequestEvent:
+    """Describes a single HTTP call made through an `HttpTransport`
+
+    Attributes:
+        `service` (str): the service the call was made to, e.g. `trello`
+        `endpoint` (str): the endpoint template, with ids stripped out
+        `method` (str): the HTTP method
+        `status` (int): the final status code, or None if the call failed to connect
+        `bytes` (int): the size of the response body
+        `latency` (float): seconds taken, including any waiting on the rate limiter and any retries
+        `retries` (int): how many times the call was retried after a 429
+        `page` (int): the pagination page the call fetched, if it was part of a paginated walk
+    """
+
+    __slots__ = ("service", "endpoint", "method", "status", "bytes", "latency", "retries", "page")
+
+    def __init__(
+        self,
+        service: str,
+        endpoint: str,
+        method: str,
+        status: int,
+        bytes: int,
+        latency: float,
+        retries: int = 0,
+        page: int = None,
+    ) -> None:
+        self.service = service
+        self.endpoint = endpoint
+        self.method = method
+        self.status = status
+        self.bytes = bytes
+        self.latency = latency
+        self.retries = retries
+        self.page = page
+
+    def __repr__(self) -> str:
+        return (
+            f"RequestEvent({self.service} {self.method} {self.endpoint} -> {self.status}, "
+            f"{self.latency:.3f}s, {self.bytes}B, retries={self.retries}, page={self.page})"
+        )
+
+
+class _Series:
+    "the histogram and counters for one label set"
+
+    __slots__ = ("bucket_counts", "count", "sum", "bytes", "retries")
+
+    def __init__(self, bucket_count: int) -> None:
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.bytes = 0
+        self.retries = 0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LatencyAggregator:
+    """A transport hook that keeps latency histograms per service, endpoint, method and status.
+
+    Args:
+        `buckets` (tuple): the upper bounds, in seconds, of the histogram buckets
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent) -> None:
+        self.record(event)
+
+    def record(self, event: RequestEvent) -> None:
+        "adds an event to the matching histogram"
+        status = "error" if event.status is None else str(event.status)
+        key = (event.service, event.endpoint, event.method, status)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if event.latency <= bound:
+                    series.bucket_counts[index] += 1
+            series.count += 1
+            series.sum += event.latency
+            series.bytes += event.bytes or 0
+            series.retries += event.retries
+
+    def snapshot(self) -> dict:
+        """returns `{(service, endpoint, method, status): {"count", "sum", "bytes", "retries"}}`"""
+        with self._lock:
+            return {
+                key: {
+                    "count": series.count,
+                    "sum": series.sum,
+                    "bytes": series.bytes,
+                    "retries": series.retries,
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self) -> None:
+        "discards everything recorded so far"
+        with self._lock:
+            self._series = {}
+
+    def to_prometheus(self, prefix: str = "servicehelpers") -> str:
+        "renders every histogram and counter in the Prometheus text exposition format"
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Time taken by HTTP requests made by the helpers",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        counters = []
+        with self._lock:
+            items = sorted(
+                self._series.items(), key=lambda item: tuple(map(str, item[0]))
+            )
+            for (service, endpoint, method, status), series in items:
+                labels = (
+                    f'service="{_escape(service)}",endpoint="{_escape(endpoint)}",'
+                    f'method="{_escape(method)}",status="{_escape(status)}"'
+                )
+                for bound, count in zip(self.buckets, series.bucket_counts):
+                    lines.append(
+                        f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{prefix}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}'
+                )
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {series.sum}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {series.count}")
+                counters.append((labels, series))
+
+        lines.append(f"# HELP {prefix}_response_bytes_total Bytes received in response bodies")
+        lines.append(f"# TYPE {prefix}_response_bytes_total counter")
+        for labels, series in counters:
+            lines.append(f"{prefix}_response_bytes_total{{{labels}}} {series.bytes}")
+        lines.append(f"# HELP {prefix}_request_retries_total Requests retried after a 429")
+        lines.append(f"# TYPE {prefix}_request_retries_total counter")
+        for labels, series in counters:
+            lines.append(f"{prefix}_request_retries_total{{{labels}}} {series.retries}")
+        return "\n".join(lines) + "\n"
@@ -2,8 +2,13 @@ import json
 import logging
 import urllib.parse
 
-import requests
-
+from serviceHelpers._common import (
+    ConditionalCache,
+    HttpTransport,
+    RateLimiter,
+    get_default_transport,
+    get_rate_limiter,
+)
 from serviceHelpers.models.JiraDetails import JiraDetails
 from serviceHelpers.models.JiraTicket import JiraTicket
 from serviceHelpers.models.JiraWorklog import JiraWorklog
@@ -15,9 +20,17 @@ TIMESTAMP_FORMAT = r"%Y-%m-%dT%H:%M:%S.%f%z"
 class Jira:
     """Represents a single Jira instance, accepting necessary methods to use the API.
     Exposes methods for fetching tickets.
+
+    `transport` is the pooled transport to send requests through, defaults to the shared one.
+    `etag_cache` is an opt-in `ConditionalCache`, making repeat GETs conditional so unchanged issues come back as a cheap 304.
     """
 
-    def __init__(self, config: JiraDetails) -> None:
+    def __init__(
+        self,
+        config: JiraDetails,
+        transport: HttpTransport = None,
+        etag_cache: ConditionalCache = None,
+    ) -> None:
 
         config: JiraDetails
         self.valid = config.valid
@@ -29,11 +42,20 @@ class Jira:
             "Authorization": f"Basic {self.token}",
         }
         self.logger = LO
+        self.transport = transport if transport is not None else get_default_transport()
+        self._limiter = get_rate_limiter("jira", self.token)
+        self.etag_cache = etag_cache
 
     def fetch_jira_ticket(self, key:str) -> JiraTicket:
         "Takes a jira key or ID and gets the returned issue"
         url = f"https://{self.host}/rest/api/2/issue/{key}"
-        results = _request_and_validate(url,self.headers)
+        results = _request_and_validate(
+            url,
+            self.headers,
+            transport=self.transport,
+            limiter=self._limiter,
+            etag_cache=self.etag_cache,
+        )
         ticket = JiraTicket().from_dict(results)
         return ticket
 
@@ -46,7 +68,13 @@ class Jira:
         url = f"https://{self.host}/rest/api/2/search?jql={jql}&fields=key,summary,description,status,priority,assignee,created,updated"
         url = f"https://{self.host}/rest/api/3/search/jql={jql}&fields=key,summary,description,status,priority,assignee,created,updated"
 
-        retrieved_results = _request_and_validate(url, self.headers)
+        retrieved_results = _request_and_validate(
+            url,
+            self.headers,
+            transport=self.transport,
+            limiter=self._limiter,
+            etag_cache=self.etag_cache,
+        )
         incoming_tickets = {}
         for ticket in retrieved_results["issues"]:
 
@@ -60,7 +88,13 @@ class Jira:
         "takes a ticket key and returns the worklogs for it"
 
         url = f"https://{self.host}/rest/api/2/issue/{ticket_key}/worklog"
-        results = _request_and_validate(url, self.headers)
+        results = _request_and_validate(
+            url,
+            self.headers,
+            transport=self.transport,
+            limiter=self._limiter,
+            etag_cache=self.etag_cache,
+        )
         worklogs = []
         if "worklogs" in results:
             for worklog in results["worklogs"]:
@@ -71,11 +105,27 @@ class Jira:
         return worklogs
 
 
-def _request_and_validate(url, headers, body=None) -> dict:
+def _request_and_validate(
+    url,
+    headers,
+    body=None,
+    transport: HttpTransport = None,
+    limiter: RateLimiter = None,
+    etag_cache: ConditionalCache = None,
+) -> dict:
     "internal method to request and return results from Jira"
+    transport = transport if transport is not None else get_default_transport()
+    use_etag_cache = etag_cache is not None and body is None
 
     try:
-        result = requests.get(url=url, headers=headers, data=body)
+        if use_etag_cache:
+            result, cached = etag_cache.send(
+                transport, url, headers=headers, limiter=limiter
+            )
+            if result.status_code == 304:
+                return cached
+        else:
+            result = transport.get(url=url, headers=headers, data=body, limiter=limiter)
     except (ConnectionError) as e:
         LO.error("Couldn't connect to Jira %s - %s", url, e)
         return {}
@@ -92,4 +142,6 @@ def _request_and_validate(url, headers, body=None) -> dict:
     except json.JSONDecodeError as e:
         LO.error("Couldn't parse JSON from Jira - %s", e)
         return {}
+    if use_etag_cache:
+        etag_cache.store(result, parsed_content, url, headers=headers)
     return parsed_content
@@ -1,5 +1,4 @@
 import logging
-from pytest import param
 
 class JiraDetails:
     """represents the settings for a jira object"""
@@ -21,7 +20,7 @@ class JiraDetails:
 
         return self
 
-    @param
+    @property
     def valid(self):
         """self checking of the parameters."""
         valid = True
@@ -0,0 +1,104 @@
+import json
+from collections.abc import MutableMapping
+
+# the fields the trello helper reads, kept unpacked
+_FIELDS = ("id", "name", "desc", "idList", "pos", "due", "labels", "customFieldItems")
+_FIELD_SET = frozenset(_FIELDS)
+
+
+class TrelloCard(MutableMapping):
+    """A trello card that behaves like the dict the API returned, but uses a fraction of the memory.
+
+    The fields the helper uses are held in slots. Everything else trello sent is kept as a single
+    compact JSON string, and decoded each time one of those fields is asked for.
+    """
+
+    __slots__ = _FIELDS + ("_extra",)
+
+    def __init__(self, source: dict = None) -> None:
+        extra = {}
+        for key, value in (source or {}).items():
+            if key in _FIELD_SET:
+                setattr(self, key, value)
+            else:
+                extra[key] = value
+        self._extra = self._encode(extra)
+
+    @staticmethod
+    def _encode(extra: dict) -> str:
+        return json.dumps(extra, separators=(",", ":")) if extra else ""
+
+    def _decode(self) -> dict:
+        return json.loads(self._extra) if self._extra else {}
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self._decode()[key]
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return self._decode().get(key, default)
+
+    def __setitem__(self, key, value) -> None:
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+            return
+        extra = self._decode()
+        extra[key] = value
+        self._extra = self._encode(extra)
+
+    def __delitem__(self, key) -> None:
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        extra = self._decode()
+        del extra[key]
+        self._extra = self._encode(extra)
+
+    def __contains__(self, key) -> bool:
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in self._decode()
+
+    def __iter__(self):
+        for key in _FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from self._decode()
+
+    def __len__(self) -> int:
+        return sum(hasattr(self, key) for key in _FIELDS) + len(self._decode())
+
+    def to_dict(self) -> dict:
+        "the card as a plain dict, decoding the JSON once rather than once per field as `dict(card)` would"
+        card = {key: getattr(self, key) for key in _FIELDS if hasattr(self, key)}
+        card.update(self._decode())
+        return card
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def copy(self) -> "TrelloCard":
+        copied = TrelloCard()
+        for key in _FIELDS:
+            if hasattr(self, key):
+                setattr(copied, key, getattr(self, key))
+        copied._extra = self._extra
+        return copied
+
+    def __repr__(self) -> str:
+        return f"TrelloCard({self.to_dict()!r})"
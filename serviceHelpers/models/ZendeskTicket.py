@@ -22,10 +22,14 @@ class ZendeskTicket:
         self.priority = ""
         self.status = ""
         self.assignee_id = None
+        self.assignee = None
         self.requester_id = None
         self.requester_name = ""
         self.requester = None
         self.group_id = 0
+        self.group = None
+        self.organisation_id = None
+        self.organisation = None
         self.comments = []
         self.tags = []
         self.logger = logging.getLogger("zendeskHelper.zendeskTicket")
@@ -74,6 +78,11 @@ class ZendeskTicket:
             source["requester_id"] if "requester_id" in source else self.requester_id
         )
         self.group_id = source["group_id"] if "group_id" in source else self.group_id
+        self.organisation_id = (
+            source["organization_id"]
+            if "organization_id" in source
+            else self.organisation_id
+        )
         self.status = source["status"] if "status" in source else self.status
         self.priority = source["priority"] if "priority" in source else self.priority
         self.ticket_form_id = source["ticket_form_id"] if "ticket_form_id" in source else self.ticket_form_id
@@ -0,0 +1,25 @@
+import importlib
+
+_SUBMODULES = frozenset(
+    {
+        "JiraDetails",
+        "JiraTicket",
+        "JiraWorklog",
+        "TrelloCard",
+        "ZendeskOrg",
+        "ZendeskTicket",
+        "ZendeskUser",
+        "ZendeskWorklog",
+        "hueBulb",
+    }
+)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
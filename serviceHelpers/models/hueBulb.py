@@ -1,5 +1,4 @@
 import json
-import requests
 
 
 class bulbState():
@@ -64,7 +63,6 @@ class hueBulb():
         self.id = int(apiObj.get("deviceIDonBridge"))
         self.type = apiObj.get("type")
         self._helper = helper
-        self.cfg = helper._config
         state = apiObj.get("state",{})
         self.state = bulbState(state.get("on",False),state.get("bri",0),state.get("hue",0),state.get("sat",0))
         
@@ -80,16 +78,17 @@ class hueBulb():
                 print("Didn't match - returning")
                 return False 
         
-        url = "http://{host}/api/{username}/lights/{bulbID}/state".format(host=self._helper._config.bridgeIP,username=self._helper._config.bridgeUser, bulbID=self.id)
+        url = "http://{host}/api/{username}/lights/{bulbID}/state".format(host=self._helper.bridge_ip,username=self._helper.bridge_user, bulbID=self.id)
         data = str(newState)
-        result = requests.put(url,data=data)
+        result = self._helper.transport.put(url,data=data, limiter=self._helper._limiter)
         if result:
             self.state = self._helper.getDevice(self.id).state
         return result
 
     def refreshCache(self):
-        url = "http://{host}/api/{username}/lights/{bulbID}".format(host=self._helper._config.bridgeIP,username=self._helper._config.bridgeUser, bulbID=self.id)
-        newBulbObj = json.loads(requests.get(url=url).content)
+        url = "http://{host}/api/{username}/lights/{bulbID}".format(host=self._helper.bridge_ip,username=self._helper.bridge_user, bulbID=self.id)
+        response = self._helper.transport.get(url=url, limiter=self._helper._limiter)
+        newBulbObj = json.loads(response.content)
         currentState = bulbState.fromApiObj(newBulbObj)
         self.state = currentState
         
@@ -0,0 +1,158 @@
+"""A persistent, SQLite backed cache of parsed GET responses.
+
+Helpers constructed with a `SqliteResponseCache` answer repeat GETs for slowly changing
+reference data (ticket forms, agents, user profiles...) from disk, so the data survives
+process restarts instead of being re-fetched by every short-lived worker.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from serviceHelpers._common import _fingerprint
+
+_LO = logging.getLogger("serviceHelpers.response_cache")
+
+# seconds to keep responses for, keyed by a regex searched for in the URL. First match wins.
+# Boards and tickets are deliberately absent: they change too often to serve from disk by default.
+DEFAULT_TTLS = {
+    r"/api/v2/ticket_forms/": 24 * 60 * 60,  # zendesk ticket forms
+    r"/api/v2/agents": 6 * 60 * 60,  # freshdesk agents
+    r"users\.profile\.get": 6 * 60 * 60,  # slack user profiles
+    r"/api/v2/users/\d+": 60 * 60,  # zendesk users
+}
+DEFAULT_MAX_ENTRIES = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class SqliteResponseCache:
+    """Stores parsed GET responses on disk, keyed by method, URL, params and credentials.
+
+    Args:
+        `path` (str): the SQLite file to use, created if it doesn't exist. `:memory:` works for testing
+        `ttls` (dict): regex -> seconds, searched for in each URL to decide how long its response is kept. Defaults to `DEFAULT_TTLS`
+        `default_ttl` (float): seconds to keep responses that match no pattern. 0 means they aren't cached at all
+        `max_entries` (int): the most responses kept, the least recently used are evicted beyond this
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttls: dict = None,
+        default_ttl: float = 0,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        ttls = DEFAULT_TTLS if ttls is None else ttls
+        self._ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls.items()]
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    def ttl_for(self, url: str) -> float:
+        "how many seconds a response from this URL is kept for"
+        for pattern, ttl in self._ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def make_key(method: str, url: str, params: dict = None, headers: dict = None) -> str:
+        "builds the cache key for a request, taking credentials into account"
+        params = sorted((params or {}).items())
+        auth = (headers or {}).get("Authorization")
+        return _fingerprint(method.upper(), url, params, auth)
+
+    def get(self, url: str, params: dict = None, headers: dict = None, method="GET"):
+        "returns the parsed response for the request if one is cached and still fresh, otherwise None"
+        if self.ttl_for(url) <= 0:
+            return None
+        key = self.make_key(method, url, params, headers)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            expires_at, body = row
+            if expires_at <= now:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as err:
+            _LO.warning("Couldn't parse a cached response, ignoring it - %s", err)
+            return None
+
+    def set(self, url: str, parsed, params: dict = None, headers: dict = None, method="GET") -> None:
+        "stores a parsed response, if its URL has a TTL"
+        ttl = self.ttl_for(url)
+        if ttl <= 0 or parsed is None:
+            return
+        key = self.make_key(method, url, params, headers)
+        now = time.time()
+        try:
+            body = json.dumps(parsed)
+        except (TypeError, ValueError) as err:
+            _LO.warning("Couldn't serialise a response for caching - %s", err)
+            return
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, last_used, body) VALUES (?, ?, ?, ?)",
+                (key, now + ttl, now, body),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        "drops expired responses and then the least recently used ones until within `max_entries`. Call with the lock held"
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count <= self.max_entries:
+            return
+        self._connection.execute(
+            "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+        )
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        "forgets every cached response"
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def close(self) -> None:
+        "closes the underlying database connection"
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+        return count
@@ -4,21 +4,40 @@ from datetime import datetime
 
 import requests
 
+from serviceHelpers._common import (
+    HttpTransport,
+    RateLimiter,
+    get_default_transport,
+    get_rate_limiter,
+)
+from serviceHelpers.response_cache import SqliteResponseCache
+
 LO = logging.getLogger("slack service helper")
 
 
 class slack:
     """This class provides methods for interacting with a single slack server."""
 
-    def __init__(self, token="", webhook="") -> None:
+    def __init__(
+        self,
+        token="",
+        webhook="",
+        transport: HttpTransport = None,
+        response_cache: SqliteResponseCache = None,
+    ) -> None:
         """Initialize the slack object.
 
         * `token` is the oauth token from slack.dev
         * `webhook` is an optional way of defining a single webhook to send messages by default.
+        * `transport` is the pooled transport to send requests through, defaults to the shared one.
+        * `response_cache` is an opt-in `SqliteResponseCache`, serving GETs it has a TTL for (e.g. user profiles) from disk.
         """
         self.token = token
         self.webhook = webhook
         self.logger = LO
+        self.transport = transport if transport is not None else get_default_transport()
+        self._limiter = get_rate_limiter("slack", token)
+        self.response_cache = response_cache
 
     def post_to_slack_via_token(
         self, text, channelID, parent_ts=None, unfurl: bool = True, attachment=None
@@ -40,7 +59,9 @@ class slack:
         if attachment is not None:
             body["attachments"] = attachment
 
-        response = requests.post(url, data=json.dumps(body), headers=headers)
+        response = self.transport.post(
+            url, data=json.dumps(body), headers=headers, limiter=self._limiter
+        )
         try:
             r = json.loads(response.content)
             if "error" in r:
@@ -87,7 +108,7 @@ class slack:
         url = self.webhook
         headers = {"Content-type": "application/json"}
         body = {"text": text}
-        r = requests.post(url=url, headers=headers, data=json.dumps(body))
+        r = self.transport.post(url=url, headers=headers, data=json.dumps(body))
         print(r)
         print(r.content)
         return r.content
@@ -106,7 +127,9 @@ class slack:
                 "limit": limit,
                 "includsive": True,
             }
-            response = requests.post(url=url, headers=headers, params=params)
+            response = self.transport.post(
+                url=url, headers=headers, params=params, limiter=self._limiter
+            )
             content = json.loads(response.content)
 
             messages = content["messages"] if "messages" in content else {}
@@ -132,7 +155,14 @@ class slack:
         parameters = {"user": user_id}
         headers = self._get_default_headers()
 
-        parsed_json = _request_and_validate(url, headers, params=parameters)
+        parsed_json = _request_and_validate(
+            url,
+            headers,
+            params=parameters,
+            transport=self.transport,
+            limiter=self._limiter,
+            response_cache=self.response_cache,
+        )
         if parsed_json.get("ok") is not True:
             return {}
 
@@ -159,7 +189,9 @@ class slack:
         if attachment is not None:
             body["attachments"] = attachment
 
-        response = requests.post(url, data=json.dumps(body), headers=headers)
+        response = self.transport.post(
+            url, data=json.dumps(body), headers=headers, limiter=self._limiter
+        )
         try:
             r = json.loads(response.content)
             if "error" in r:
@@ -192,7 +224,13 @@ class slack:
             "limit": 1
         }
 
-        parsed_json = _request_and_validate(url, headers, params=params)
+        parsed_json = _request_and_validate(
+            url,
+            headers,
+            params=params,
+            transport=self.transport,
+            limiter=self._limiter,
+        )
         if parsed_json.get("ok") is not True:
             logging.warning("Couldn't retrieve message info: %s", parsed_json.get("error", "unknown error"))
             return {}
@@ -205,11 +243,27 @@ class slack:
         return {}
 
 
-def _request_and_validate(url, headers, body=None, params=None) -> dict:
+def _request_and_validate(
+    url,
+    headers,
+    body=None,
+    params=None,
+    transport: HttpTransport = None,
+    limiter: RateLimiter = None,
+    response_cache: SqliteResponseCache = None,
+) -> dict:
     "internal method to request and return results from Slack"
+    transport = transport if transport is not None else get_default_transport()
+    use_response_cache = response_cache is not None and body is None
+    if use_response_cache:
+        cached = response_cache.get(url, params, headers)
+        if cached is not None:
+            return cached
 
     try:
-        result = requests.get(url=url, headers=headers, data=body, params=params)
+        result = transport.get(
+            url=url, headers=headers, data=body, params=params, limiter=limiter
+        )
     except (ConnectionError) as e:
         LO.error("Couldn't connect to Slack API %s - %s", url, e)
         return {}
@@ -233,5 +287,7 @@ def _request_and_validate(url, headers, body=None, params=None) -> dict:
             "Request made it to slack but was rejected, %s",
             parsed_content.get("error", "no error block found"),
         )
+    elif use_response_cache:
+        response_cache.set(url, parsed_content, params, headers)
 
     return parsed_content
@@ -1,11 +1,33 @@
+import functools
 import json
-import time
 from asyncio.log import logger
 import logging
+import os
+import threading
 
 import re
+from bisect import insort
+from urllib.parse import urlencode
+
 import requests
 
+from serviceHelpers._common import (
+    DEFAULT_CONCURRENCY,
+    ConditionalCache,
+    HttpTransport,
+    get_default_transport,
+    get_rate_limiter,
+    run_concurrently,
+)
+from serviceHelpers.response_cache import SqliteResponseCache
+from serviceHelpers._trello_cache import (
+    DEFAULT_VIEW,
+    CardCache,
+    card_view,
+    view_covers,
+    view_params,
+)
+from serviceHelpers.models.TrelloCard import TrelloCard
 
 HOST = "https://api.trello.com/"
 API_VERSION = "1"
@@ -13,6 +35,76 @@ BASE_URL = f"{HOST}{API_VERSION}/"
 _LO = logging.getLogger("TrelloHelper")
 _LO.setLevel(logging.WARN)
 
+# the most actions trello returns in one page
+ACTIONS_PAGE_SIZE = 1000
+# incremental syncs fetch a single page of actions. More changes than that means a full refetch
+MAX_ACTIONS_PER_SYNC = ACTIONS_PAGE_SIZE
+# past this many cards needing a refetch, downloading the whole board is cheaper
+MAX_CARD_REFETCHES = 50
+# the most GETs trello's `/1/batch` endpoint accepts in one request
+BATCH_SIZE = 10
+# the gap trello leaves between cards added to the bottom of a list
+POS_STEP = 16384
+# bumped whenever the layout written by `save_cache` changes
+CACHE_SNAPSHOT_VERSION = 2
+# the fields the helper's own lookups read from cached cards
+_SEARCH_VIEW = card_view("name,desc")
+_LIST_VIEW = card_view("idList,pos")
+_CARD_CREATED_ACTIONS = {
+    "createCard",
+    "copyCard",
+    "convertToCardFromCheckItem",
+    "emailCard",
+    "moveCardToBoard",
+}
+_CARD_REMOVED_ACTIONS = {"deleteCard", "moveCardFromBoard"}
+# actions that mention a card without changing any of its fields
+_CARD_NEUTRAL_ACTIONS = {
+    "commentCard",
+    "updateComment",
+    "deleteComment",
+    "addAttachmentToCard",
+    "deleteAttachmentFromCard",
+}
+# actions without a card that can't change which cards are visible, or their fields.
+# Any other action without a card means the board has to be fetched in full
+_BOARD_NEUTRAL_ACTIONS = {
+    "createList",
+    "createLabel",
+    "addMemberToBoard",
+    "makeNormalMemberOfBoard",
+    "makeAdminOfBoard",
+    "makeObserverOfBoard",
+    "createCustomField",
+}
+# list fields that take the list's cards with them when they change
+_LIST_VISIBILITY_FIELDS = {"closed", "idBoard"}
+
+
+def _planned_pos(positions: list, index: int = None) -> float:
+    "the `pos` for a card inserted at `index` among the sorted `positions`. None, -1 or past the end is the bottom"
+    if index is None or index < 0 or index >= len(positions):
+        return (positions[-1] if positions else 0) + POS_STEP
+    if index == 0:
+        return positions[0] / 2
+    return (positions[index - 1] + positions[index]) / 2
+
+
+def _as_dict(card) -> dict:
+    "a cached card as a plain dict, decoding a `TrelloCard` in one go"
+    return card.to_dict() if isinstance(card, TrelloCard) else dict(card)
+
+
+def _holds_lock(method):
+    "runs the method holding the helper's `lock`, for the ones that read or write the card cache"
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return locked
+
 
 class trello:
     """represents a trello board, and provides methods to interact with it
@@ -21,57 +113,72 @@ class trello:
         `board_id` (str): the id of the board to interact with
         `key` (str): the trello api key
         `token` (str): the trello api token for the authenticated user
+        `transport` (HttpTransport): the pooled transport to send requests through, defaults to the shared one
+        `etag_cache` (ConditionalCache): opt-in cache, makes repeat GETs conditional so unchanged boards/cards come back as a cheap 304
+        `response_cache` (SqliteResponseCache): opt-in persistent cache, serves GETs for endpoints it has a TTL for from disk
+        `incremental_sync` (bool): keep the card cache up to date by replaying the board's actions since the last sync, rather than re-downloading every card
+        `compact_cards` (bool): cache cards as `TrelloCard`s rather than the raw dicts, keeping only the fields the helper uses unpacked
+
+    The methods that use the card cache hold `lock` while they do, so another thread, such as a webhook receiver, can update it safely.
+    Hold it too when reading `_cached_cards` directly from more than one thread.
     """
 
-    def __init__(self, board_id, key, token) -> None:
+    def __init__(
+        self,
+        board_id,
+        key,
+        token,
+        transport: HttpTransport = None,
+        etag_cache: ConditionalCache = None,
+        response_cache: SqliteResponseCache = None,
+        incremental_sync: bool = False,
+        compact_cards: bool = False,
+    ) -> None:
         self.board_id = board_id
         self.key = key
         self.token = token
-        self._cached_cards = {}  # listID into list of cards, sorted by their IDs
+        self.transport = transport if transport is not None else get_default_transport()
+        self._limiter = get_rate_limiter("trello", token)
+        self.etag_cache = etag_cache
+        self.response_cache = response_cache
+        self.compact_cards = compact_cards
+        # card ID into card, indexed by list and position
+        self._cached_cards = CardCache(card_type=TrelloCard if compact_cards else None)
         self.dirty_cache = True
-
+        self.incremental_sync = incremental_sync
+        self.last_action_id = None  # the newest board action reflected in the cache
+        self.lock = threading.RLock()
+
+    @property
+    def _cached_cards(self) -> CardCache:
+        return self._card_cache
+
+    @_cached_cards.setter
+    def _cached_cards(self, cards: dict) -> None:
+        # plain dicts are indexed on the way in
+        if not isinstance(cards, CardCache):
+            cards = CardCache(cards, TrelloCard if self.compact_cards else None)
+        self._card_cache = cards
+
+    @_holds_lock
     def find_trello_card(self, regex) -> dict:
         "uses regexes to search name and description of cached / fetched cards, or exactly matching IDs. Returns the first it finds."
-        cards = (
-            self.fetch_trello_cards()
-            if self.dirty_cache
-            else list(self._cached_cards.values())
-        )
-        for card in cards:
-            card: dict
-            try:
-                if (
-                    card.get("id", "") == regex
-                    or re.search(regex, card.get("name", ""))
-                    or re.search(regex, card.get("desc", ""))
-                ):
-                    return card
-
-            except (Exception,) as err:
-                _LO.error(
-                    "Failed to parse trello card's title & description when looking for matches, %s ",
-                    err,
-                )
+        self._require_view(_SEARCH_VIEW)
+        try:
+            # the cache's search index narrows things down to cards containing the pattern's literal text
+            return next(self._cached_cards.search(regex), None)
+        except (Exception,) as err:
+            _LO.error(
+                "Failed to parse trello card's title & description when looking for matches, %s ",
+                err,
+            )
         return
 
+    @_holds_lock
     def find_trello_cards(self, regex):
         "uses regexes to search name and description of cached / fetched cards. Returns all cards found."
-
-        cards = (
-            self.fetch_trello_cards()
-            if self.dirty_cache
-            else list(self._cached_cards.values())
-        )
-        foundCards = []
-        for card in cards:
-            card: dict
-            if (
-                card.get("id", "") == regex
-                or re.search(regex, card.get("name", ""))
-                or re.search(regex, card.get("desc", ""))
-            ):
-                foundCards.append(card)
-        return foundCards
+        self._require_view(_SEARCH_VIEW)
+        return list(self._cached_cards.search(regex))
 
     def search_trello_cards(self, search_criteria, board_id=None) -> list:
         "uses the trello search criteria, can return archived cards"
@@ -87,113 +194,518 @@ class trello:
         return r
 
     def purge_trello_cards(
-        self, title_pattern="", descPattern="", target_lists=None, custom_field_ids=None
-    ):
+        self,
+        title_pattern="",
+        descPattern="",
+        target_lists=None,
+        custom_field_ids=None,
+        dry_run: bool = False,
+        max_workers: int = DEFAULT_CONCURRENCY,
+    ) -> list:
         """
         * titlePattern and descPattern are both used for regex searches through title and card descriptions
-        * customFieldIDs and targetLists are  an array of IDs. Cards without those fields populated, or outside of those fields will be deleted.
+        * customFieldIDs and targetLists are  an array of IDs. Only cards on those lists, with one of those fields populated, are deleted.
         * targetLists can have the value `[*]` which will result in all lists being considered valid
+        * with `dry_run`, nothing is deleted
+
+        returns the cards matched - see `plan_purge` and `execute_purge` to review them before deleting
         """
-        target_lists = [] if target_lists is None else target_lists
-        custom_field_ids = [] if custom_field_ids is None else custom_field_ids
-        cards = self.fetch_trello_cards() if self.dirty_cache else self._cached_cards
+        plan = self.plan_purge(
+            title_pattern, descPattern, target_lists, custom_field_ids
+        )
+        if not dry_run:
+            self.execute_purge(plan, max_workers)
+        return plan
 
-        for card in cards:
-            # search through all cards, attempt to DQ from list. If all checks pass and not DQd, delete
-            continue_search = True
-            if target_lists[0] != "*" and card["idList"] not in target_lists:
-                continue_search = False
-            if continue_search and custom_field_ids != []:
-                # if we're clear to continue, and there is an ID, scruitinse ID
-                continue_search = False
-                for field in card["customFieldItems"]:
-                    if field["idCustomField"] in custom_field_ids:
-                        # card has the right ID
-                        continue_search = True
-            if (
-                continue_search
-                and title_pattern != ""
-                and re.search(title_pattern, card["name"]) is None
-            ):
-                # no objections found so far, there is a regex for the title, and it missed
-                continue_search = False
-            if (
-                continue_search
-                and descPattern != ""
-                and re.search(descPattern, card["desc"]) is None
+    @_holds_lock
+    def plan_purge(
+        self, title_pattern="", descPattern="", target_lists=None, custom_field_ids=None
+    ) -> list:
+        "returns the cards `purge_trello_cards` would delete for these arguments, without deleting anything"
+        target_lists = set([] if target_lists is None else target_lists)
+        custom_field_ids = set([] if custom_field_ids is None else custom_field_ids)
+        title_regex = re.compile(title_pattern) if title_pattern != "" else None
+        desc_regex = re.compile(descPattern) if descPattern != "" else None
+        self._require_view(
+            card_view("idList,name,desc", custom_field_items=bool(custom_field_ids))
+        )
+
+        plan = []
+        for card in self._cached_cards.values():
+            # search through all cards, attempt to DQ. If all checks pass and not DQd, it's in the plan
+            if "*" not in target_lists and card.get("idList") not in target_lists:
+                continue
+            if custom_field_ids and custom_field_ids.isdisjoint(
+                field.get("idCustomField") for field in card.get("customFieldItems", [])
             ):
-                # no objections found so far, there is a regex for the description
-                continue_search = False
+                continue
+            if title_regex is not None and not title_regex.search(card.get("name", "")):
+                continue
+            if desc_regex is not None and not desc_regex.search(card.get("desc", "")):
+                continue
+            plan.append(card)
+        return plan
 
-            if continue_search:
-                # we found no disqualifiers.
-                self.delete_trello_card(card["id"])
+    def execute_purge(
+        self, cards: list, max_workers: int = DEFAULT_CONCURRENCY
+    ) -> list:
+        """deletes the cards from `plan_purge`, `max_workers` at a time, evicting them from the cache. Returns the ids deleted
+
+        A card that fails to delete doesn't stop the others. The failures are logged and left out of the
+        ids returned, and the cache is marked dirty since trello may have deleted them anyway."""
+        card_ids = [card["id"] for card in cards]
+        deleted = run_concurrently(self._delete_card, card_ids, max_workers)
+        deleted_ids = [card_id for card_id, ok in zip(card_ids, deleted) if ok]
+        failed_ids = [card_id for card_id, ok in zip(card_ids, deleted) if not ok]
+        with self.lock:
+            for card_id in deleted_ids:
+                self._cached_cards.pop(card_id, None)
+            if failed_ids:
+                _LO.warning(
+                    "Couldn't delete %s cards - %s", len(failed_ids), failed_ids
+                )
                 self.dirty_cache = True
-        return
+        return deleted_ids
 
+    def _delete_card(self, card_id: str) -> bool:
+        "deletes a card without touching the cache, returns True on success"
+        url = f"{BASE_URL}card/%s" % (card_id)
+        try:
+            r = self.transport.delete(
+                url, params=self._get_trello_params(), limiter=self._limiter
+            )
+        except requests.RequestException as err:
+            _LO.warning("Couldn't delete card [%s] - %s", card_id, err)
+            return False
+        if r.status_code != 200:
+            _LO.warning(
+                "Unexpected response code [%s], whilst deleting card [%s] - %s",
+                r.status_code,
+                card_id,
+                r.reason,
+            )
+            return False
+        return True
+
+    @_holds_lock
     def get_all_cards_on_list(self, list_id):
         """Returns all the visible cards on a given list"""
-        if self.dirty_cache:
-            self.fetch_trello_cards()
-        cards = self._cached_cards
-        filtered_cards = {k: v for k, v in cards.items() if v["idList"] == list_id}
-        return filtered_cards
-        # creates Key:value FOR - (for each Key, value in cards) BUT ONLY IF the list_id matches
-
-    def fetch_trello_cards(self) -> list:
-        """returns all visible cards from the board"""
+        self._require_view(_LIST_VIEW)
+        # sorted by position, straight from the cache's per-list index
+        return self._cached_cards.cards_on_list(list_id)
+
+    @_holds_lock
+    def fetch_trello_cards(
+        self, fields=None, custom_field_items: bool = False, checklists: bool = False
+    ) -> list:
+        """returns all visible cards from the board
+
+        Args:
+            `fields` (list|str): the card fields to download, as a list or comma separated string. None for all of them
+            `custom_field_items` (bool): include each card's `customFieldItems`
+            `checklists` (bool): include each card's `checklists`
+
+        Fields the warm cache already holds are kept, so one consumer's projection doesn't strip another's.
+        with `incremental_sync` on, a warm cache is brought up to date from the board's actions instead, if it holds the fields asked for
+        """
+        view = card_view(fields, custom_field_items, checklists)
+        if not self.dirty_cache:
+            view = view | self._cached_cards.view
+        return self._fetch_cards(view)
+
+    @_holds_lock
+    def _require_view(self, view: frozenset) -> None:
+        """makes sure the cache is current and its cards hold `view`, fetching the board if not.
+
+        Cards cached with less than the rest, such as those from create and update responses, which
+        don't carry custom fields or checklists, are refetched on their own."""
+        if self.dirty_cache or not view_covers(self._cached_cards.view, view):
+            self._fetch_cards(self._cached_cards.view | view)
+        stale = [
+            card_id
+            for card_id, held in self._cached_cards.other_views().items()
+            if not view_covers(held, view)
+        ]
+        if stale:
+            self._refetch_cards(stale, self._cached_cards.view | view)
+
+    def _refetch_cards(
+        self, card_ids: list, view: frozenset, max_workers: int = DEFAULT_CONCURRENCY
+    ) -> None:
+        """replaces cached cards with copies fetched with `view` through `/1/batch`, dropping any that have been archived
+
+        If any can't be fetched the cache is marked dirty, so the next read fetches the board in full"""
+        batches = [
+            card_ids[start : start + BATCH_SIZE]
+            for start in range(0, len(card_ids), BATCH_SIZE)
+        ]
+        fetch = functools.partial(
+            self._fetch_card_batch, view=view | card_view("closed")
+        )
+        fetched = {}
+        for cards in run_concurrently(fetch, batches, max_workers):
+            fetched.update(cards)
+        for card_id in card_ids:
+            card = fetched.get(card_id)
+            if card is None:
+                self.dirty_cache = True
+            elif card.get("closed"):
+                self._cached_cards.pop(card_id, None)
+            else:
+                self._cached_cards.put(card_id, card, view)
+
+    @_holds_lock
+    def _fetch_cards(self, view: frozenset) -> list:
+        if self.incremental_sync:
+            if view_covers(self._cached_cards.view, view) and self.sync_cards():
+                return list(self._cached_cards.values())
+            # note where the board's history is up to before taking the snapshot, so nothing is missed in between
+            latest_action_id = self._fetch_latest_action_id()
+
         url = f"{BASE_URL}boards/%s/cards" % (self.board_id)
         params = self._get_trello_params()
         params["filter"] = "visible"
-
-        # params["customFieldItems"] = "true"
+        params.update(view_params(view))
 
         cards = self._request_and_validate(url, params=params)
 
-        self._populate_cache(cards)
+        if isinstance(cards, list):
+            # a full snapshot, so anything not in it has been deleted or archived
+            self._cached_cards.clear()
+            self._cached_cards.view = view
+            if self.incremental_sync:
+                self.last_action_id = latest_action_id
+        self._populate_cache(cards, view)
         self.dirty_cache = False
         return cards
 
-    def fetch_trello_card(self, card_id: str) -> dict:
-        "returns a single trello card"
+    @_holds_lock
+    def sync_cards(self) -> bool:
+        """updates the card cache by applying the board actions made since the last sync.
 
+        Returns False if the cache couldn't be brought up to date this way (it has never been fully
+        fetched, too much has changed, or the actions couldn't be fetched) and a full fetch is needed."""
+        if self.last_action_id is None:
+            return False
+        url = f"{BASE_URL}boards/{self.board_id}/actions"
+        params = {
+            "since": self.last_action_id,
+            "limit": MAX_ACTIONS_PER_SYNC,
+            "memberCreator": "false",
+            "member": "false",
+        }
+        actions = self._request_and_validate(url, params=params)
+        if not isinstance(actions, list):
+            return False
+        if len(actions) >= MAX_ACTIONS_PER_SYNC:
+            _LO.info("Too many changes since the last sync to replay, refetching the board")
+            return False
+
+        # trello returns the newest first
+        if not self._apply_actions(list(reversed(actions)), MAX_CARD_REFETCHES):
+            return False
+        if actions:
+            self.last_action_id = actions[0]["id"]
+        self.dirty_cache = False
+        return True
+
+    @_holds_lock
+    def apply_board_action(self, action: dict) -> None:
+        """applies a board action pushed from elsewhere, such as a webhook, to the card cache
+
+        Cards the action doesn't carry enough of are refetched. A dirty cache is left alone, it'll be fetched in full when next read,
+        and actions that can't be replayed, such as archiving a list, leave it dirty
+        """
+        if self.dirty_cache:
+            return
+        if not self._apply_actions([action]):
+            # the next read fetches the board in full
+            self.dirty_cache = True
+
+    def _apply_actions(self, actions: list, max_refetches: int = None) -> bool:
+        """applies board actions, oldest first, to the card cache.
+
+        Nothing in the cache changes until every action has been worked through and the cards they
+        don't carry enough of have been refetched. Returns False, leaving the cache as it was, if an
+        action can't be replayed or more than `max_refetches` cards need refetching."""
+        changes = {}  # card id -> the card as the actions leave it, None if it's gone
+        refetch = set()
+        for action in actions:
+            if not self._plan_action(action, changes, refetch):
+                _LO.info(
+                    "Can't replay a %s action on the card cache, refetching the board",
+                    action.get("type"),
+                )
+                return False
+        if max_refetches is not None and len(refetch) > max_refetches:
+            return False
+
+        views = {}
+        for card_id in refetch:
+            views[card_id] = self._cached_cards.view_of(card_id)
+            changes[card_id] = self._fetch_visible_card(card_id, views[card_id])
+        for card_id, card in changes.items():
+            if card is None:
+                self._cached_cards.pop(card_id, None)
+            elif card_id in views:
+                self._cached_cards.put(card_id, card, views[card_id])
+            else:
+                self._cached_cards[card_id] = card
+        return True
+
+    def _plan_action(self, action: dict, changes: dict, refetch: set) -> bool:
+        """works out what a single board action does to the card cache, recording it in `changes` rather than the cache.
+
+        Changes that can't be rebuilt from the action alone add the card's id to `refetch`.
+        Returns False for actions that can't be replayed, such as archiving a list.
+        Cached cards are replaced rather than modified, so references callers already hold don't change under them."""
+        data = action.get("data", {})
+        action_type = action.get("type")
+        card_id = data.get("card", {}).get("id")
+        if card_id is None:
+            if action_type == "updateList":
+                return _LIST_VISIBILITY_FIELDS.isdisjoint(data.get("old", {}))
+            return action_type in _BOARD_NEUTRAL_ACTIONS
+        cached = (
+            changes[card_id] if card_id in changes else self._cached_cards.get(card_id)
+        )
+
+        if action_type in _CARD_REMOVED_ACTIONS:
+            changes[card_id] = None
+            refetch.discard(card_id)
+        elif action_type in _CARD_CREATED_ACTIONS:
+            refetch.add(card_id)
+        elif action_type == "updateCard":
+            updated = data.get("card", {})
+            if updated.get("closed") is True:
+                changes[card_id] = None
+                refetch.discard(card_id)
+            elif cached is None or any(key not in updated for key in data.get("old", {})):
+                refetch.add(card_id)
+            else:
+                changes[card_id] = {
+                    **_as_dict(cached),
+                    **{key: updated[key] for key in data.get("old", {})},
+                }
+        elif action_type not in _CARD_NEUTRAL_ACTIONS and cached is not None:
+            # labels, members, checklists, custom fields... the card has changed in ways the action doesn't spell out
+            refetch.add(card_id)
+        return True
+
+    def _fetch_visible_card(self, card_id: str, view: frozenset) -> dict:
+        "fetches a card with `view`, or returns None if it's gone or been archived"
         url = f"{BASE_URL}cards/%s" % card_id
+        params = view_params(view | card_view("closed"))
+        card = self._request_and_validate(url, params=params)
+        if not card or card.get("closed"):
+            return None
+        return card
+
+    @_holds_lock
+    def _refetch_card(self, card_id: str) -> None:
+        "replaces a cached card with a fresh copy in the same view, dropping it if it's gone or been archived"
+        view = self._cached_cards.view_of(card_id)
+        card = self._fetch_visible_card(card_id, view)
+        if card is None:
+            self._cached_cards.pop(card_id, None)
+            return
+        self._cached_cards.put(card_id, card, view)
+
+    def _fetch_latest_action_id(self) -> str:
+        "the id of the newest action on the board, or None if there isn't one"
+        url = f"{BASE_URL}boards/{self.board_id}/actions"
+        actions = self._request_and_validate(url, params={"limit": 1})
+        if isinstance(actions, list) and actions:
+            return actions[0].get("id")
+        return None
+
+    @_holds_lock
+    def save_cache(self, path: str) -> bool:
+        """writes the card cache to `path` as JSON lines, so another instance can warm start from it with `load_cache`
+
+        The first line records the board and the last action synced, the rest are one card each.
+        Needs `incremental_sync`, as that's what tracks the action the snapshot is up to. Returns True on success
+        """
+        if self.dirty_cache or self.last_action_id is None:
+            _LO.warning(
+                "Not saving the card cache for board %s, it isn't synced with the board's actions",
+                self.board_id,
+            )
+            return False
+        header = {
+            "version": CACHE_SNAPSHOT_VERSION,
+            "board_id": self.board_id,
+            "last_action_id": self.last_action_id,
+            "view": sorted(self._cached_cards.view),
+            "views": {
+                card_id: sorted(view)
+                for card_id, view in self._cached_cards.other_views().items()
+            },
+        }
+        # written alongside and swapped in, so a reader never sees half a snapshot
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as snapshot:
+                for line in (header, *self._cached_cards.values()):
+                    snapshot.write(json.dumps(_as_dict(line), separators=(",", ":")))
+                    snapshot.write("\n")
+            os.replace(temp_path, path)
+        except OSError as err:
+            _LO.error("Couldn't save the card cache to %s - %s", path, err)
+            return False
+        return True
+
+    @_holds_lock
+    def load_cache(self, path: str) -> bool:
+        """fills the card cache from a `save_cache` snapshot, then brings it up to date from the board's actions since
+
+        Returns True if the cache is warm and current. Otherwise the cache is left dirty, and the next call that needs it fetches the whole board
+        """
+        try:
+            with open(path, encoding="utf-8") as snapshot:
+                header = json.loads(snapshot.readline())
+                if (
+                    header.get("version") != CACHE_SNAPSHOT_VERSION
+                    or header.get("board_id") != self.board_id
+                ):
+                    _LO.warning(
+                        "%s isn't a card cache snapshot for board %s", path, self.board_id
+                    )
+                    return False
+                cards = [json.loads(line) for line in snapshot if line.strip()]
+        except (OSError, ValueError, AttributeError) as err:
+            _LO.error("Couldn't load the card cache from %s - %s", path, err)
+            return False
+
+        self._cached_cards.clear()
+        self._cached_cards.view = frozenset(header.get("view", DEFAULT_VIEW))
+        self._populate_cache(cards, self._cached_cards.view)
+        for card_id, view in header.get("views", {}).items():
+            if card_id in self._cached_cards:
+                card = self._cached_cards[card_id]
+                self._cached_cards.put(card_id, card, frozenset(view))
+        self.last_action_id = header.get("last_action_id")
+        if self.sync_cards():
+            return True
+        self._cached_cards.clear()
+        self.last_action_id = None
+        self.dirty_cache = True
+        return False
+
+    @_holds_lock
+    def fetch_trello_card(
+        self,
+        card_id: str,
+        fields=None,
+        custom_field_items: bool = False,
+        checklists: bool = False,
+    ) -> dict:
+        "returns a single trello card, takes the same projections as `fetch_trello_cards`"
+
+        url = f"{BASE_URL}cards/%s" % card_id
+        view = card_view(fields, custom_field_items, checklists)
+        if card_id in self._cached_cards:
+            view = view | self._cached_cards.view_of(card_id)
         params = self._get_trello_params()
+        params.update(view_params(view))
         card = self._request_and_validate(url, params=params)
 
-        self._populate_cache([card])
+        self._populate_cache([card], view)
         return card
 
-    def get_trello_card(self, card_id: str) -> dict:
-        "gets a card from the cache, or fetches it"
-        if card_id in self._cached_cards:
+    @_holds_lock
+    def get_trello_card(
+        self,
+        card_id: str,
+        fields=None,
+        custom_field_items: bool = False,
+        checklists: bool = False,
+    ) -> dict:
+        "gets a card from the cache, or fetches it if it isn't cached with the fields asked for"
+        view = card_view(fields, custom_field_items, checklists)
+        if card_id in self._cached_cards and view_covers(
+            self._cached_cards.view_of(card_id), view
+        ):
             return self._cached_cards[card_id]
         else:
-            return self.fetch_trello_card(card_id)
+            return self.fetch_trello_card(
+                card_id, fields, custom_field_items, checklists
+            )
 
+    def fetch_trello_cards_by_id(
+        self, card_ids, max_workers: int = DEFAULT_CONCURRENCY
+    ) -> dict:
+        """returns `{card id: card}` for the given ids, fetching any that aren't cached with all their fields via trello's `/1/batch` endpoint
+
+        Uncached ids are grouped `BATCH_SIZE` to a request, with up to `max_workers` requests in flight.
+        Cards that couldn't be fetched are left out of the result."""
+        wanted = list(dict.fromkeys(card_ids))
+        with self.lock:
+            missing = [
+                card_id
+                for card_id in wanted
+                if card_id not in self._cached_cards
+                or not view_covers(self._cached_cards.view_of(card_id), DEFAULT_VIEW)
+            ]
+        batches = [
+            missing[start : start + BATCH_SIZE]
+            for start in range(0, len(missing), BATCH_SIZE)
+        ]
+        fetched = {}
+        for cards in run_concurrently(self._fetch_card_batch, batches, max_workers):
+            fetched.update(cards)
+        found = {}
+        with self.lock:
+            self._populate_cache(fetched.values())
+            for card_id in wanted:
+                card = fetched.get(card_id, self._cached_cards.get(card_id))
+                if card is not None:
+                    found[card_id] = card
+        return found
+
+    def _fetch_card_batch(self, card_ids: list, view: frozenset = DEFAULT_VIEW) -> dict:
+        "fetches up to `BATCH_SIZE` cards with `view` in a single `/1/batch` request, returning them keyed by the ids asked for"
+        url = f"{BASE_URL}batch"
+        # the urls are comma separated, and urlencode escapes the commas inside each one's query
+        query = "" if view == DEFAULT_VIEW else f"?{urlencode(view_params(view))}"
+        params = {"urls": ",".join(f"/cards/{card_id}{query}" for card_id in card_ids)}
+        responses = self._request_and_validate(url, params=params)
+        cards = {}
+        if not isinstance(responses, list):
+            return cards
+        # each response is keyed by its status code, e.g. `{"200": {...card...}}`
+        for card_id, response in zip(card_ids, responses):
+            card = response.get("200") if isinstance(response, dict) else None
+            if isinstance(card, dict) and "id" in card:
+                cards[card_id] = card
+            else:
+                _LO.warning("Couldn't fetch card %s in a batch - %s", card_id, response)
+        return cards
+
+    @_holds_lock
     def convert_index_to_pos(self, list_id, position) -> float:
         "takes the index of a card, and finds a suitable position float value for it"
-        cards = self.get_all_cards_on_list(list_id)
-        cards = self._sort_trello_cards_dict(cards)
+        self._require_view(_LIST_VIEW)
+        # (pos, card id) pairs, already sorted by the cache
+        positions = self._cached_cards.list_positions(list_id)
 
-        cards = list(cards.items())
-        if len(cards) == 1:
-            return cards[0][1].get("pos", 0) + 1
-        if len(cards) == 0:
+        if len(positions) == 1:
+            return positions[0][0] + 1
+        if len(positions) == 0:
             return 0
         if position == 0:
-            return (cards[0][1].get("pos", 0)) / 2
+            return positions[0][0] / 2
         if position == -1:
-            return cards[len(cards) - 1][1].get("pos", 0) + 0.0000001
+            return positions[-1][0] + 0.0000001
 
         try:
-            card = cards[position]
-            prev_card = cards[position - 1]
-            pos = (prev_card[1]["pos"] + card[1]["pos"]) / 2
+            pos = (positions[position - 1][0] + positions[position][0]) / 2
             return pos
         except IndexError:
             _LO.error(
-                "got a horrible value when trying to convert index to pos value - index=[%s], len=[%s]"
+                "got a horrible value when trying to convert index to pos value - index=[%s], len=[%s]",
+                position,
+                len(positions),
             )
             return 0
 
@@ -209,7 +721,30 @@ class trello:
         Filter should be a comma seperated list of action types:
         https://developer.atlassian.com/cloud/trello/guides/rest-api/action-types/
 
-        returns a list of lists of actions, each list being a page of actions
+        returns a list of actions, newest first
+        """
+        return list(
+            self.iter_board_actions(
+                since=since, before=before, limit=limit, actions_filter=actions_filter
+            )
+        )
+
+    def iter_board_actions(
+        self,
+        since: str = None,
+        before: str = None,
+        limit: int = None,
+        actions_filter: str = None,
+    ):
+        """yields the board's actions newest first, fetching a page at a time as they're consumed
+
+        Args:
+            `since` (str): only actions newer than this action id
+            `before` (str): only actions older than this action id
+            `limit` (int): stop after this many actions, defaults to the board's whole history
+            `actions_filter` (str): a comma seperated list of action types, as for `fetch_actions_for_board`
+
+        Pages of up to `ACTIONS_PAGE_SIZE` are walked backwards, each one `before` the oldest action of the last.
         """
 
         url = f"{BASE_URL}boards/{self.board_id}/actions"
@@ -218,23 +753,41 @@ class trello:
             "memberCreator": "false",
             "member": "false",
         }
-        if limit is not None:
-            params["limit"] = limit
         if since is not None:
             params["since"] = since
-        if before is not None:
-            params["before"] = before
         if actions_filter is not None:
             params["filter"] = actions_filter
 
-        actions = self._request_and_validate_paginated(
-            url,
-            params=params,
-            page_limit=10,
-            page_size_limit=50,
-            since=since,
-        )
-        return actions
+        remaining = limit
+        previous_ids = set()
+        page_number = 1
+        while remaining is None or remaining > 0:
+            page_size = (
+                ACTIONS_PAGE_SIZE
+                if remaining is None
+                else min(remaining, ACTIONS_PAGE_SIZE)
+            )
+            params["limit"] = page_size
+            if before is not None:
+                params["before"] = before
+            actions = self._request_and_validate(url, params=params, page=page_number)
+            if not isinstance(actions, list):
+                _LO.error(
+                    "Couldn't get page %s of actions for board %s",
+                    page_number,
+                    self.board_id,
+                )
+                return
+            # `before` is exclusive, but don't trust a page that overlaps the last one
+            fresh = [action for action in actions if action["id"] not in previous_ids]
+            yield from fresh
+            if not fresh or len(actions) < page_size:
+                return
+            if remaining is not None:
+                remaining -= len(fresh)
+            before = actions[-1]["id"]
+            previous_ids = {action["id"] for action in actions}
+            page_number += 1
 
     def create_card(
         self,
@@ -247,22 +800,13 @@ class trello:
     ):
         "`position` is the numerical index of the card on the list it's appearing on. 0 = top, 1 = second, -1 = last"
 
-        params = self._get_trello_params()
-        params["name"] = title
-
-        if description is not None:
-            params["desc"] = description
-        if labelID is not None:
-            params["idLabels"] = labelID
-        if dueTimestamp is not None:
-            params["due"] = dueTimestamp
+        params = self._card_params(title, list_id, description, labelID, dueTimestamp)
         if position is not None and position >= 0:
             # if position is -1 (bottom) then use default behaviour
             params["pos"] = self.convert_index_to_pos(list_id, position)
-        params["idList"] = list_id
 
         url = f"{BASE_URL}cards/"
-        r = requests.post(url, params=params, timeout=10)
+        r = self.transport.post(url, params=params, limiter=self._limiter)
         if r.status_code != 200:
             print(
                 "Unexpected response code [%s], whilst creating card [%s]"
@@ -276,6 +820,88 @@ class trello:
             self.dirty_cache = True
         return card
 
+    def create_cards(self, cards: list, max_workers: int = DEFAULT_CONCURRENCY) -> list:
+        """creates several cards at once, returning the new cards in the order given (None for any that failed)
+
+        Args:
+            `cards` (list): dicts of `create_card`'s arguments - `title` and `list_id`, optionally `description`, `labelID`, `dueTimestamp` and `position`
+            `max_workers` (int): how many cards to create at a time
+
+        Every card's `pos` is worked out up front from the cache, as if they were created one after another,
+        so the POSTs can be sent concurrently. The new cards are added to the cache as they come back.
+        A card that fails doesn't stop the others, but marks the cache dirty, as trello may have created it anyway.
+        """
+        self._require_view(_LIST_VIEW)
+
+        planned = {}  # list id -> the positions on it, including the cards planned so far
+        to_post = []
+        for card in cards:
+            list_id = card["list_id"]
+            if list_id not in planned:
+                with self.lock:
+                    planned[list_id] = [
+                        pos for pos, _ in self._cached_cards.list_positions(list_id)
+                    ]
+            positions = planned[list_id]
+            params = self._card_params(
+                card["title"],
+                list_id,
+                card.get("description"),
+                card.get("labelID"),
+                card.get("dueTimestamp"),
+            )
+            params["pos"] = _planned_pos(positions, card.get("position"))
+            insort(positions, params["pos"])
+            to_post.append(params)
+
+        created = run_concurrently(self._post_card, to_post, max_workers)
+        with self.lock:
+            self._populate_cache([card for card in created if card is not None])
+            if None in created:
+                self.dirty_cache = True
+        return created
+
+    def _card_params(
+        self, title, list_id, description=None, labelID=None, dueTimestamp=None
+    ) -> dict:
+        "the params for creating a card"
+        params = self._get_trello_params()
+        params["name"] = title
+        if description is not None:
+            params["desc"] = description
+        if labelID is not None:
+            params["idLabels"] = labelID
+        if dueTimestamp is not None:
+            params["due"] = dueTimestamp
+        params["idList"] = list_id
+        return params
+
+    def _post_card(self, params: dict) -> dict:
+        "creates a single card from `_card_params`, returning it or None on failure"
+        url = f"{BASE_URL}cards/"
+        try:
+            r = self.transport.post(url, params=params, limiter=self._limiter)
+        except requests.RequestException as err:
+            _LO.warning("Couldn't create card [%s] - %s", params.get("name"), err)
+            return None
+        if r.status_code != 200:
+            _LO.warning(
+                "Unexpected response code [%s], whilst creating card [%s] - %s",
+                r.status_code,
+                params.get("name"),
+                r.content,
+            )
+            return None
+        try:
+            card = json.loads(r.content)
+        except ValueError as err:
+            _LO.error("Couldn't parse the card created for [%s] - %s", params.get("name"), err)
+            return None
+        if not isinstance(card, dict) or "id" not in card:
+            _LO.error("Unexpected card created for [%s] - %s", params.get("name"), card)
+            return None
+        return card
+
     def update_card(
         self,
         card_id: str,
@@ -298,7 +924,7 @@ class trello:
         if new_due_timestamp is not None:
             params["due"] = new_due_timestamp
         url = f"{BASE_URL}cards/%s" % (card_id)
-        r = requests.put(url, params=params, timeout=10)
+        r = self.transport.put(url, params=params, limiter=self._limiter)
         if r.status_code != 200:
             _LO.error(
                 "ERROR: %s couldn't update the Gmail Trello card's name", r.status_code
@@ -315,7 +941,7 @@ class trello:
         params["idCard"] = cardID
         params["name"] = checklistName
 
-        r = requests.post(url, params=params, timeout=10)
+        r = self.transport.post(url, params=params, limiter=self._limiter)
 
         if r.status_code != 200:
             print(
@@ -333,7 +959,7 @@ class trello:
         params = self._get_trello_params()
         params["pos"] = "bottom"
         params["name"] = text
-        r = requests.post(url, params=params, timeout=10)
+        r = self.transport.post(url, params=params, limiter=self._limiter)
         if r.status_code != 200:
             print(
                 "ERROR: %s when attempting add to a trello checklist (HabiticaMapper) \n%s",
@@ -352,7 +978,7 @@ class trello:
             checklist_item_id,
         )
         params = self._get_trello_params()
-        r = requests.delete(url, params=params, timeout=10)
+        r = self.transport.delete(url, params=params, limiter=self._limiter)
         if r.status_code != 200:
             _LO.error(
                 "ERROR: %s, Couldn't delete trello checklist item %s ",
@@ -362,12 +988,148 @@ class trello:
 
         self.dirty_cache = True
 
+    def create_checklist_with_items(
+        self,
+        card_id: str,
+        name: str,
+        items: list,
+        max_workers: int = DEFAULT_CONCURRENCY,
+    ) -> str:
+        """creates a checklist on an existing card and fills it with `items`, returning the checklist's ID
+
+        The items are added `max_workers` at a time, each with its position worked out up front so they keep their order.
+        """
+        url = f"{BASE_URL}checklists"
+        params = self._get_trello_params()
+        params["idCard"] = card_id
+        params["name"] = name
+        r = self.transport.post(url, params=params, limiter=self._limiter)
+        if r.status_code != 200:
+            _LO.error(
+                "ERROR: %s when attempting create a trello checklist on card %s - %s",
+                r.status_code,
+                card_id,
+                r.content,
+            )
+            return
+        checklist_id = json.loads(r.content)["id"]
+
+        additions = [
+            (checklist_id, item, POS_STEP * (index + 1))
+            for index, item in enumerate(items)
+        ]
+        try:
+            run_concurrently(self._add_checklist_item, additions, max_workers)
+        finally:
+            self._refresh_checklist_card(card_id)
+        return checklist_id
+
+    def sync_checklist(
+        self,
+        checklist_id: str,
+        desired_items: list,
+        max_workers: int = DEFAULT_CONCURRENCY,
+    ) -> bool:
+        """makes a checklist hold exactly `desired_items`, adding and deleting only the items that differ
+
+        Items are matched by name. Kept items stay where they are, and new ones are added to the bottom in the order given.
+        Returns True if every change was made
+        """
+        checklist = self.fetch_checklist_content(checklist_id)
+        if "checkItems" not in checklist:
+            _LO.error("Couldn't fetch trello checklist %s to sync it", checklist_id)
+            return False
+
+        wanted = {}
+        for item in desired_items:
+            wanted[item] = wanted.get(item, 0) + 1
+        existing = sorted(checklist["checkItems"], key=lambda item: item.get("pos", 0))
+        deletions = []
+        for item in existing:
+            if wanted.get(item["name"], 0) > 0:
+                wanted[item["name"]] -= 1
+            else:
+                deletions.append((checklist_id, item["id"]))
+
+        bottom = max((item.get("pos", 0) for item in existing), default=0)
+        additions = []
+        for item in desired_items:
+            if wanted[item] > 0:
+                wanted[item] -= 1
+                pos = bottom + POS_STEP * (len(additions) + 1)
+                additions.append((checklist_id, item, pos))
+
+        if not deletions and not additions:
+            return True
+        try:
+            deleted = run_concurrently(
+                self._delete_checklist_item, deletions, max_workers
+            )
+            added = run_concurrently(self._add_checklist_item, additions, max_workers)
+        finally:
+            self._refresh_checklist_card(checklist.get("idCard"))
+        return all(deleted) and all(item is not None for item in added)
+
+    def _add_checklist_item(self, addition: tuple) -> dict:
+        "adds a `(checklist id, name, pos)` item to a checklist without touching the cache, returns the item or None"
+        checklist_id, name, pos = addition
+        url = f"{BASE_URL}checklists/%s/checkItems" % (checklist_id)
+        params = self._get_trello_params()
+        params["pos"] = pos
+        params["name"] = name
+        try:
+            r = self.transport.post(url, params=params, limiter=self._limiter)
+        except requests.RequestException as err:
+            _LO.error(
+                "Couldn't add %s to trello checklist %s - %s", name, checklist_id, err
+            )
+            return None
+        if r.status_code != 200:
+            _LO.error(
+                "ERROR: %s when attempting add %s to trello checklist %s",
+                r.status_code,
+                name,
+                checklist_id,
+            )
+            return None
+        return json.loads(r.content)
+
+    def _delete_checklist_item(self, deletion: tuple) -> bool:
+        "deletes a `(checklist id, item id)` item without touching the cache, returns True on success"
+        checklist_id, item_id = deletion
+        url = f"{BASE_URL}checklists/%s/checkItems/%s" % (checklist_id, item_id)
+        try:
+            r = self.transport.delete(
+                url, params=self._get_trello_params(), limiter=self._limiter
+            )
+        except requests.RequestException as err:
+            _LO.error(
+                "Couldn't delete trello checklist item %s - %s", item_id, err
+            )
+            return False
+        if r.status_code != 200:
+            _LO.error(
+                "ERROR: %s, Couldn't delete trello checklist item %s ",
+                r.status_code,
+                item_id,
+            )
+            return False
+        return True
+
+    @_holds_lock
+    def _refresh_checklist_card(self, card_id: str) -> None:
+        "refetches a cached card after its checklists change, rather than invalidating the whole cache"
+        if card_id in self._cached_cards:
+            self._refetch_card(card_id)
+
     def _setCustomFieldValue(self, cardID, value, fieldID):
         url = f"{BASE_URL}card/%s/customField/%s/item" % (cardID, fieldID)
         data = json.dumps({"value": {"text": "%s" % (value)}})
         params = self._get_trello_params()
         headers = {"Content-type": "application/json"}
-        r = requests.put(url=url, data=data, params=params, headers=headers, timeout=10)
+        r = self.transport.put(
+            url=url, data=data, params=params, headers=headers, limiter=self._limiter
+        )
         if r.status_code != 200:
             _LO.error(
                 "Unexpected response code [%s], whilst updating card  %s's field ID %s",
@@ -383,7 +1145,7 @@ class trello:
         url = f"{BASE_URL}card/%s" % (trelloCardID)
         params = self._get_trello_params()
         params["closed"] = True
-        r = requests.put(url, params=params, timeout=10)
+        r = self.transport.put(url, params=params, limiter=self._limiter)
         if r.status_code != 200:
             print(r)
             print(r.reason)
@@ -401,7 +1163,9 @@ class trello:
             "type": "text",
             "pos": "bottom",
         }
-        result = requests.post(url, data=data, params=params, timeout=10)
+        result = self.transport.post(
+            url, data=data, params=params, limiter=self._limiter
+        )
         if result.status_code != 200:
             _LO.warning("Creation of a custom field failed!")
             return ""
@@ -423,7 +1187,9 @@ class trello:
     def delete_trello_card(self, trelloCardID):
         "deletes an exisiting trello card"
         url = f"{BASE_URL}card/%s" % (trelloCardID)
-        r = requests.delete(url, params=self._get_trello_params(), timeout=10)
+        r = self.transport.delete(
+            url, params=self._get_trello_params(), limiter=self._limiter
+        )
         if r.status_code != 200:
             print(r)
             print(r.reason)
@@ -453,16 +1219,20 @@ class trello:
         # x[1] is the card - a dict, and x[0] is the id, a string.
         return sorted_dict
 
-    def _populate_cache(self, array_of_cards: list) -> None:
-        "takes a list of cards and puts them into the _cached_cards dict"
+    @_holds_lock
+    def _populate_cache(
+        self, array_of_cards: list, view: frozenset = DEFAULT_VIEW
+    ) -> None:
+        "takes a list of cards fetched with `view` and puts them into the _cached_cards dict"
         for card in array_of_cards:
             card: dict
             if "id" not in card:
                 _LO.warning("skipped adding a card to the cache, no id present")
                 continue
 
-            self._cached_cards[card.get("id")] = card
+            self._cached_cards.put(card.get("id"), card, view)
 
+    @_holds_lock
     def _try_update_cache(self, response_content) -> bool:
         "attempts to parse the raw response from update/create and turn it into a cached card. Returns True on success"
 
@@ -484,11 +1254,17 @@ class trello:
             )
             logger.debug("supplied object %s", response_content)
             return False
+        if not isinstance(card, dict) or "id" not in card:
+            logger.error("error in _try_update_cache, response isn't a card")
+            return False
 
-        self._cached_cards[card.get("id")] = card
+        # create and update responses hold every field, but not the custom fields or checklists
+        self._cached_cards.put(card["id"], card, DEFAULT_VIEW)
         return True
 
-    def _request_and_validate(self, url, headers=None, params=None, body=None, retry=0) -> dict:
+    def _request_and_validate(
+        self, url, headers=None, params=None, body=None, page=None
+    ) -> dict:
         """internal method to make a GET request and return the parsed json response (either a dict of cards, or a dict of actions, or whatever is returned)
 
         arguments:
@@ -496,6 +1272,9 @@ class trello:
             `headers` - any additional headers to send
             `params` - any additional params to send (the key and token are added automatically)
             `body` - any additional body to send
+            `page` - the page number, when called as part of a paginated walk (used to label instrumentation)
+
+        429s are retried by the transport, throttled by the limiter shared with every helper using this token.
 
         returns:
             a dict of the parsed json response, or an empty dict on failure
@@ -505,13 +1284,40 @@ class trello:
         else:
             params = {**params, **self._get_trello_params()}
 
+        use_response_cache = self.response_cache is not None and body is None
+        if use_response_cache:
+            cached = self.response_cache.get(url, params, headers)
+            if cached is not None:
+                return cached
+
+        use_etag_cache = self.etag_cache is not None and body is None
         try:
-            result = requests.get(
-                url=url, headers=headers, data=body, params=params, timeout=10
-            )
+            if use_etag_cache:
+                result, cached = self.etag_cache.send(
+                    self.transport,
+                    url,
+                    params,
+                    headers,
+                    limiter=self._limiter,
+                    page=page,
+                )
+                if result.status_code == 304:
+                    return cached
+            else:
+                result = self.transport.get(
+                    url=url,
+                    headers=headers,
+                    data=body,
+                    params=params,
+                    limiter=self._limiter,
+                    page=page,
+                )
         except ConnectionError as e:
             _LO.error("Couldn't connect to %s - %s", url, e)
             return {}
+        if result.status_code == 429:
+            _LO.error("Still rate limited at %s after retrying, giving up", url)
+            return {}
         if result.status_code == 400:
             _LO.error("Invalid request to %s - %s", url, result.content)
             return {}
@@ -526,16 +1332,6 @@ class trello:
                 "Got an invalid response: %s - %s ", result.status_code, result.content
             )
             return {}
-        if result.status_code == 429:
-            _LO.warning("Rate limit, standing by for a moment")
-            if retry >= 5:
-                return {}
-
-            retry += 1
-            time.sleep (pow(retry,2)*1000)
-            self._request_and_validate(self, url, headers=None, params=None, body=None, retry=0)
-
-            # sleep for an increasing set of seconds
         try:
             parsed_content = json.loads(result.content)
             if "cards" in parsed_content:
@@ -545,44 +1341,8 @@ class trello:
         except json.JSONDecodeError as e:
             _LO.error("Couldn't parse JSON from %s - %s", url, e)
             return {}
+        if use_etag_cache:
+            self.etag_cache.store(result, parsed_content, url, params, headers)
+        if use_response_cache:
+            self.response_cache.set(url, parsed_content, params, headers)
         return parsed_content
-
-    # we haven't handled pagination yet - this was copied from the zendesk thing.
-    def _request_and_validate_paginated(
-        self,
-        url,
-        params=None,
-        headers=None,
-        body=None,
-        page_limit=None,
-        page_size_limit=None,
-        since=None,
-    ) -> list:
-        params = {} if params is None else params
-        params["limit"] = page_size_limit
-
-        page_limit = 10 if page_limit is None else page_limit
-        page_size_limit = 100 if page_size_limit is None else page_size_limit
-        next_page = 1
-        pages = []
-        if since is not None:
-            params["since"] = since
-        while next_page is not None:
-            r_url = f"{url}"
-            try:
-                resp = self._request_and_validate(r_url, headers, params, body)
-            except Exception as e:
-                _LO.error("Couldn't get page %s from %s- %s", next_page, url, e)
-                break
-            if resp in pages or len(resp) == 0:
-                break
-            pages.append(resp)
-
-            # this is probably going to break at some point
-            params["since"] = resp[0]["id"]
-            # check if `resp` is already in `pages``
-
-        flattened_list = []
-        for page in pages:
-            flattened_list.extend(page)
-        return flattened_list
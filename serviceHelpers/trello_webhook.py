@@ -0,0 +1,112 @@
+"""A receiver for trello webhooks that keeps a `trello` helper's card cache up to date.
+
+`TrelloWebhookApp` is a WSGI app, so it can be mounted in an existing service or run on its own
+with `make_webhook_server`:
+
+    board = trello(board_id, key, token)
+    board.fetch_trello_cards()
+    server = make_webhook_server(TrelloWebhookApp(board, secret, callback_url), port=8080)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+Every delivery's `X-Trello-Webhook` signature is checked against the app secret before its
+action is applied. Actions are applied holding the helper's `lock`, which its own reads of the
+card cache hold too, so the board can be read on other threads while deliveries arrive.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+_LO = logging.getLogger("TrelloWebhook")
+
+SIGNATURE_HEADER = "HTTP_X_TRELLO_WEBHOOK"
+# action payloads are small, anything bigger than this isn't from trello
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def compute_signature(secret: str, body: bytes, callback_url: str) -> str:
+    "the signature trello sends with a delivery: base64 HMAC-SHA1 of the body followed by the callback URL, keyed by the app secret"
+    digest = hmac.new(
+        secret.encode(), body + callback_url.encode(), hashlib.sha1
+    ).digest()
+    return base64.b64encode(digest).decode()
+
+
+class TrelloWebhookApp:
+    """A WSGI app that applies the actions trello delivers for one board to a helper's card cache
+
+    Args:
+        `helper` (trello): the helper for the board the webhook was registered on
+        `secret` (str): the trello app secret, used to check each delivery's signature
+        `callback_url` (str): the URL exactly as the webhook was registered with, which is part of the signature
+    """
+
+    def __init__(self, helper, secret: str, callback_url: str) -> None:
+        self.helper = helper
+        self.secret = secret
+        self.callback_url = callback_url
+        self.applied = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method == "HEAD":
+            # trello checks the callback URL responds before creating the webhook
+            return self._respond(start_response, "200 OK")
+        if method != "POST":
+            return self._respond(start_response, "405 Method Not Allowed")
+
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        if length > MAX_BODY_BYTES:
+            return self._respond(start_response, "413 Payload Too Large")
+        body = environ["wsgi.input"].read(length)
+
+        if not self.verify(body, environ.get(SIGNATURE_HEADER, "")):
+            _LO.warning("Rejected a trello webhook delivery with a bad signature")
+            with self._lock:
+                self.rejected += 1
+            return self._respond(start_response, "401 Unauthorized")
+        try:
+            action = json.loads(body)["action"]
+        except (ValueError, KeyError, TypeError) as err:
+            _LO.error("Couldn't parse a trello webhook delivery - %s", err)
+            return self._respond(start_response, "400 Bad Request")
+
+        # under the helper's lock, so each action's changes to the cache are applied whole,
+        # and never while another thread is reading it
+        with self.helper.lock:
+            self.helper.apply_board_action(action)
+        with self._lock:
+            self.applied += 1
+        return self._respond(start_response, "200 OK")
+
+    def verify(self, body: bytes, signature: str) -> bool:
+        "whether `signature` is the one trello would send for `body`"
+        expected = compute_signature(self.secret, body, self.callback_url)
+        # WSGI headers are latin-1 strings, and compare_digest only takes ASCII ones
+        return hmac.compare_digest(expected.encode(), signature.encode("latin-1"))
+
+    @staticmethod
+    def _respond(start_response, status: str) -> list:
+        start_response(
+            status, [("Content-Type", "text/plain"), ("Content-Length", "0")]
+        )
+        return [b""]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args) -> None:
+        _LO.debug(format, *args)
+
+
+def make_webhook_server(app: TrelloWebhookApp, host: str = "127.0.0.1", port: int = 0):
+    "a stdlib HTTP server for the app. Port 0 picks a free one, see `server.server_port`. Call `serve_forever` to start it"
+    return make_server(host, port, app, handler_class=_QuietHandler)
@@ -0,0 +1,130 @@
+"""Manages `trello` helpers for many boards at once.
+
+Every board handed out by a `TrelloWorkspace` shares one pooled transport, and the cards they
+cache count against a single budget. When the budget is exceeded, the least recently used
+boards have their card caches dropped. Their handles stay valid and fetch the board again the
+next time it's read.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from serviceHelpers._common import HttpTransport, get_default_transport
+from serviceHelpers.trello import trello
+
+_LO = logging.getLogger("TrelloWorkspace")
+
+DEFAULT_MAX_CACHED_CARDS = 50000
+
+
+class TrelloWorkspace:
+    """A set of trello boards sharing a transport and a card cache budget
+
+    Args:
+        `key` (str): the trello api key
+        `token` (str): the trello api token for the authenticated user
+        `board_ids` (list): boards to register up front, searched by `find_trello_cards`. Others are added as they're asked for
+        `transport` (HttpTransport): the pooled transport every board sends requests through, defaults to the shared one
+        `max_cached_cards` (int): the most cards kept cached across all boards
+        `board_options`: passed on to each `trello`, e.g. `incremental_sync` or `compact_cards`
+    """
+
+    def __init__(
+        self,
+        key: str,
+        token: str,
+        board_ids: list = (),
+        transport: HttpTransport = None,
+        max_cached_cards: int = DEFAULT_MAX_CACHED_CARDS,
+        **board_options,
+    ) -> None:
+        self.key = key
+        self.token = token
+        self.transport = transport if transport is not None else get_default_transport()
+        self.max_cached_cards = max_cached_cards
+        self.board_options = board_options
+        self._boards = OrderedDict()  # board id -> trello, least recently used first
+        self._lock = threading.RLock()
+        for board_id in board_ids:
+            self.board(board_id)
+
+    @property
+    def board_ids(self) -> list:
+        return list(self._boards)
+
+    def board(self, board_id: str) -> trello:
+        "the helper for a board, created on first use. Marks the board as the most recently used"
+        with self._lock:
+            helper = self._boards.get(board_id)
+            if helper is None:
+                helper = trello(
+                    board_id,
+                    self.key,
+                    self.token,
+                    transport=self.transport,
+                    **self.board_options,
+                )
+                self._boards[board_id] = helper
+            self._boards.move_to_end(board_id)
+            self.enforce_budget()
+            return helper
+
+    def cached_card_count(self) -> int:
+        "how many cards are cached across every board"
+        with self._lock:
+            total = 0
+            for helper in self._boards.values():
+                with helper.lock:
+                    total += len(helper._cached_cards)
+            return total
+
+    def enforce_budget(self) -> None:
+        """drops the card caches of the least recently used boards until the workspace is within `max_cached_cards`
+
+        The most recently used board is never evicted, even if it's over the budget on its own.
+        This runs whenever a board is handed out or searched, boards used directly grow until then."""
+        with self._lock:
+            total = self.cached_card_count()
+            for board_id, helper in list(self._boards.items())[:-1]:
+                if total <= self.max_cached_cards:
+                    break
+                if not helper._cached_cards:
+                    continue
+                _LO.debug(
+                    "Evicting the %s cached cards of board %s",
+                    len(helper._cached_cards),
+                    board_id,
+                )
+                total -= len(helper._cached_cards)
+                self.evict(board_id)
+
+    def evict(self, board_id: str) -> None:
+        "drops a board's cached cards, they'll be fetched again the next time the board is read"
+        with self._lock:
+            helper = self._boards.get(board_id)
+            if helper is None:
+                return
+            with helper.lock:
+                helper._cached_cards.clear()
+                helper.dirty_cache = True
+                helper.last_action_id = None
+
+    def find_trello_cards(self, regex, board_ids: list = None) -> list:
+        """uses regexes to search name and description of the cards on every board, or just `board_ids`. Returns all cards found.
+
+        Each board answers from its own search index, fetching its cards first if they aren't cached."""
+        found = []
+        for board_id in self.board_ids if board_ids is None else board_ids:
+            found.extend(self.board(board_id).find_trello_cards(regex))
+            self.enforce_budget()
+        return found
+
+    def find_trello_card(self, regex, board_ids: list = None) -> dict:
+        "as `find_trello_cards`, but returns the first card found, stopping once there is one"
+        for board_id in self.board_ids if board_ids is None else board_ids:
+            card = self.board(board_id).find_trello_card(regex)
+            self.enforce_budget()
+            if card is not None:
+                return card
+        return None
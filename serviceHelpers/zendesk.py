@@ -1,7 +1,19 @@
 import json
 import logging
-import requests
-
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+from serviceHelpers._common import (
+    DEFAULT_CONCURRENCY,
+    ConditionalCache,
+    HttpTransport,
+    get_default_transport,
+    get_rate_limiter,
+    run_concurrently,
+)
+from serviceHelpers.response_cache import SqliteResponseCache
 
 from serviceHelpers.models.ZendeskTicket import ZendeskTicket
 from serviceHelpers.models.ZendeskOrg import ZendeskOrganisation
@@ -10,15 +22,87 @@ from serviceHelpers.models.ZendeskWorklog import ZendeskWorklog
 
 _LO = logging.getLogger("ZendeskMapper")
 
+# items per page when cursor paginating, the most zendesk recommends
+PAGE_SIZE = 100
+# the most ids `users/show_many` takes in one request
+USERS_PER_REQUEST = 100
+# everything a ticket fetch can side-load, for the `include` arguments
+SIDELOADS = "users,organizations,groups"
+# seconds a user is served from a helper's identity map before it's fetched again
+DEFAULT_USER_TTL = 300
+
+
+class CursorStore:
+    """Remembers where incremental exports got to, in a small JSON file, so the next run resumes from there
+
+    Args:
+        `path` (str): the file to keep the cursors in, created when the first one is saved
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as store:
+                return json.load(store)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            _LO.error("Couldn't read the cursor store %s - %s", self.path, err)
+            return {}
+
+    def get(self, name: str) -> str:
+        "the cursor saved under `name`, or None"
+        with self._lock:
+            return self._read().get(name)
+
+    def set(self, name: str, cursor: str) -> None:
+        "saves a cursor under `name`, replacing the file whole so a crash can't leave it half written"
+        with self._lock:
+            cursors = self._read()
+            cursors[name] = cursor
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as store:
+                json.dump(cursors, store)
+            os.replace(temp_path, self.path)
 
-class zendesk:
-    """Represents a single zendesk tenency, and exposes methods for interacting with it via the API."""
 
-    def __init__(self, host: str, api_key):
+class zendesk:
+    """Represents a single zendesk tenency, and exposes methods for interacting with it via the API.
+
+    Args:
+        `host` (str): the zendesk host, e.g. `example.zendesk.com`
+        `api_key` (str): the base64 encoded credentials used for basic auth
+        `transport` (HttpTransport): the pooled transport to send requests through, defaults to the shared one
+        `etag_cache` (ConditionalCache): opt-in cache, makes repeat GETs conditional so unchanged users/forms come back as a cheap 304
+        `response_cache` (SqliteResponseCache): opt-in persistent cache, serves GETs for endpoints it has a TTL for (e.g. ticket forms) from disk
+        `user_ttl` (float): seconds a user fetched or side-loaded is reused for before being fetched again, 0 to always fetch
+    """
+
+    def __init__(
+        self,
+        host: str,
+        api_key,
+        transport: HttpTransport = None,
+        etag_cache: ConditionalCache = None,
+        response_cache: SqliteResponseCache = None,
+        user_ttl: float = DEFAULT_USER_TTL,
+    ):
 
         self.host = host
         self.key = api_key
+        self.transport = transport if transport is not None else get_default_transport()
+        self._limiter = get_rate_limiter("zendesk", api_key)
+        self.etag_cache = etag_cache
+        self.response_cache = response_cache
         self._headers = {"Authorization": f"Basic {self.key}"}
+        self.incremental_cursor = None  # where the last incremental export got to
+        self.user_ttl = user_ttl
+        # user id -> (ZendeskUser, when it was fetched), so each user is parsed once
+        self._users = {}
+        self._users_lock = threading.Lock()
         self.logger = _LO
         if host is None or api_key is None:
             _LO.warning("Zendesk object initialised without necessary parameters!!")
@@ -30,11 +114,8 @@ class zendesk:
         if ticket:
             ticket_id = ticket.id
         
-        url = f"https://{self.host}/api/v2/tickets/{ticket_id}/comments?sort=-created_at"
-        
         try:
-            response = self._request_and_validate_paginated(url)
-            comments = response[0]["comments"]
+            comments = list(self.iter_comments(ticket_id))
             if ticket is not None: #if we're searching by ticket, not by ticket_id
                 ticket.comments = comments
                 return ticket #return a ticket that now includes comments
@@ -43,50 +124,224 @@ class zendesk:
             self.logger.error("Unknown error when getting comments for ticket %s, %s", ticket_id,err)
         return []
 
-    def search_for_tickets(self, search_string):
+    def iter_comments(self, ticket_id: int):
+        "yields a ticket's comments newest first, fetching a page at a time as they're consumed"
+        url = f"https://{self.host}/api/v2/tickets/{ticket_id}/comments?sort=-created_at"
+        for page in self._iter_pages(url):
+            yield from page.get("comments", [])
+
+    def search_for_tickets(self, search_string, include: str = None):
         """uses the zendesk search notation that's detailed here:
         https://developer.zendesk.com/api-reference/ticketing/ticket-management/search/
+
+        `include` side-loads related records onto the tickets, see `iter_tickets`
         """
-        # gets the most recently 100 Zendesk tickets.
-        url = (
-            f"https://{self.host}/api/v2/search.json?query=type:ticket {search_string}"
-        )
-
-        pages = self._request_and_validate_paginated(url)
-        tickets = {}
-        for page in pages:
-            for ticket_j in page.get("results", []):
-                ticket_o = ZendeskTicket(self.host)
-                ticket_o.from_dict(ticket_j)
-                tickets[ticket_o.id] = ticket_o
+        return {
+            ticket.id: ticket for ticket in self.iter_tickets(search_string, include)
+        }
+
+    def iter_tickets(self, search_string, include: str = None):
+        """yields a `ZendeskTicket` for each search result, fetching a page at a time as they're consumed
+
+        Takes the same search notation as `search_for_tickets`. Uses the search export endpoint,
+        which cursor paginates and so isn't capped at 1000 results.
+        `include` is any of `SIDELOADS`, e.g. "users,groups", filling in each ticket's `requester`, `assignee`, `organisation` and `group`."""
+        url = f"https://{self.host}/api/v2/search/export.json?query={search_string}&filter[type]=ticket"
+        if include:
+            url = f"{url}&include=tickets({include})"
+        for page in self._iter_pages(url):
+            yield from self._tickets_from_page(page, "results", include)
+
+    def get_ticket(self, ticket_id: int, include: str = None) -> ZendeskTicket:
+        "fetches a single ticket, `include` side-loads related records as for `iter_tickets`"
+        url = f"https://{self.host}/api/v2/tickets/{ticket_id}.json"
+        if include:
+            url = f"{url}?include={include}"
+        response = self._request_and_validate(url)
+        if "ticket" not in response:
+            return None
+        return self._tickets_from_page(
+            {**response, "tickets": [response["ticket"]]}, "tickets", include
+        )[0]
+
+    def _tickets_from_page(self, page: dict, key: str, include: str = None) -> list:
+        "parses the tickets in a page, linking them to whatever was side-loaded with them"
+        tickets = []
+        for ticket_j in page.get(key, []):
+            ticket_o = ZendeskTicket(self.host)
+            ticket_o.from_dict(ticket_j)
+            tickets.append(ticket_o)
+        if include:
+            self._link_sideloads(tickets, page, include)
         return tickets
 
+    def _link_sideloads(self, tickets: list, page: dict, include: str) -> None:
+        """fills in the tickets' related records from a page's side-loads.
+
+        Users go through the identity map, any the page didn't include are fetched in bulk with `get_users`"""
+        included = include.split(",")
+        if "users" in included:
+            users = self._remember_users(page.get("users", []))
+            wanted = [ticket.requester_id for ticket in tickets] + [
+                ticket.assignee_id for ticket in tickets
+            ]
+            users.update(
+                self.get_users(user_id for user_id in wanted if user_id not in users)
+            )
+            for ticket in tickets:
+                ticket.requester = users.get(ticket.requester_id)
+                if ticket.requester is not None:
+                    ticket.requester_name = ticket.requester.name
+                ticket.assignee = users.get(ticket.assignee_id)
+        if "organizations" in included:
+            organisations = {org["id"]: org for org in page.get("organizations", [])}
+            for ticket in tickets:
+                ticket.organisation = organisations.get(ticket.organisation_id)
+        if "groups" in included:
+            groups = {group["id"]: group for group in page.get("groups", [])}
+            for ticket in tickets:
+                ticket.group = groups.get(ticket.group_id)
+
+    def iter_incremental_tickets(
+        self,
+        cursor: str = None,
+        start_time: int = 0,
+        cursor_store: CursorStore = None,
+        include: str = None,
+    ):
+        """yields a `ZendeskTicket` for every ticket changed since `cursor`, using the incremental export
+
+        Args:
+            `cursor` (str): where a previous export stopped. Without one the export starts from `start_time`
+            `start_time` (int): unix time to start from when there's no cursor
+            `cursor_store` (CursorStore): where to resume from when no `cursor` is given, and where the cursor is saved
+            `include` (str): side-loads related records onto the tickets, as for `iter_tickets`
+
+        The cursor is moved on once each page has been consumed, as `incremental_cursor` and in the `cursor_store`,
+        so an interrupted run resumes with the page it was part way through.
+        """
+        store_key = f"{self.host}/incremental/tickets"
+        if cursor is None and cursor_store is not None:
+            cursor = cursor_store.get(store_key)
+        url = f"https://{self.host}/api/v2/incremental/tickets/cursor.json"
+        query = {"cursor": cursor} if cursor is not None else {"start_time": start_time}
+        if include:
+            query["include"] = include
+
+        page_number = 1
+        while True:
+            page = self._request_and_validate(f"{url}?{urlencode(query)}", page=page_number)
+            if "tickets" not in page:
+                self.logger.error("Couldn't fetch page %s of the incremental ticket export", page_number)
+                return
+            yield from self._tickets_from_page(page, "tickets", include)
+
+            cursor = page.get("after_cursor") or cursor
+            self.incremental_cursor = cursor
+            if cursor_store is not None and cursor is not None:
+                cursor_store.set(store_key, cursor)
+            if page.get("end_of_stream", True) or cursor is None:
+                return
+            query["cursor"] = cursor
+            query.pop("start_time", None)
+            page_number += 1
+
     def search_for_users(self, search_string):
         """Uses the zendesk search notation that's detailed here:
         https://developer.zendesk.com/api-reference/ticketing/ticket-management/search/"""
+        return {user.user_id: user for user in self.iter_users(search_string)}
 
-        url = f"https://{self.host}/api/v2/search.json?query=type:user {search_string}"
-        pages = self._request_and_validate_paginated(url)
-        users = {}
-        for page in pages:
+    def iter_users(self, search_string):
+        "yields a `ZendeskUser` for each search result, fetching a page at a time as they're consumed"
+        url = f"https://{self.host}/api/v2/search/export.json?query={search_string}&filter[type]=user"
+        for page in self._iter_pages(url):
             for user_j in page.get("results", []):
-                user_o = ZendeskUser(user_j)
-                users[user_o.user_id] = user_o
-        return users
+                yield ZendeskUser(user_j)
+
+    def get_user(self, userID: int, refresh: bool = False) -> ZendeskUser:
+        """fetches a user from an ID, or returns them from the identity map if they were fetched within `user_ttl`
 
-    def get_user(self, userID: int) -> ZendeskUser:
-        """fetches a user from an ID"""
+        `refresh` fetches them again regardless, e.g. to pick up a change just made"""
+        user = None if refresh else self._known_user(userID)
+        if user is not None:
+            return user
         url = f"https://{self.host}/api/v2/users/{userID}.json"
         response = self._request_and_validate(url)
+        if "user" not in response:
+            return ZendeskUser({})
+        remembered = self._remember_users([response["user"]], replace=True)
+        return remembered.get(userID) or ZendeskUser(response["user"])
+
+    def get_users(
+        self, user_ids, max_workers: int = DEFAULT_CONCURRENCY, refresh: bool = False
+    ) -> dict:
+        """returns `{user id: ZendeskUser}` for the given ids, fetching any not in the identity map through `users/show_many`
+
+        Ids are fetched `USERS_PER_REQUEST` at a time, with up to `max_workers` requests in flight. Users that couldn't be found are left out.
+        `refresh` fetches every one of them again."""
+        wanted = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        found = {}
+        for user_id in wanted:
+            user = None if refresh else self._known_user(user_id)
+            if user is not None:
+                found[user_id] = user
+        missing = [user_id for user_id in wanted if user_id not in found]
+        chunks = [
+            missing[start : start + USERS_PER_REQUEST]
+            for start in range(0, len(missing), USERS_PER_REQUEST)
+        ]
+        # straight from what was fetched, as a `user_ttl` of 0 has them expire right away
+        for fetched in run_concurrently(self._fetch_users, chunks, max_workers):
+            found.update(fetched)
+        return {user_id: found[user_id] for user_id in wanted if user_id in found}
+
+    def clear_user_cache(self) -> None:
+        "forgets every user in the identity map, so they're all fetched again"
+        with self._users_lock:
+            self._users.clear()
+
+    def _known_user(self, user_id: int) -> ZendeskUser:
+        "the user from the identity map, or None if they aren't there or have been there longer than `user_ttl`"
+        with self._users_lock:
+            entry = self._users.get(user_id)
+        if entry is None or time.monotonic() - entry[1] >= self.user_ttl:
+            return None
+        return entry[0]
 
-        return ZendeskUser(response.get("user", {}))
+    def _fetch_users(self, user_ids: list) -> dict:
+        "fetches up to `USERS_PER_REQUEST` users in one request, returning `{user id: ZendeskUser}`"
+        ids = ",".join(str(user_id) for user_id in user_ids)
+        url = f"https://{self.host}/api/v2/users/show_many.json?ids={ids}"
+        response = self._request_and_validate(url)
+        return self._remember_users(response.get("users", []), replace=True)
+
+    def _remember_users(self, users: list, replace: bool = False) -> dict:
+        """adds users to the identity map, parsing only the ones it doesn't hold or that have expired. Returns `{user id: ZendeskUser}` for them
+
+        `replace` takes every one of them as the latest, for users that were just fetched"""
+        now = time.monotonic()
+        remembered = {}
+        with self._users_lock:
+            for user_j in users:
+                user_id = user_j.get("id")
+                if user_id is None:
+                    continue
+                entry = self._users.get(user_id)
+                if replace or entry is None or now - entry[1] >= self.user_ttl:
+                    entry = (ZendeskUser(user_j), now)
+                    self._users[user_id] = entry
+                remembered[user_id] = entry[0]
+        return remembered
 
     def get_worklogs(
         self, ticket_id: int, time_since_last_update_field_id: int
     ) -> list:
         """Fetches a list of worklog objects from Zendesk using the audit trail"""
+        return list(self.iter_worklogs(ticket_id, time_since_last_update_field_id))
+
+    def iter_worklogs(self, ticket_id: int, time_since_last_update_field_id: int):
+        "yields the valid `ZendeskWorklog`s in a ticket's audit trail, fetching a page at a time"
         url = f"https://{self.host}/api/v2/tickets/{ticket_id}/audits"
-        response = self._request_and_validate_paginated(url)
 
         #            "author_id": 387974337212,
         #            "created_at": "2022-04-22T09:16:04Z",
@@ -96,8 +351,7 @@ class zendesk:
 
         #                    "value": "900",
         #                    "field_name": "360028226411", #most recent
-        logs = []
-        for page in response:
+        for page in self._iter_pages(url):
             if "audits" not in page:
                 self.logger.warning(
                     "Got something unexpected from ZD, missing `audits` key"
@@ -108,9 +362,7 @@ class zendesk:
                 worklog = ZendeskWorklog()
                 worklog.from_json(audit, time_since_last_update_field_id)
                 if worklog.is_valid:
-                    logs.append(worklog)
-
-        return logs
+                    yield worklog
     
     def update_ticket(self, ticket_id:int, body:dict):
         """Updates a ticket with the given body dict. Provide a key-value pair for each field to update."""
@@ -132,8 +384,8 @@ class zendesk:
 
         
 
-    def _request_and_validate(self, url, headers=None, body=None) -> dict:
-        "internal method to request and return"
+    def _request_and_validate(self, url, headers=None, body=None, page=None) -> dict:
+        "internal method to request and return. `page` labels the request for instrumentation when paginating"
         if headers is None:
             headers = self._headers
 
@@ -142,8 +394,32 @@ class zendesk:
             
 
 
+        use_response_cache = self.response_cache is not None and body is None
+        if use_response_cache:
+            cached = self.response_cache.get(url, headers=headers)
+            if cached is not None:
+                return cached
+
+        use_etag_cache = self.etag_cache is not None and body is None
         try:
-            result = requests.get(url=url, headers=headers, data=body)
+            if use_etag_cache:
+                result, cached = self.etag_cache.send(
+                    self.transport,
+                    url,
+                    headers=headers,
+                    limiter=self._limiter,
+                    page=page,
+                )
+                if result.status_code == 304:
+                    return cached
+            else:
+                result = self.transport.get(
+                    url=url,
+                    headers=headers,
+                    data=body,
+                    limiter=self._limiter,
+                    page=page,
+                )
         except (ConnectionError) as e:
             _LO.error("Couldn't connect to Zendesk %s - %s", url, e)
             return {}
@@ -157,19 +433,34 @@ class zendesk:
         except json.JSONDecodeError as e:
             _LO.error("Couldn't parse JSON from Zendesk - %s", e)
             return {}
+        if use_etag_cache:
+            self.etag_cache.store(result, parsed_content, url, headers=headers)
+        if use_response_cache:
+            self.response_cache.set(url, parsed_content, headers=headers)
         return parsed_content
 
     def _request_and_validate_paginated(self, url, headers=None, body=None) -> list:
+        return list(self._iter_pages(url, headers, body))
+
+    def _iter_pages(self, url, headers=None, body=None):
+        """yields each parsed page in turn, only requesting the next once the previous has been consumed
 
+        Asks for cursor pagination, following `links.next` while `meta.has_more`. Endpoints that only
+        offer offset pagination are followed through `next_page` instead."""
         param_char = "&" if "?" in url else "?"
-        next_page = 1
-        pages = []
-        while next_page is not None:
-            r_url = f"{url}{param_char}page={next_page}"
-            resp = self._request_and_validate(r_url, headers, body)
-            pages.append(resp)
-            next_page = resp.get("nextPage", None)
-        return pages
+        next_url = f"{url}{param_char}page[size]={PAGE_SIZE}"
+        page_number = 1
+        while next_url is not None:
+            resp = self._request_and_validate(next_url, headers, body, page=page_number)
+            yield resp
+            if "meta" in resp:
+                has_more = resp["meta"].get("has_more")
+                following = resp.get("links", {}).get("next") if has_more else None
+            else:
+                following = resp.get("next_page")
+            # a page pointing at itself would never end
+            next_url = following if following != next_url else None
+            page_number += 1
 
     def get_organisation(self, orgID: int) -> ZendeskOrganisation:
         """Fetches an organisation from an ID. Not yet implemented."""
@@ -0,0 +1,110 @@
+import sys
+import asyncio
+import threading
+import time
+
+sys.path.append("")
+
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers.async_helpers import AsyncClient, AsyncTrello, AsyncZendesk
+from serviceHelpers.zendesk import zendesk
+
+
+def test_async_trello_matches_blocking_helper():
+    "coroutine methods should return exactly what the wrapped helper does"
+
+    async def run():
+        client = AsyncClient()
+        board = AsyncTrello("none", "none", "none", client=client)
+        board.helper._cached_cards = {
+            "id_1": {"id": "id_1", "idList": "main", "pos": 300},
+            "id_2": {"id": "id_2", "idList": "main", "pos": 0.304},
+            "id_3": {"id": "id_3", "idList": "main", "pos": 44.4},
+        }
+        board.helper.dirty_cache = False
+        pos = await board.convert_index_to_pos("main", 2)
+        found = await board.find_trello_cards("id_2")
+        client.close()
+        return pos, found
+
+    pos, found = asyncio.run(run())
+    assert 44.4 < pos < 300
+    assert len(found) == 1
+
+
+def test_async_helpers_share_the_clients_transport():
+    client = AsyncClient()
+    zend = AsyncZendesk("none", "none", client=client)
+    assert isinstance(zend.helper, zendesk)
+    assert zend.helper.transport is client.transport
+    client.close()
+
+
+def test_per_host_concurrency_is_bounded():
+    "no more than `max_per_host` calls should be in flight against one host at a time"
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def slow_call():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+
+    async def run():
+        client = AsyncClient(max_per_host=3, max_workers=10)
+        await asyncio.gather(*[client.run("example.com", slow_call) for _ in range(12)])
+        client.close()
+
+    asyncio.run(run())
+    assert peak == 3
+
+
+def test_async_trello_calls_overlap_and_leave_the_cache_consistent():
+    "calls through one AsyncTrello share a card cache, they should run side by side without corrupting it"
+    with StandInServer(StandInConfig(pages=1, page_size=24)) as server:
+        transport = server.transport(pool_maxsize=8)
+        in_flight = 0
+        peak = 0
+        counter = threading.Lock()
+        send = transport.request
+
+        def request(*args, **kwargs):
+            nonlocal in_flight, peak
+            with counter:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            try:
+                time.sleep(0.005)
+                return send(*args, **kwargs)
+            finally:
+                with counter:
+                    in_flight -= 1
+
+        transport.request = request
+        card_ids = list(server.stand_ins.trello_cards)
+        list_id = server.stand_ins.trello_lists[0]
+
+        async def run():
+            client = AsyncClient(max_per_host=8, max_workers=8, transport=transport)
+            board = AsyncTrello("board", "key", "token", client=client)
+            await board.fetch_trello_cards()
+            calls = [board.create_card(f"new {index}", list_id) for index in range(8)]
+            calls += [board.update_card(card_id, f"renamed {card_id}") for card_id in card_ids[:8]]
+            calls += [board.fetch_trello_card(card_id) for card_id in card_ids[8:16]]
+            calls += [board.get_all_cards_on_list(list_id) for _ in range(8)]
+            await asyncio.gather(*calls)
+            client.close()
+            return board.helper
+
+        helper = asyncio.run(run())
+
+    assert peak > 1
+    assert not helper.dirty_cache
+    assert set(helper._cached_cards) == set(server.stand_ins.trello_cards)
+    for card_id, card in server.stand_ins.trello_cards.items():
+        assert helper._cached_cards[card_id]["name"] == card["name"]
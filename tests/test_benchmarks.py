@@ -0,0 +1,39 @@
+import sys
+
+sys.path.append("")
+
+from benchmarks.run_benchmarks import FLOWS, BenchContext, format_report, run_flow
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers.trello import trello
+
+
+def test_every_flow_runs_against_the_stand_ins():
+    "each benchmarked flow should complete and handle items, even with 429s being injected"
+    config = StandInConfig(pages=2, page_size=5, payload_bytes=16, rate_limit_every=7)
+    with StandInServer(config) as server:
+        ctx = BenchContext(server.transport())
+        results = [
+            run_flow(name, flow, ctx, iterations=1, warmup=False)
+            for name, flow in FLOWS.items()
+        ]
+        assert server.rate_limited > 0
+
+    for result in results:
+        assert result.requests > 0, result.name
+        assert result.items > 0, result.name
+    assert "board_fetch" in format_report(results)
+
+
+def test_trello_stand_in_keeps_state():
+    "cards created through the helper should show up on the board and in its actions"
+    with StandInServer(StandInConfig(pages=1, page_size=3)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        assert len(board.fetch_trello_cards()) == 3
+
+        board.create_card("new card", server.stand_ins.trello_lists[0])
+        cards = board.fetch_trello_cards()
+        actions = board.fetch_actions_for_board(limit=50)
+
+    assert len(cards) == 4
+    assert actions[0]["type"] == "createCard"
+    assert actions[0]["data"]["card"]["name"] == "new card"
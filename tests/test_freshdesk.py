@@ -9,6 +9,9 @@ sys.path.append("")
 import os
 import logging
 from serviceHelpers.freshdesk import FreshDesk, FreshdeskTicket
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # 2025 - don't use Freshdesk at work anymore, can't test anymore.
 
@@ -12,6 +12,9 @@ import serviceHelpers.jira
 from serviceHelpers.jira import Jira, TIMESTAMP_FORMAT, JiraDetails, JiraTicket
 
 import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 pytestmark = pytest.mark.skip(reason="Jira tests disabled - Jira has depreciated its /2/ endpoints, module needs remade.")
 
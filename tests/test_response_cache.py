@@ -0,0 +1,68 @@
+import sys
+import time
+
+sys.path.append("")
+
+from serviceHelpers.response_cache import SqliteResponseCache
+from serviceHelpers.zendesk import zendesk
+
+FORM_URL = "https://example.zendesk.com/api/v2/ticket_forms/123"
+
+
+def test_round_trip_survives_reopening(tmp_path):
+    "a response stored by one cache object should be readable by the next process to open the file"
+    path = str(tmp_path / "responses.sqlite")
+    cache = SqliteResponseCache(path)
+    cache.set(FORM_URL, {"ticket_form": {"name": "form"}})
+    cache.close()
+
+    reopened = SqliteResponseCache(path)
+    assert reopened.get(FORM_URL) == {"ticket_form": {"name": "form"}}
+
+
+def test_credentials_are_part_of_the_key():
+    cache = SqliteResponseCache(":memory:")
+    cache.set(FORM_URL, {"a": 1}, headers={"Authorization": "Basic one"})
+    assert cache.get(FORM_URL, headers={"Authorization": "Basic one"}) == {"a": 1}
+    assert cache.get(FORM_URL, headers={"Authorization": "Basic two"}) is None
+
+
+def test_urls_without_a_ttl_are_not_cached():
+    cache = SqliteResponseCache(":memory:")
+    url = "https://example.zendesk.com/api/v2/tickets/1/audits"
+    cache.set(url, {"audits": []})
+    assert cache.get(url) is None
+    assert len(cache) == 0
+
+
+def test_entries_expire():
+    cache = SqliteResponseCache(":memory:", ttls={"ticket_forms": 0.05})
+    cache.set(FORM_URL, {"a": 1})
+    assert cache.get(FORM_URL) == {"a": 1}
+    time.sleep(0.1)
+    assert cache.get(FORM_URL) is None
+
+
+def test_least_recently_used_are_evicted():
+    cache = SqliteResponseCache(":memory:", max_entries=2)
+    cache.set(f"{FORM_URL}1", 1)
+    time.sleep(0.01)
+    cache.set(f"{FORM_URL}2", 2)
+    time.sleep(0.01)
+    cache.get(f"{FORM_URL}1")
+    time.sleep(0.01)
+    cache.set(f"{FORM_URL}3", 3)
+
+    assert len(cache) == 2
+    assert cache.get(f"{FORM_URL}1") == 1
+    assert cache.get(f"{FORM_URL}2") is None
+
+
+def test_helper_serves_from_cache_without_a_request():
+    "a cached form should come back without touching the (unreachable) host"
+    cache = SqliteResponseCache(":memory:")
+    zend = zendesk("example.invalid", "key", response_cache=cache)
+    url = "https://example.invalid/api/v2/ticket_forms/360001936712"
+    cache.set(url, {"ticket_form": {"name": "cached"}}, headers=zend._headers)
+
+    assert zend.get_form_d(360001936712) == {"name": "cached"}
@@ -0,0 +1,157 @@
+import sys
+
+sys.path.append("")
+
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers.freshdesk import FreshDesk, FreshdeskTicket
+from serviceHelpers.trello import trello
+from serviceHelpers.zendesk import SIDELOADS, CursorStore, zendesk, ZendeskTicket
+
+
+def test_freshdesk_iter_tickets_is_lazy():
+    "the first ticket should be available after a single request, and the rest fetched on demand"
+    with StandInServer(StandInConfig(pages=3, page_size=4)) as server:
+        fresh = FreshDesk("bench.freshdesk.com", "key", transport=server.transport())
+        tickets = fresh.iter_tickets("status:2")
+        first = next(tickets)
+        assert isinstance(first, FreshdeskTicket)
+        assert server.requests == 1
+
+        remaining = list(tickets)
+        assert len(remaining) == 11
+        assert len(fresh.search_fd_tickets("status:2")) == 12
+
+
+def test_zendesk_iter_tickets_yields_models():
+    with StandInServer(StandInConfig(pages=1, page_size=5)) as server:
+        zend = zendesk("bench.zendesk.com", "key", transport=server.transport())
+        tickets = list(zend.iter_tickets("status:open"))
+
+    assert len(tickets) == 5
+    assert all(isinstance(ticket, ZendeskTicket) for ticket in tickets)
+
+
+def test_trello_iter_board_actions():
+    with StandInServer(StandInConfig(pages=1, page_size=5)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        actions = list(board.iter_board_actions())
+
+    assert [action["type"] for action in actions] == ["createCard"] * 5
+
+
+def test_trello_iter_board_actions_walks_back_through_the_whole_history():
+    "every action should come back once, newest first, in pages of 1000"
+    with StandInServer(StandInConfig(pages=1, page_size=2500, payload_bytes=0)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        expected = [action["id"] for action in reversed(server.stand_ins.trello_actions)]
+
+        requests_before = server.requests
+        actions = board.iter_board_actions()
+        assert next(actions)["id"] == expected[0]
+        assert server.requests - requests_before == 1
+        assert [expected[0]] + [action["id"] for action in actions] == expected
+        assert server.requests - requests_before == 3
+
+        requests_before = server.requests
+        window = board.fetch_actions_for_board(since=expected[2200], before=expected[100], limit=1500)
+        assert [action["id"] for action in window] == expected[101:1601]
+        assert server.requests - requests_before == 2
+
+        assert board.fetch_actions_for_board(actions_filter="deleteCard") == []
+
+
+def test_zendesk_follows_cursors_at_full_page_size():
+    "every listing should be walked with page[size]=100 until meta.has_more is false"
+    with StandInServer(StandInConfig(pages=5, page_size=50, payload_bytes=0)) as server:
+        zend = zendesk("bench.zendesk.com", "key", transport=server.transport())
+
+        requests_before = server.requests
+        tickets = zend.iter_tickets("status:open")
+        next(tickets)
+        assert server.requests - requests_before == 1
+        assert len(list(tickets)) == 249
+        assert server.requests - requests_before == 3
+
+        assert len(zend.search_for_users("email:test@test.com")) == 250
+        assert len(zend.get_comments(1)) == 250
+        assert len(list(zend.iter_worklogs(1, 360028226411))) == 250
+
+
+def test_zendesk_incremental_export_resumes_from_the_stored_cursor(tmp_path):
+    with StandInServer(StandInConfig(pages=3, page_size=4)) as server:
+        store = CursorStore(str(tmp_path / "cursors.json"))
+        zend = zendesk("bench.zendesk.com", "key", transport=server.transport())
+
+        tickets = zend.iter_incremental_tickets(cursor_store=store)
+        first_page = [next(tickets) for _ in range(4)]
+        assert all(isinstance(ticket, ZendeskTicket) for ticket in first_page)
+        # the cursor moves once the page has been consumed
+        next(tickets)
+        tickets.close()
+        assert server.requests == 2
+
+        resumed = zendesk("bench.zendesk.com", "key", transport=server.transport())
+        ids = [ticket.id for ticket in resumed.iter_incremental_tickets(cursor_store=store)]
+        assert ids == list(range(5, 13))
+
+        # nothing has changed since, so the next run is one request and no tickets
+        requests_before = server.requests
+        assert list(resumed.iter_incremental_tickets(cursor_store=store)) == []
+        assert server.requests - requests_before == 1
+        assert store.get("bench.zendesk.com/incremental/tickets") == resumed.incremental_cursor
+
+
+def test_zendesk_side_loads_ticket_users_and_resolves_users_in_bulk():
+    with StandInServer(StandInConfig(pages=1, page_size=20, payload_bytes=0)) as server:
+        zend = zendesk("bench.zendesk.com", "key", transport=server.transport())
+
+        tickets = list(zend.iter_tickets("status:open", include=SIDELOADS))
+        assert server.requests == 1
+        assert tickets[0].requester.name == tickets[0].requester_name == "User 2000"
+        assert tickets[0].assignee.user_id == 1000
+        assert tickets[0].organisation["id"] == 1 and tickets[0].group["id"] == 1
+
+        ticket = zend.get_ticket(3, include="users")
+        assert ticket.requester_name == "User 2002"
+        assert server.requests == 2
+
+        users = zend.get_users(range(1, 251))
+        assert len(users) == 250 and users[250].name == "User 250"
+        assert server.requests == 5
+        # everything is in the identity map now, so neither costs a request
+        assert zend.get_users(range(1, 251)) == users
+        assert zend.get_user(2000) is tickets[0].requester
+        assert server.requests == 5
+
+        # without an identity map, side-loads and bulk fetches are still used, just not kept
+        uncached = zendesk("bench.zendesk.com", "key", transport=server.transport(), user_ttl=0)
+        tickets = list(uncached.iter_tickets("status:open", include=SIDELOADS))
+        assert server.requests == 6
+        assert tickets[0].requester.name == "User 2000"
+        assert tickets[0].assignee.user_id == 1000
+        users = uncached.get_users(range(1, 251))
+        assert len(users) == 250 and users[250].name == "User 250"
+        assert server.requests == 9
+
+
+def test_zendesk_users_can_be_reloaded_after_they_change():
+    with StandInServer(StandInConfig(pages=1, page_size=5, payload_bytes=0)) as server:
+        zend = zendesk("bench.zendesk.com", "key", transport=server.transport())
+        assert zend.get_user(7).name == "User 7"
+        assert zendesk("bench.zendesk.com", "key", transport=server.transport())._users == {}
+
+        server.stand_ins.zendesk_user_changes[7] = {"name": "Renamed", "suspended": True}
+        assert zend.get_user(7).name == "User 7"
+        assert zend.get_user(7, refresh=True).name == "Renamed"
+        assert zend.get_users([7, 8], refresh=True)[7].name == "Renamed"
+
+        server.stand_ins.zendesk_user_changes[8] = {"name": "Also renamed"}
+        zend.clear_user_cache()
+        assert zend.get_users([8])[8].name == "Also renamed"
+
+        # with no time to live every read fetches the user again
+        uncached = zendesk("bench.zendesk.com", "key", transport=server.transport(), user_ttl=0)
+        requests_before = server.requests
+        uncached.get_user(7)
+        uncached.get_user(7)
+        assert server.requests - requests_before == 2
@@ -0,0 +1,520 @@
+import copy
+import pickle
+import re
+import sys
+
+import requests
+
+sys.path.append("")
+
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers._trello_cache import CardCache
+from serviceHelpers.models.TrelloCard import TrelloCard
+from serviceHelpers.trello import BASE_URL, trello
+
+
+def _visible_cards(server) -> dict:
+    return {
+        card_id: card
+        for card_id, card in server.stand_ins.trello_cards.items()
+        if not card["closed"] and card["idList"] not in server.stand_ins.trello_closed_lists
+    }
+
+
+def test_incremental_sync_applies_other_writers_changes():
+    "changes made by another helper should be picked up from the board's actions, not a full refetch"
+    with StandInServer(StandInConfig(pages=1, page_size=6)) as server:
+        transport = server.transport()
+        board = trello("board", "key", "token", transport=transport, incremental_sync=True)
+        other = trello("board", "key", "token", transport=transport)
+        board.fetch_trello_cards()
+        card_ids = list(board._cached_cards)
+        held = board._cached_cards[card_ids[1]]
+
+        created = other.create_card("created elsewhere", server.stand_ins.trello_lists[2])
+        other.update_card(card_ids[1], "renamed", new_list_id=server.stand_ins.trello_lists[3])
+        other.delete_trello_card(card_ids[2])
+        other.archive_trello_card(card_ids[3])
+
+        requests_before = server.requests
+        cards = board.fetch_trello_cards()
+        # one request for the actions, one to fetch the newly created card
+        assert server.requests - requests_before == 2
+
+        expected = _visible_cards(server)
+        assert {card["id"] for card in cards} == set(expected)
+        assert board._cached_cards[card_ids[1]]["name"] == "renamed"
+        assert board._cached_cards[card_ids[1]]["idList"] == server.stand_ins.trello_lists[3]
+        assert board._cached_cards[created["id"]]["name"] == "created elsewhere"
+        # the dict handed out before the sync is left alone
+        assert held["name"] != "renamed"
+
+        # nothing changed, so the next sync is a single empty actions request
+        requests_before = server.requests
+        board.fetch_trello_cards()
+        assert server.requests - requests_before == 1
+
+
+def test_sync_refetches_the_board_for_actions_it_cant_replay():
+    "archiving a list takes its cards with it, but the action doesn't name them"
+    with StandInServer(StandInConfig(pages=1, page_size=8)) as server:
+        transport = server.transport()
+        board = trello("board", "key", "token", transport=transport, incremental_sync=True)
+        other = trello("board", "key", "token", transport=transport)
+        board.fetch_trello_cards()
+        first = server.stand_ins.trello_lists[0]
+        on_first = set(board.get_all_cards_on_list(first))
+        deleted = next(card_id for card_id in board._cached_cards if card_id not in on_first)
+
+        other.delete_trello_card(deleted)
+        transport.put(f"{BASE_URL}lists/{first}/closed", params={"value": "true"})
+
+        # the sync gives up without having applied the delete before the list was archived
+        assert board.sync_cards() is False
+        assert deleted in board._cached_cards and on_first <= set(board._cached_cards)
+
+        board.fetch_trello_cards()
+        assert set(board._cached_cards) == set(_visible_cards(server))
+        assert deleted not in board._cached_cards
+        assert not on_first & set(board._cached_cards)
+
+        # and the same from a webhook delivery, which leaves the cache for the next read to refetch
+        archive = {"type": "updateList", "data": {"list": {"id": first}, "old": {"closed": False}}}
+        board.apply_board_action(archive)
+        assert board.dirty_cache
+
+
+def test_sync_falls_back_without_a_baseline():
+    with StandInServer(StandInConfig(pages=1, page_size=3)) as server:
+        board = trello("board", "key", "token", transport=server.transport(), incremental_sync=True)
+        assert board.sync_cards() is False
+        assert len(board.fetch_trello_cards()) == 3
+        assert board.last_action_id == server.stand_ins.trello_actions[-1]["id"]
+
+
+def test_card_cache_keeps_lists_sorted():
+    "the per-list index should follow every way the cache can be changed"
+    cache = CardCache(
+        {
+            "a": {"id": "a", "idList": "one", "pos": 300},
+            "b": {"id": "b", "idList": "one", "pos": 100},
+            "c": {"id": "c", "idList": "two", "pos": 200},
+        }
+    )
+    assert list(cache.cards_on_list("one")) == ["b", "a"]
+
+    cache["c"] = {"id": "c", "idList": "one", "pos": 150}  # moved between lists
+    cache["d"] = {"id": "d", "idList": "one", "pos": 50}
+    assert list(cache.cards_on_list("one")) == ["d", "b", "c", "a"]
+    assert cache.list_positions("two") == []
+
+    del cache["b"]
+    cache.pop("d")
+    cache.update({"e": {"id": "e", "idList": "one", "pos": 999}})
+    assert list(cache.cards_on_list("one")) == ["c", "a", "e"]
+    assert cache.list_positions("one") == [(150, "c"), (300, "a"), (999, "e")]
+
+    cache.clear()
+    assert cache.cards_on_list("one") == {}
+
+
+def test_plain_dicts_assigned_to_the_cache_are_indexed():
+    helper = trello("none", "none", "none")
+    helper._cached_cards = {
+        "id_1": {"id": "id_1", "idList": "main", "pos": 30},
+        "id_2": {"id": "id_2", "idList": "main", "pos": 10},
+    }
+    helper.dirty_cache = False
+    assert isinstance(helper._cached_cards, CardCache)
+    assert list(helper.get_all_cards_on_list("main")) == ["id_2", "id_1"]
+    assert helper.convert_index_to_pos("main", 0) == 5
+    assert helper.convert_index_to_pos("main", 1) == 20
+
+
+def test_card_cache_copies_and_pickles_like_a_dict():
+    cache = CardCache(card_type=TrelloCard)
+    cache["id_1"] = {"id": "id_1", "idList": "main", "pos": 30, "name": "first"}
+    cache.put("id_2", {"id": "id_2", "idList": "main", "pos": 10}, frozenset({"id", "pos"}))
+    for copied in (
+        copy.copy(cache),
+        copy.deepcopy(cache),
+        pickle.loads(pickle.dumps(cache)),
+    ):
+        assert isinstance(copied, CardCache) and copied == cache
+        assert isinstance(copied["id_1"], TrelloCard)
+        assert list(copied.cards_on_list("main")) == ["id_2", "id_1"]
+        assert copied.other_views() == {"id_2": frozenset({"id", "pos"})}
+        assert [card["id"] for card in copied.search("first")] == ["id_1"]
+        copied["id_3"] = {"id": "id_3", "idList": "main", "pos": 1}
+        assert "id_3" not in cache
+
+
+def _naive_search(cards: dict, pattern) -> list:
+    return [
+        card
+        for card in cards.values()
+        if card.get("id", "") == pattern
+        or re.search(pattern, card.get("name", ""))
+        or re.search(pattern, card.get("desc", ""))
+    ]
+
+
+def test_search_index_agrees_with_a_full_scan():
+    "the trigram prefilter must never drop a card that the regex would match"
+    cards = {
+        f"id_{index}": {
+            "id": f"id_{index}",
+            "name": f"Ticket #{index} {'URGENT' if index % 7 == 0 else 'routine'} fix",
+            "desc": f"ZD-{index * 13} reported by user{index % 5}@example.com. Straße ΟΔΟΣ",
+        }
+        for index in range(200)
+    }
+    cards["id_abc"] = {"id": "id_abc", "name": "ABC", "desc": "zzz"}
+    helper = trello("none", "none", "none")
+    helper._cached_cards = cards
+    helper.dirty_cache = False
+    patterns = [
+        "id_17",
+        "Ticket #12\\b",
+        "(?i)urgent",
+        "ZD-1[0-9]{2}\\b",
+        "user3@example\\.com",
+        "routine|URGENT",
+        "fix$",
+        "#1?5 ",
+        "STRASSE",
+        "(?i)STRAẞE",
+        "ΟΣ",
+        "nothing matches this",
+        re.compile("TICKET #4", re.IGNORECASE),
+        r"\x41BC",
+        r"([)]abc)?zzz",
+        r"\x54icket #3\b",
+        r"\u0054icket #5\b",
+        r"\124icket #6\b",
+        r"([)]abc)?routine",
+    ]
+    for pattern in patterns:
+        assert helper.find_trello_cards(pattern) == _naive_search(cards, pattern), pattern
+        first = _naive_search(cards, pattern)
+        assert helper.find_trello_card(pattern) == (first[0] if first else None)
+
+    # the index follows changes made after it was built
+    helper._cached_cards["id_3"] = {"id": "id_3", "name": "renamed", "desc": ""}
+    del helper._cached_cards["id_4"]
+    helper._cached_cards["new"] = {"id": "new", "name": "Ticket #4 again", "desc": ""}
+    assert [card["id"] for card in helper.find_trello_cards("Ticket #[34] ")] == ["new"]
+    assert helper.find_trello_cards("renamed") == [helper._cached_cards["id_3"]]
+
+
+def test_case_insensitive_search_matches_what_casefold_doesnt():
+    "re.IGNORECASE treats İ, I and ı as i, which casefold doesn't, so the index mustn't filter those"
+    cards = {
+        "id_1": {"id": "id_1", "name": "İSTANBUL office", "desc": ""},
+        "id_2": {"id": "id_2", "name": "DIYARBAKIR", "desc": ""},
+        "id_3": {"id": "id_3", "name": "elsewhere", "desc": ""},
+    }
+    helper = trello("none", "none", "none")
+    helper._cached_cards = cards
+    helper.dirty_cache = False
+    for pattern in ["(?i)istanbul", re.compile("diyarbakır", re.I), "(?i)elsewhere"]:
+        assert helper.find_trello_cards(pattern) == _naive_search(cards, pattern), pattern
+        assert helper.find_trello_cards(pattern)
+
+
+def test_fetch_cards_by_id_batches_the_misses():
+    "uncached cards should be fetched ten to a request, and cached ones not fetched at all"
+    with StandInServer(StandInConfig(pages=1, page_size=30)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        card_ids = list(server.stand_ins.trello_cards)
+        board._cached_cards[card_ids[0]] = server.stand_ins.trello_cards[card_ids[0]]
+
+        requests_before = server.requests
+        cards = board.fetch_trello_cards_by_id(card_ids[:26] + [card_ids[3], "0" * 24])
+        # 25 misses and one id that doesn't exist, in three batches
+        assert server.requests - requests_before == 3
+
+    assert list(cards) == card_ids[:26]
+    assert all(cards[card_id]["id"] == card_id for card_id in cards)
+    assert set(card_ids[:26]) <= set(board._cached_cards)
+
+
+def _drop_responses(transport, method: str, fails) -> None:
+    "makes the transport raise after sending the `method` requests that `fails(url, params)` picks, as a timeout would"
+    send = transport.request
+
+    def request(request_method, url, **kwargs):
+        response = send(request_method, url, **kwargs)
+        if request_method == method and fails(url, kwargs.get("params", {})):
+            raise requests.ConnectionError(f"connection reset after {url}")
+        return response
+
+    transport.request = request
+
+
+def test_create_cards_plans_positions_up_front():
+    "cards created concurrently should land where creating them one by one would have put them"
+    with StandInServer(StandInConfig(pages=1, page_size=8)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        first, second = server.stand_ins.trello_lists[:2]
+        board.fetch_trello_cards()
+        before = list(board.get_all_cards_on_list(first))
+
+        specs = [{"title": f"bottom {index}", "list_id": first} for index in range(3)]
+        specs.append({"title": "top", "list_id": first, "position": 0})
+        specs.append({"title": "second", "list_id": first, "position": 1})
+        specs.append({"title": "other list", "list_id": second, "position": 1})
+
+        requests_before = server.requests
+        created = board.create_cards(specs)
+        assert server.requests - requests_before == len(specs)
+        assert not board.dirty_cache
+
+        names = [card["name"] for card in board.get_all_cards_on_list(first).values()]
+        assert names == ["top", "second", "Card 0", "Card 4", "bottom 0", "bottom 1", "bottom 2"]
+        assert [card["name"] for card in created] == [spec["title"] for spec in specs]
+        assert set(before) < set(board.get_all_cards_on_list(first))
+
+        # the server agrees with the cache
+        on_server = sorted(
+            (card for card in server.stand_ins.trello_cards.values() if card["idList"] == first),
+            key=lambda card: card["pos"],
+        )
+        assert [card["name"] for card in on_server] == names
+
+
+def test_create_cards_returns_and_caches_the_ones_that_were_created():
+    with StandInServer(StandInConfig(pages=1, page_size=4)) as server:
+        transport = server.transport()
+        board = trello("board", "key", "token", transport=transport)
+        first = server.stand_ins.trello_lists[0]
+        board.fetch_trello_cards()
+        _drop_responses(transport, "POST", lambda url, params: params.get("name") == "unlucky")
+
+        specs = [{"title": title, "list_id": first} for title in ("one", "unlucky", "three")]
+        created = board.create_cards(specs, max_workers=3)
+        assert created[1] is None
+        assert [created[0]["name"], created[2]["name"]] == ["one", "three"]
+        assert created[0]["id"] in board._cached_cards and created[2]["id"] in board._cached_cards
+        # the failed one may exist anyway, so the next read fetches the board again
+        assert board.dirty_cache
+        names = [card["name"] for card in board.get_all_cards_on_list(first).values()]
+        assert {"one", "unlucky", "three"} <= set(names)
+
+
+def test_purge_plans_from_the_warm_cache_then_deletes_concurrently():
+    with StandInServer(StandInConfig(pages=1, page_size=12)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        first, second = server.stand_ins.trello_lists[:2]
+        board.fetch_trello_cards()
+
+        requests_before = server.requests
+        plan = board.purge_trello_cards(title_pattern=r"Card \d$", target_lists=[first, second], dry_run=True)
+        assert server.requests == requests_before
+        assert [card["name"] for card in plan] == ["Card 0", "Card 1", "Card 4", "Card 5", "Card 8", "Card 9"]
+        assert board.plan_purge(title_pattern="Card", target_lists=[]) == []
+        assert len(board.plan_purge(target_lists=["*"])) == 12
+
+        deleted = board.execute_purge(plan)
+        assert server.requests - requests_before == len(plan)
+        assert deleted == [card["id"] for card in plan]
+        assert not board.dirty_cache
+        assert set(board._cached_cards) == set(_visible_cards(server))
+        assert len(board._cached_cards) == 6
+
+
+def test_purge_keeps_going_past_cards_that_fail_to_delete():
+    with StandInServer(StandInConfig(pages=1, page_size=8)) as server:
+        transport = server.transport()
+        board = trello("board", "key", "token", transport=transport)
+        board.fetch_trello_cards()
+        plan = board.plan_purge(target_lists=["*"])
+        unlucky = plan[2]["id"]
+        _drop_responses(transport, "DELETE", lambda url, params: url.endswith(unlucky))
+
+        deleted = board.execute_purge(plan, max_workers=4)
+        assert deleted == [card["id"] for card in plan if card["id"] != unlucky]
+        assert set(board._cached_cards) == {unlucky}
+        # trello deleted it before the connection dropped, so the cache can't be trusted
+        assert board.dirty_cache
+        assert board.fetch_trello_cards() == []
+
+
+def test_cache_snapshot_warm_starts_from_the_board_actions(tmp_path):
+    "a new instance loading a snapshot should only fetch what changed since it was saved"
+    snapshot = str(tmp_path / "board.jsonl")
+    with StandInServer(StandInConfig(pages=1, page_size=10)) as server:
+        transport = server.transport()
+        saved = trello("board", "key", "token", transport=transport, incremental_sync=True)
+        assert saved.save_cache(snapshot) is False  # nothing synced yet
+        saved.fetch_trello_cards()
+        card_ids = list(saved._cached_cards)
+        saved.fetch_trello_card(card_ids[2], checklists=True)
+        assert saved.save_cache(snapshot)
+
+        saved.update_card(card_ids[0], "renamed")
+        saved.delete_trello_card(card_ids[1])
+
+        loaded = trello("board", "key", "token", transport=transport, incremental_sync=True)
+        requests_before = server.requests
+        assert loaded.load_cache(snapshot)
+        # just the actions since the snapshot
+        assert server.requests - requests_before == 1
+        assert not loaded.dirty_cache
+        assert set(loaded._cached_cards) == set(_visible_cards(server))
+        assert loaded._cached_cards[card_ids[0]]["name"] == "renamed"
+        assert loaded.last_action_id == server.stand_ins.trello_actions[-1]["id"]
+        assert loaded._cached_cards.other_views() == saved._cached_cards.other_views()
+        assert "checklists" in loaded._cached_cards.view_of(card_ids[2])
+
+        other_board = trello("other", "key", "token", transport=transport, incremental_sync=True)
+        assert other_board.load_cache(snapshot) is False
+        assert other_board.dirty_cache
+
+
+def test_trello_card_behaves_like_the_dict_it_came_from():
+    source = {
+        "id": "abc",
+        "name": "card",
+        "pos": 16384.0,
+        "idBoard": "board",
+        "badges": {"comments": 2},
+        "closed": False,
+    }
+    card = TrelloCard(source)
+    assert card == source
+    assert dict(card) == source
+    assert card["badges"] == {"comments": 2}
+    assert card.get("due") is None and "due" not in card
+    assert {**card, "name": "renamed"}["name"] == "renamed"
+
+    card["closed"] = True
+    del card["pos"]
+    assert card["closed"] is True and "pos" not in card
+    assert len(card) == len(source) - 1
+
+
+def test_trello_card_copies_decode_once(monkeypatch):
+    "turning a card back into a dict shouldn't re-parse its JSON once per field"
+    source = {"id": "abc", "name": "card", **{f"extra{index}": index for index in range(20)}}
+    card = TrelloCard(source)
+    decodes = []
+    decode = TrelloCard._decode
+    monkeypatch.setattr(TrelloCard, "_decode", lambda self: decodes.append(1) or decode(self))
+
+    for copy in (card.to_dict, lambda: dict(card.items()), card.copy):
+        decodes.clear()
+        assert copy() == source
+        assert len(decodes) <= 1
+    assert card.copy() is not card and isinstance(card.copy(), TrelloCard)
+
+
+def test_compact_cards_work_with_sync_and_search():
+    with StandInServer(StandInConfig(pages=1, page_size=8)) as server:
+        transport = server.transport()
+        board = trello(
+            "board", "key", "token", transport=transport, incremental_sync=True, compact_cards=True
+        )
+        other = trello("board", "key", "token", transport=transport)
+        board.fetch_trello_cards()
+        card_ids = list(board._cached_cards)
+        assert all(isinstance(card, TrelloCard) for card in board._cached_cards.values())
+
+        other.update_card(card_ids[1], "renamed", new_list_id=server.stand_ins.trello_lists[3])
+        board.fetch_trello_cards()
+
+        assert isinstance(board._cached_cards[card_ids[1]], TrelloCard)
+        assert board.find_trello_card("renamed")["id"] == card_ids[1]
+        assert board.find_trello_card(card_ids[2]) == server.stand_ins.trello_cards[card_ids[2]]
+        assert card_ids[1] in board.get_all_cards_on_list(server.stand_ins.trello_lists[3])
+
+
+def test_projections_fetch_missing_fields_rather_than_returning_partial_cards():
+    with StandInServer(StandInConfig(pages=1, page_size=6)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        card_ids = list(server.stand_ins.trello_cards)
+        for card_id in card_ids[:2]:
+            server.stand_ins.trello_cards[card_id]["customFieldItems"] = [{"idCustomField": "field"}]
+
+        cards = board.fetch_trello_cards(fields="name,idList,pos")
+        assert set(cards[0]) == {"id", "name", "idList", "pos"}
+
+        # ordering a list only needs what's cached, searching needs the descriptions too
+        requests_before = server.requests
+        board.get_all_cards_on_list(server.stand_ins.trello_lists[0])
+        assert server.requests == requests_before
+        assert board.find_trello_card("Card 3")["desc"] == server.stand_ins.filler
+        assert server.requests - requests_before == 1
+        # fields already cached are kept when a richer view is fetched
+        assert "idList" in board._cached_cards[card_ids[3]]
+
+        requests_before = server.requests
+        plan = board.plan_purge(target_lists=["*"], custom_field_ids=["field"])
+        assert [card["id"] for card in plan] == card_ids[:2]
+        assert server.requests - requests_before == 1
+        board.plan_purge(target_lists=["*"], custom_field_ids=["field"])
+        assert server.requests - requests_before == 1
+
+        # an update's response has no custom fields, so that card alone is fetched again in a batch
+        board.update_card(card_ids[0], "renamed")
+        requests_before = server.requests
+        plan = board.plan_purge(target_lists=["*"], custom_field_ids=["field"])
+        assert [card["id"] for card in plan] == card_ids[:2]
+        assert plan[0]["name"] == "renamed"
+        assert server.requests - requests_before == 1
+        assert not board.dirty_cache
+
+        # one card fetched with every field, the rest stay as they were
+        requests_before = server.requests
+        card = board.get_trello_card(card_ids[4])
+        assert card["idBoard"] == server.stand_ins.trello_cards[card_ids[4]]["idBoard"]
+        assert "customFieldItems" in card
+        assert board.get_trello_card(card_ids[4]) is board._cached_cards[card_ids[4]]
+        assert board.get_trello_card(card_ids[5], fields="name") is board._cached_cards[card_ids[5]]
+        assert server.requests - requests_before == 1
+        assert "idBoard" not in board._cached_cards[card_ids[5]]
+
+
+def test_checklists_sync_with_only_the_changes_needed():
+    with StandInServer(StandInConfig(pages=1, page_size=3)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        card_id = list(server.stand_ins.trello_cards)[0]
+        board.fetch_trello_cards(checklists=True)
+
+        requests_before = server.requests
+        checklist_id = board.create_checklist_with_items(card_id, "todo", ["a", "b", "c", "d"])
+        # the checklist, four items and a refetch of the card
+        assert server.requests - requests_before == 6
+        assert not board.dirty_cache
+        cached = board._cached_cards[card_id]
+        assert [item["name"] for item in cached["checklists"][0]["checkItems"]] == ["a", "b", "c", "d"]
+
+        requests_before = server.requests
+        assert board.sync_checklist(checklist_id, ["a", "c", "d", "e", "f"])
+        # a fetch, one delete, two adds and a refetch of the card
+        assert server.requests - requests_before == 5
+        names = [item["name"] for item in board.fetch_checklist_content(checklist_id)["checkItems"]]
+        assert names == ["a", "c", "d", "e", "f"]
+        assert board._cached_cards[card_id]["idChecklists"] == [checklist_id]
+
+        requests_before = server.requests
+        assert board.sync_checklist(checklist_id, ["a", "c", "d", "e", "f"])
+        assert server.requests - requests_before == 1
+
+
+def test_checklist_sync_refreshes_the_card_when_items_fail():
+    "a dropped connection on one item shouldn't stop the others or leave the cached checklists stale"
+    with StandInServer(StandInConfig(pages=1, page_size=3)) as server:
+        board = trello("board", "key", "token", transport=server.transport())
+        card_id = list(server.stand_ins.trello_cards)[0]
+        board.fetch_trello_cards(checklists=True)
+        checklist_id = board.create_checklist_with_items(card_id, "todo", ["a", "b", "c"])
+
+        _drop_responses(board.transport, "POST", lambda url, params: params.get("name") == "e")
+        _drop_responses(board.transport, "DELETE", lambda url, params: "checkItems" in url)
+        assert not board.sync_checklist(checklist_id, ["a", "c", "d", "e"])
+
+        names = [item["name"] for item in board.fetch_checklist_content(checklist_id)["checkItems"]]
+        assert names == ["a", "c", "d", "e"]
+        cached = board._cached_cards[card_id]
+        assert [item["name"] for item in cached["checklists"][0]["checkItems"]] == names
@@ -3,8 +3,11 @@ import sys
 sys.path.append("")
 import os
 
+from dotenv import load_dotenv
 from serviceHelpers.trello import trello
 
+load_dotenv()
+
 TEST_BOARD_ID = "5f0dee6c5026590ce300472c"
 TEST_LIST_ID = "5f0dee6c5026590ce3004732"
 TEST_LIST_ID_TWO = "61d8367af7a2942f50afd468"
@@ -0,0 +1,114 @@
+import io
+import json
+import sys
+import threading
+
+import requests
+
+sys.path.append("")
+
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers.trello import trello
+from serviceHelpers.trello_webhook import (
+    TrelloWebhookApp,
+    compute_signature,
+    make_webhook_server,
+)
+
+SECRET = "app secret"
+CALLBACK_URL = "https://example.com/trello/callback"
+
+
+def test_signature_matches_trellos_documented_scheme():
+    # base64(HMAC-SHA1(secret, body + callback URL))
+    assert compute_signature("secret", b'{"a":1}', "https://x") == "GmJVBGIkMqJv7+awphNuvgtJUKY="
+
+
+def test_webhook_deliveries_keep_the_cache_current():
+    "recorded actions posted to the receiver should update the cache without any polling"
+    with StandInServer(StandInConfig(pages=1, page_size=4)) as stand_ins:
+        transport = stand_ins.transport()
+        board = trello("board", "key", "token", transport=transport)
+        other = trello("board", "key", "token", transport=transport)
+        board.fetch_trello_cards()
+        card_ids = list(board._cached_cards)
+
+        app = TrelloWebhookApp(board, SECRET, CALLBACK_URL)
+        server = make_webhook_server(app)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        try:
+            assert requests.head(url, timeout=5).status_code == 200
+
+            recorded = len(stand_ins.stand_ins.trello_actions)
+            created = other.create_card("from elsewhere", stand_ins.stand_ins.trello_lists[1])
+            other.update_card(card_ids[0], "renamed")
+            other.delete_trello_card(card_ids[1])
+
+            requests_before = stand_ins.requests
+            for action in stand_ins.stand_ins.trello_actions[recorded:]:
+                body = json.dumps({"action": action, "model": {"id": "board"}}).encode()
+                headers = {"X-Trello-Webhook": compute_signature(SECRET, body, CALLBACK_URL)}
+                assert requests.post(url, data=body, headers=headers, timeout=5).status_code == 200
+            # only the created card needed fetching
+            assert stand_ins.requests - requests_before == 1
+
+            forged = json.dumps({"action": {"type": "deleteCard", "data": {"card": {"id": card_ids[2]}}}})
+            response = requests.post(url, data=forged, headers={"X-Trello-Webhook": "bad"}, timeout=5)
+            assert response.status_code == 401
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    assert (app.applied, app.rejected) == (3, 1)
+    assert board._cached_cards[card_ids[0]]["name"] == "renamed"
+    assert board._cached_cards[created["id"]]["name"] == "from elsewhere"
+    assert card_ids[1] not in board._cached_cards
+    assert card_ids[2] in board._cached_cards
+
+
+def _deliver(app: TrelloWebhookApp, action: dict) -> str:
+    "calls the WSGI app directly with a signed delivery, returning the status"
+    body = json.dumps({"action": action}).encode()
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "HTTP_X_TRELLO_WEBHOOK": compute_signature(SECRET, body, CALLBACK_URL),
+    }
+    statuses = []
+    app(environ, lambda status, headers: statuses.append(status))
+    return statuses[0]
+
+
+def test_deliveries_dont_race_reads_on_other_threads():
+    with StandInServer(StandInConfig(pages=1, page_size=20)) as stand_ins:
+        board = trello("board", "key", "token", transport=stand_ins.transport())
+        board.fetch_trello_cards()
+        list_id = stand_ins.stand_ins.trello_lists[0]
+        card_ids = list(board.get_all_cards_on_list(list_id))
+        app = TrelloWebhookApp(board, SECRET, CALLBACK_URL)
+        errors = []
+
+        def deliver():
+            for _ in range(20):
+                for card_id in card_ids:
+                    action = {"type": "deleteCard", "data": {"card": {"id": card_id}}}
+                    assert _deliver(app, action) == "200 OK"
+                    # trello still has the card, so recreating it refetches it
+                    action = {"type": "createCard", "data": {"card": {"id": card_id}}}
+                    assert _deliver(app, action) == "200 OK"
+
+        delivering = threading.Thread(target=deliver)
+        delivering.start()
+        while delivering.is_alive():
+            try:
+                board.find_trello_cards("Card")
+                board.get_all_cards_on_list(list_id)
+            except Exception as err:  # pylint: disable=broad-except
+                errors.append(err)
+        delivering.join()
+
+    assert errors == []
+    assert app.applied == 40 * len(card_ids)
+    assert set(card_ids) <= set(board._cached_cards)
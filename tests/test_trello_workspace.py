@@ -0,0 +1,41 @@
+import sys
+
+sys.path.append("")
+
+from benchmarks.standins import StandInConfig, StandInServer
+from serviceHelpers.trello_workspace import TrelloWorkspace
+
+
+def test_boards_share_a_transport_and_a_card_budget():
+    "the least recently used boards should lose their caches once the workspace is over budget"
+    with StandInServer(StandInConfig(pages=1, page_size=10)) as server:
+        transport = server.transport()
+        workspace = TrelloWorkspace(
+            "key", "token", ["one", "two", "three"], transport=transport, max_cached_cards=25
+        )
+        assert all(workspace.board(board_id).transport is transport for board_id in workspace.board_ids)
+
+        workspace.board("one").fetch_trello_cards()
+        workspace.board("two").fetch_trello_cards()
+        workspace.board("one")  # "two" is now the least recently used
+        workspace.board("three").fetch_trello_cards()
+        workspace.board("three")
+
+        assert workspace.cached_card_count() == 20
+        assert workspace.board("two").dirty_cache
+        assert len(workspace.board("one")._cached_cards) == 10
+
+
+def test_search_across_boards():
+    with StandInServer(StandInConfig(pages=1, page_size=10)) as server:
+        workspace = TrelloWorkspace(
+            "key", "token", ["one", "two", "three"], transport=server.transport(), max_cached_cards=25
+        )
+        # every stand-in board holds the same cards
+        assert [card["name"] for card in workspace.find_trello_cards("Card [12]$")] == ["Card 1", "Card 2"] * 3
+        assert workspace.cached_card_count() <= 25
+
+        requests_before = server.requests
+        assert workspace.find_trello_card("Card 7", board_ids=["three"])["name"] == "Card 7"
+        assert server.requests == requests_before
+        assert workspace.find_trello_card("no such card") is None
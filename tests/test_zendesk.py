@@ -14,6 +14,9 @@ from serviceHelpers.zendesk import (
     ZendeskWorklog,
     ZendeskTicket,
 )
+from dotenv import load_dotenv
+
+load_dotenv()
 
 ZENDESK_HOST = os.environ.get("ZENDESK_HOST")
 ZENDESK_KEY = os.environ.get("ZENDESK_KEY")